@@ -1,72 +1,63 @@
-import psutil
-import datetime
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.permissions import IsAdminUser
-from django.db import connections
-from django.db.utils import OperationalError
+from backend.db_router import ReplicaReadMixin
 from clients.models import Client, Examination, Sales, Branch
 from users.models import UserAccount
 from datetime import datetime, timedelta
 from django.utils.timezone import now
 from django.contrib.auth import get_user_model
 from .serializers import UserAccountSerializer
+from ..dashboard import get_dashboard_summary
+from ..system_monitor import get_sampler, uptime_hours
 from django.db.models import Q
 from clients.api.serializers import BranchSerializer, ClientSerializer
+from clients.api.pagination import KeysetCursorPagination
+from clients.search import search_filter
 from django.shortcuts import get_object_or_404
 
 
 UserAccount = get_user_model()
 
-from rest_framework.response import Response
-from rest_framework import status
-from rest_framework.views import APIView
-import psutil
-import datetime
-from django.db import connections, OperationalError
-
 class SystemInfo(APIView):
+    """
+    Latest background sample of the worker's host (see system_monitor);
+    `?history=<minutes>` adds the samples taken over that many minutes.
+    """
     def get(self, request, *args, **kwargs):
         try:
-            # CPU Usage
-            cpu_usage = psutil.cpu_percent(interval=1)
+            sampler = get_sampler()
+            sample = sampler.latest()
+            if sample is None:
+                return Response({"error": "No system sample yet"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
-            # Memory Usage
-            memory_info = psutil.virtual_memory()
-            memory_usage = memory_info.percent
-
-            # Disk Usage
-            disk_info = psutil.disk_usage('/')
-            disk_usage = disk_info.percent
-
-            # Uptime Calculation
-            boot_time = datetime.datetime.fromtimestamp(psutil.boot_time())
-            uptime_seconds = (datetime.datetime.now() - boot_time).total_seconds()
-            uptime_hours = round(uptime_seconds / 3600, 2)  # Convert seconds to hours
-
-            # Database Connection Check
-            try:
-                connections["default"].cursor()
-                db_status = "Connected"
-            except OperationalError:
-                db_status = "Database Unreachable"
+            cpu_usage = sample["cpu_percent"]
+            memory_usage = sample["memory_percent"]
+            disk_usage = sample["disk_percent"]
 
             # System Status
             system_status = "All Systems Operational" if cpu_usage < 80 and memory_usage < 80 and disk_usage < 80 else "Degraded Performance"
 
-            return Response(
-                {
-                    "server_status": "Server Up",
-                    "system_status": system_status,
-                    "CPU": f"{cpu_usage}%",
-                    "Memory": f"{memory_usage}%",
-                    "Disk": f"{disk_usage}%",
-                    "Uptime": f"{uptime_hours} hours",
-                    "Database": db_status
-                },
-                status=status.HTTP_200_OK
-            )
+            data = {
+                "server_status": "Server Up",
+                "system_status": system_status,
+                "CPU": f"{cpu_usage}%",
+                "Memory": f"{memory_usage}%",
+                "Disk": f"{disk_usage}%",
+                "Uptime": f"{uptime_hours()} hours",
+                "Database": sample["db_status"],
+                "database_ping_ms": sample["db_ping_ms"],
+                "database_connections": sample["db_connections"],
+                "sampled_at": sample["sampled_at"],
+            }
+            if "history" in request.query_params:
+                try:
+                    minutes = float(request.query_params["history"])
+                except ValueError:
+                    return Response({"error": "history must be a number of minutes"}, status=status.HTTP_400_BAD_REQUEST)
+                data["history"] = sampler.history(minutes)
+            return Response(data, status=status.HTTP_200_OK)
         
         except Exception as e:
             return Response(
@@ -77,68 +68,18 @@ class SystemInfo(APIView):
 
 
 
-class AdminDashboardSummaryView(APIView):
+class AdminDashboardSummaryView(ReplicaReadMixin, APIView):
     permission_classes = [IsAdminUser]
     
     def get(self, request, *args, **kwargs):
-        # Date Ranges
-        today = now().date()
-        start_of_week = today - timedelta(days=today.weekday())  # Monday
-        start_of_month = today.replace(day=1)
-
-        # Total Counts
-        total_clients = Client.objects.count()
-        total_examinations = Examination.objects.count()
-        total_staff = UserAccount.objects.filter(is_staff=True, is_active=True).count()
-        total_sales = Sales.objects.count()
-        total_branches = Branch.objects.count()
-
-        # Query by Date Ranges
-        today_clients = Client.objects.filter(created_at__date=today).count()
-        week_clients = Client.objects.filter(created_at__date__gte=start_of_week).count()
-        month_clients = Client.objects.filter(created_at__date__gte=start_of_month).count()
-
-        today_exams = Examination.objects.filter(created_at__date=today).count()
-        week_exams = Examination.objects.filter(created_at__date__gte=start_of_week).count()
-        month_exams = Examination.objects.filter(created_at__date__gte=start_of_month).count()
-
-        today_sales = Sales.objects.filter(created_at__date=today).count()
-        week_sales = Sales.objects.filter(created_at__date__gte=start_of_week).count()
-        month_sales = Sales.objects.filter(created_at__date__gte=start_of_month).count()
-
-        data = {
-            "message": "Manage your optical business with ease",
-            "total_clients": total_clients,
-            "total_examinations": total_examinations,
-            "total_staff": total_staff,
-            "total_sales": total_sales,
-            "total_branches": total_branches,
-            "filters": {
-                "today": {
-                    "clients": today_clients,
-                    "examinations": today_exams,
-                    "sales": today_sales,
-                },
-                "this_week": {
-                    "clients": week_clients,
-                    "examinations": week_exams,
-                    "sales": week_sales,
-                },
-                "this_month": {
-                    "clients": month_clients,
-                    "examinations": month_exams,
-                    "sales": month_sales,
-                },
-            }
-        }
+        # Windowed counts are one query per model, cached until the next write
+        return Response(get_dashboard_summary(), status=status.HTTP_200_OK)
 
-        return Response(data, status=status.HTTP_200_OK)
 
 
 
 
-
-class AdminStaffManagementAPIView(APIView):
+class AdminStaffManagementAPIView(ReplicaReadMixin, APIView):
     permission_classes = [IsAdminUser]  
 
     def get(self, request, user_id=None):
@@ -162,6 +103,12 @@ class AdminStaffManagementAPIView(APIView):
         if query:
             users = users.filter(Q(role__icontains=query) | Q(first_name__icontains=query))
 
+        # UserAccount has no created_at, so staff pages are keyed on the unique email.
+        paginator = KeysetCursorPagination(ordering=("email",))
+        page = paginator.paginate_queryset(users, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(UserAccountSerializer(page, many=True).data)
+
         serializer = UserAccountSerializer(users, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -231,7 +178,7 @@ class AdminBranchManagementAPIView(APIView):
 
 
 
-class AdminClientManagementAPIView(APIView):
+class AdminClientManagementAPIView(ReplicaReadMixin, APIView):
     permission_classes = [IsAdminUser]  
 
     def get(self, request, client_id=None):
@@ -239,7 +186,7 @@ class AdminClientManagementAPIView(APIView):
         Retrieve all clients or filter by ID, reg_no, or first_name.
         """
         if client_id:
-            client = get_object_or_404(Client, id=client_id)
+            client = get_object_or_404(Client.objects.for_listing(), id=client_id)
             serializer = ClientSerializer(client)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -247,10 +194,16 @@ class AdminClientManagementAPIView(APIView):
         query = request.query_params.get("query")
 
         # Apply filtering if parameters are provided
-        clients = Client.objects.all()
+        clients = Client.objects.for_listing()
         
         if query:
-            clients = clients.filter(Q(reg_no__icontains=query) | Q(first_name__icontains=query))  
+            # Every match; KeysetCursorPagination sizes the pages
+            clients = clients.filter(search_filter(query))
+
+        paginator = KeysetCursorPagination()
+        page = paginator.paginate_queryset(clients, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(ClientSerializer(page, many=True).data)
 
         serializer = ClientSerializer(clients, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
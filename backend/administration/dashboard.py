@@ -0,0 +1,84 @@
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils.timezone import localtime
+from clients.models import Client, Examination, Sales, Branch
+
+UserAccount = get_user_model()
+
+CACHE_KEY = "admin-dashboard-summary:{day}"
+
+
+def cache_key(day=None):
+    day = day or localtime().date()
+    return CACHE_KEY.format(day=day.isoformat())
+
+
+def windowed_counts(model, start_of_day, start_of_week, start_of_month):
+    """
+    Total plus today/week/month counts for a model in a single conditional
+    aggregate. Plain datetime range bounds keep `created_at` sargable,
+    unlike `created_at__date` lookups.
+    """
+    return model.objects.order_by().aggregate(
+        total=Count("pk"),
+        today=Count("pk", filter=Q(created_at__gte=start_of_day)),
+        week=Count("pk", filter=Q(created_at__gte=start_of_week)),
+        month=Count("pk", filter=Q(created_at__gte=start_of_month)),
+    )
+
+
+def build_dashboard_summary():
+    start_of_day = localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    start_of_week = start_of_day - timedelta(days=start_of_day.weekday())  # Monday
+    start_of_month = start_of_day.replace(day=1)
+    bounds = (start_of_day, start_of_week, start_of_month)
+
+    clients = windowed_counts(Client, *bounds)
+    examinations = windowed_counts(Examination, *bounds)
+    sales = windowed_counts(Sales, *bounds)
+
+    return {
+        "message": "Manage your optical business with ease",
+        "total_clients": clients["total"],
+        "total_examinations": examinations["total"],
+        "total_staff": UserAccount.objects.filter(is_staff=True, is_active=True).count(),
+        "total_sales": sales["total"],
+        "total_branches": Branch.objects.count(),
+        "filters": {
+            "today": {
+                "clients": clients["today"],
+                "examinations": examinations["today"],
+                "sales": sales["today"],
+            },
+            "this_week": {
+                "clients": clients["week"],
+                "examinations": examinations["week"],
+                "sales": sales["week"],
+            },
+            "this_month": {
+                "clients": clients["month"],
+                "examinations": examinations["month"],
+                "sales": sales["month"],
+            },
+        }
+    }
+
+
+def get_dashboard_summary():
+    """
+    Cached per day for DASHBOARD_SUMMARY_CACHE_TTL seconds. Writes to the
+    counted models drop the entry (see administration.signals).
+    """
+    key = cache_key()
+    summary = cache.get(key)
+    if summary is None:
+        summary = build_dashboard_summary()
+        cache.set(key, summary, getattr(settings, "DASHBOARD_SUMMARY_CACHE_TTL", 60))
+    return summary
+
+
+def invalidate_dashboard_summary():
+    cache.delete(cache_key())
@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from clients.models import Client, Examination, Sales, Branch
+from clients.signals import bulk_created
+from .dashboard import invalidate_dashboard_summary
+
+UserAccount = get_user_model()
+
+
+@receiver(post_save, sender=Client)
+@receiver(post_save, sender=Examination)
+@receiver(post_save, sender=Sales)
+@receiver(post_save, sender=Branch)
+@receiver(post_save, sender=UserAccount)
+@receiver(post_delete, sender=Client)
+@receiver(post_delete, sender=Examination)
+@receiver(post_delete, sender=Sales)
+@receiver(post_delete, sender=Branch)
+@receiver(post_delete, sender=UserAccount)
+@receiver(bulk_created)
+def refresh_dashboard_summary(sender, update_fields=None, **kwargs):
+    if sender is UserAccount and update_fields == {"last_login"}:
+        return  # logging in changes nothing the dashboard counts
+    invalidate_dashboard_summary()
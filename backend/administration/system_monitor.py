@@ -0,0 +1,123 @@
+"""
+Background sampling for the SystemInfo endpoint.
+
+A daemon thread per worker process samples CPU, memory, disk, database
+ping latency and connection stats every SYSTEM_SAMPLE_INTERVAL seconds
+into a ring buffer holding SYSTEM_SAMPLE_HISTORY_MINUTES of samples, so
+requests only read the latest snapshot instead of measuring (and blocking
+on `psutil.cpu_percent(interval=1)`) themselves.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+import psutil
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+logger = logging.getLogger(__name__)
+
+BOOT_TIME = psutil.boot_time()
+
+
+def database_stats():
+    """Ping latency plus, on Postgres, connections to this database by state."""
+    started = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            ping_ms = (time.perf_counter() - started) * 1000
+            connections_by_state = None
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "SELECT COALESCE(state, 'unknown'), COUNT(*) FROM pg_stat_activity "
+                    "WHERE datname = current_database() GROUP BY 1"
+                )
+                connections_by_state = dict(cursor.fetchall())
+    except DatabaseError:
+        # Drop the broken connection so the next sample reconnects
+        connection.close()
+        return {"db_status": "Database Unreachable", "db_ping_ms": None, "db_connections": None}
+    return {
+        "db_status": "Connected",
+        "db_ping_ms": round(ping_ms, 2),
+        "db_connections": connections_by_state,
+    }
+
+
+def take_sample():
+    memory = psutil.virtual_memory()
+    return {
+        "sampled_at": datetime.now(timezone.utc).isoformat(),
+        "timestamp": time.time(),
+        # Non-blocking: usage since the previous call
+        "cpu_percent": psutil.cpu_percent(interval=None),
+        "memory_percent": memory.percent,
+        "disk_percent": psutil.disk_usage("/").percent,
+        **database_stats(),
+    }
+
+
+class SystemSampler(threading.Thread):
+    def __init__(self, interval, history_minutes):
+        super().__init__(name="system-sampler", daemon=True)
+        self.interval = interval
+        self.samples = deque(maxlen=max(1, int(history_minutes * 60 / interval)))
+        self.pid = os.getpid()
+        self.stopped = threading.Event()
+
+    def sample(self):
+        try:
+            self.samples.append(take_sample())
+        except Exception:
+            logger.exception("System sample failed")
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                self.sample()
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+
+    def latest(self):
+        return self.samples[-1] if self.samples else None
+
+    def history(self, minutes):
+        since = time.time() - minutes * 60
+        return [sample for sample in list(self.samples) if sample["timestamp"] >= since]
+
+
+_sampler = None
+_lock = threading.Lock()
+
+
+def get_sampler():
+    """
+    The sampler for this process, started on first use. Forked workers
+    (gunicorn --preload) don't inherit the parent's thread, so a sampler
+    created in another process is replaced.
+    """
+    global _sampler
+    sampler = _sampler
+    if sampler is not None and sampler.pid == os.getpid():
+        return sampler
+    with _lock:
+        if _sampler is None or _sampler.pid != os.getpid():
+            psutil.cpu_percent(interval=None)  # primes the CPU counter
+            sampler = SystemSampler(
+                getattr(settings, "SYSTEM_SAMPLE_INTERVAL", 5),
+                getattr(settings, "SYSTEM_SAMPLE_HISTORY_MINUTES", 60),
+            )
+            sampler.sample()  # so the first request has a snapshot
+            sampler.start()
+            _sampler = sampler
+        return _sampler
+
+
+def uptime_hours():
+    return round((time.time() - BOOT_TIME) / 3600, 2)
@@ -1,3 +1,123 @@
-from django.test import TestCase
+import time
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from clients.models import Client
+from .dashboard import get_dashboard_summary
+from .system_monitor import SystemSampler
 
-# Create your tests here.
+
+class DashboardSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def create_client(self):
+        return Client.objects.create(
+            first_name="Jane", last_name="Doe", dob="1990-01-01", phone_number="+254700000000",
+            email="jane@example.com", location="Nairobi", branch="Nairobi",
+            registered_by="Reception", gender="F",
+        )
+
+    def test_one_query_per_model_then_cached(self):
+        self.create_client()
+        with self.assertNumQueries(5):  # clients, examinations, sales, staff, branches
+            summary = get_dashboard_summary()
+        self.assertEqual(summary["total_clients"], 1)
+        self.assertEqual(summary["filters"]["today"]["clients"], 1)
+        self.assertEqual(summary["filters"]["this_month"]["clients"], 1)
+
+        with self.assertNumQueries(0):
+            get_dashboard_summary()
+
+    def test_writes_invalidate_cache(self):
+        get_dashboard_summary()
+        self.create_client()
+        self.assertEqual(get_dashboard_summary()["total_clients"], 1)
+
+    def test_logins_keep_the_cache(self):
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        get_dashboard_summary()
+        self.assertTrue(self.client.login(email="staff@example.com", password="secret"))
+        with self.assertNumQueries(0):
+            get_dashboard_summary()
+
+        user.first_name = "Other"
+        user.save()
+        with self.assertNumQueries(5):
+            get_dashboard_summary()
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1, CLIENT_SEARCH_LIMIT=2)
+class ClientManagementSearchTests(APITestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="secret", first_name="Admin", last_name="User"
+        )
+        self.client.force_authenticate(admin)
+        self.johns = [
+            Client.objects.create(
+                first_name="John", last_name=f"Doe{index}", dob="1990-01-01", phone_number=f"+25470000000{index}",
+                email=f"john{index}@example.com", location="Nairobi", branch="Nairobi",
+                registered_by="Reception", gender="M",
+            )
+            for index in range(5)
+        ]
+
+    def test_lists_every_match_past_the_search_limit(self):
+        url = reverse("client-list")
+        response = self.client.get(url, {"query": "John"})
+        self.assertEqual(len(response.data), 5)
+
+        seen = []
+        page = self.client.get(url, {"query": "John", "page_size": 2}).data
+        while True:
+            seen += [row["id"] for row in page["results"]]
+            if not page["next"]:
+                break
+            page = self.client.get(page["next"]).data
+        self.assertEqual(sorted(seen), sorted(str(client.id) for client in self.johns))
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class SystemInfoTests(APITestCase):
+    def setUp(self):
+        self.sampler = SystemSampler(interval=60, history_minutes=3)  # room for three samples, never started
+        patcher = mock.patch("administration.api.views.get_sampler", return_value=self.sampler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        self.client.force_authenticate(user)
+
+    def test_ring_buffer_keeps_the_latest_samples(self):
+        for _ in range(4):
+            self.sampler.sample()
+        self.assertEqual(len(self.sampler.samples), 3)
+        sample = self.sampler.latest()
+        self.assertEqual(sample["db_status"], "Connected")
+        self.assertIsNotNone(sample["db_ping_ms"])
+
+        self.sampler.samples[0]["timestamp"] = time.time() - 600
+        self.assertEqual(len(self.sampler.history(5)), 2)
+
+    def test_endpoint_reads_the_latest_sample(self):
+        self.sampler.sample()
+        started = time.perf_counter()
+        response = self.client.get(reverse("system-info"), {"history": "10"})
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["Database"], "Connected")
+        self.assertEqual(response.data["sampled_at"], self.sampler.latest()["sampled_at"])
+        self.assertEqual(len(response.data["history"]), 1)
+
+    def test_liveness_touches_nothing(self):
+        self.client.logout()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("liveness"))
+        self.assertEqual(response.content, b"ok")
@@ -1,3 +1,9 @@
+from django.http import HttpResponse
 from django.shortcuts import render
 
 # Create your views here.
+
+
+def liveness(request):
+    """Load balancer liveness probe: answers without touching the database, auth or DRF."""
+    return HttpResponse("ok", content_type="text/plain")
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import APIRequestLog
+from .models import APIRequestLog, APIRequestMetric, DailyRollup
 
 @admin.register(APIRequestLog)
 class APIRequestLogAdmin(admin.ModelAdmin):
@@ -7,3 +7,18 @@ class APIRequestLogAdmin(admin.ModelAdmin):
     list_filter = ("method",)
     search_fields = ("endpoint",)
     ordering = ("-last_requested",)
+
+
+@admin.register(APIRequestMetric)
+class APIRequestMetricAdmin(admin.ModelAdmin):
+    list_display = ("method", "endpoint", "status_class", "window_start", "count", "max_duration_ms", "max_queries")
+    list_filter = ("method", "status_class")
+    search_fields = ("endpoint",)
+    ordering = ("-window_start",)
+
+
+@admin.register(DailyRollup)
+class DailyRollupAdmin(admin.ModelAdmin):
+    list_display = ("day", "branch", "payment_method", "sale_count", "revenue", "new_clients", "examinations")
+    list_filter = ("branch", "payment_method")
+    ordering = ("-day",)
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import AnalyticsView, APIRequestLogView
+from .views import AnalyticsView, APIRequestLogView, EndpointMetricsView
 
 
 urlpatterns = [
     path("all/", AnalyticsView.as_view(), name="analytics"),
     path("request-logs/", APIRequestLogView.as_view(), name="api-request-logs"),
+    path("endpoint-metrics/", EndpointMetricsView.as_view(), name="endpoint-metrics"),
 ]
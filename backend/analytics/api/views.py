@@ -1,13 +1,19 @@
-from django.db import connection
+from datetime import timedelta
+from django.utils.timezone import now
 from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from clients.models import Client, Sales
-from ..models import APIRequestLog
+from backend.db_router import ReplicaReadMixin
+from clients.models import Client
+from ..metrics import RouteStats
+from ..models import APIRequestLog, APIRequestMetric, DailyRollup
+from ..request_buffer import request_log_buffer, request_metrics_buffer
 
 class APIRequestLogView(APIView):
     def get(self, request):
+        request_log_buffer.flush()  # include this worker's unflushed hits
         logs = APIRequestLog.objects.all().order_by("-last_requested")
         data = [
             {
@@ -22,53 +28,100 @@ class APIRequestLogView(APIView):
         return Response(data, status=status.HTTP_200_OK)
 
 
-class AnalyticsView(APIView):
+class EndpointMetricsView(APIView):
+    """
+    Latency, DB query count and response size percentiles per route over
+    the last ?hours=<n> (default 24), with a breakdown by status class.
+    Optional ?endpoint=<substring> and ?method=<verb> narrow the report.
+    """
     def get(self, request):
-        # Detect the database engine
-        db_engine = connection.settings_dict["ENGINE"]
+        request_metrics_buffer.flush()  # include this worker's unflushed samples
+        try:
+            hours = max(int(request.query_params.get("hours", 24)), 1)
+        except ValueError:
+            return Response({"error": "hours must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Use DATE_TRUNC for PostgreSQL, strftime for SQLite
-        if "postgresql" in db_engine:
-            month_trunc = "DATE_TRUNC('month', created_at)"
-        else:
-            month_trunc = "strftime('%Y-%m', created_at)"
+        metrics = APIRequestMetric.objects.filter(window_start__gte=now() - timedelta(hours=hours))
+        if request.query_params.get("endpoint"):
+            metrics = metrics.filter(endpoint__icontains=request.query_params["endpoint"])
+        if request.query_params.get("method"):
+            metrics = metrics.filter(method__iexact=request.query_params["method"])
+
+        routes = {}
+        for metric in metrics:
+            route = routes.setdefault((metric.method, metric.endpoint), {"all": RouteStats(), "statuses": {}})
+            stats = RouteStats.from_metric(metric)
+            route["statuses"].setdefault(metric.status_class, RouteStats()).combine(stats)
+            route["all"].combine(stats)
+
+        data = []
+        for (method, endpoint), route in routes.items():
+            data.append({
+                "method": method,
+                "endpoint": endpoint,
+                **route["all"].summary(),
+                "status_classes": {
+                    status_class: stats.summary() for status_class, stats in sorted(route["statuses"].items())
+                },
+            })
+        data.sort(key=lambda row: row["duration_ms"]["p95"] or 0, reverse=True)
+        return Response({"hours": hours, "endpoints": data}, status=status.HTTP_200_OK)
+
+
+class AnalyticsView(ReplicaReadMixin, APIView):
+    def get(self, request):
+        # Everything except gender comes from the daily rollup table, which
+        # is maintained by analytics.signals and rebuilt by `rebuild_daily_rollups`.
+        sales_rows = DailyRollup.objects.exclude(payment_method="")
 
         # Total clients per branch
         clients_per_branch = (
-            Client.objects.values("branch").annotate(total=Count("id")).order_by("-total")
+            DailyRollup.objects.filter(payment_method="")
+            .values("branch")
+            .annotate(total=Sum("new_clients"))
+            .filter(total__gt=0)
+            .order_by("-total")
         )
 
         # Total sales per branch
-        sales_per_branch = (
-            Sales.objects.values("examination__client__branch")
-            .annotate(total_sales=Count("id"), revenue=Sum("total_price"))
+        sales_per_branch = [
+            {
+                "examination__client__branch": row["branch"],
+                "total_sales": row["total_sales"],
+                "revenue": row["revenue"],
+            }
+            for row in sales_rows.values("branch")
+            .annotate(total_sales=Sum("sale_count"), revenue=Sum("revenue"))
+            .filter(total_sales__gt=0)
             .order_by("-total_sales")
-        )
+        ]
 
         # Sales distribution by payment method
         sales_by_payment_method = (
-            Sales.objects.values("payment_method")
-            .annotate(count=Count("id"))
+            sales_rows.values("payment_method")
+            .annotate(count=Sum("sale_count"))
+            .filter(count__gt=0)
             .order_by("-count")
         )
 
         # Gender distribution of clients
         gender_distribution = (
-            Client.objects.values("gender").annotate(count=Count("id"))
+            Client.objects.order_by().values("gender").annotate(count=Count("id"))
         )
 
-        # Monthly sales trends (Cross-Compatible)
+        # Monthly sales trends
         monthly_sales = (
-            Sales.objects.extra({"month": month_trunc})
+            sales_rows.annotate(month=TruncMonth("day"))
             .values("month")
-            .annotate(total_sales=Count("id"), revenue=Sum("total_price"))
+            .annotate(total_sales=Sum("sale_count"), revenue=Sum("revenue"))
+            .filter(total_sales__gt=0)
             .order_by("month")
         )
 
         return Response(
             {
                 "clients_per_branch": list(clients_per_branch),
-                "sales_per_branch": list(sales_per_branch),
+                "sales_per_branch": sales_per_branch,
                 "sales_by_payment_method": list(sales_by_payment_method),
                 "gender_distribution": list(gender_distribution),
                 "monthly_sales": list(monthly_sales),
@@ -0,0 +1,296 @@
+"""
+In-process endpoint benchmark.
+
+`run()` calls every URL in the clients, administration and analytics APIs
+through Django's test client, against the current database and as a
+superuser. For each call it records:
+
+- the median and slowest latency over a few runs
+- the number of queries
+- the peak Python memory allocated while handling the request (tracemalloc)
+- the response size
+
+Writes run inside a transaction that is rolled back. The database is the
+same afterwards, so runs on the same dataset are repeatable.
+
+Reports are JSON with sorted keys, one metric per line, so they diff
+cleanly between commits. `compare()` lists the regressions between two
+reports. Query counts don't vary between runs on the same dataset, so any
+increase is a regression. Latency and memory only count when they grow past
+a tolerance.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import timedelta
+from importlib import import_module
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import Client as TestClient
+from django.test.utils import override_settings
+from django.urls import URLPattern, resolve, reverse
+from django.utils.http import urlencode
+from django.utils.timezone import localdate
+from clients.models import Branch, Client, Examination, Payment, Sales
+from middlewares.api_request_logger import QueryCounter, count_queries
+from users.serializers import CustomTokenObtainPairSerializer
+from .request_buffer import request_log_buffer, request_metrics_buffer
+
+# URL module -> namespace to reverse its names in ("" for none)
+URL_MODULES = {
+    "clients.api.urls": "clients",
+    "administration.api.urls": "",
+    "analytics.api.urls": "",
+}
+COUNTED_MODELS = (Client, Examination, Sales, Payment)
+
+IMPORT_CSV = """first_name,last_name,dob,phone_number,email,location,branch,gender
+Amina,Achieng,1990-05-01,+254700000001,amina@example.com,Nakuru,Nakuru,F
+Brian,Barasa,1985-02-11,+254700000002,brian@example.com,Nakuru,Nakuru,M
+"""
+
+
+class Call:
+    """One request: `name` is the URL name, `variant` tells calls to the same URL apart."""
+
+    def __init__(self, method, name, args=(), params=None, data=None, variant="", format="json"):
+        self.method, self.name, self.args = method, name, args
+        self.params, self.data, self.variant, self.format = params or {}, data, variant, format
+
+    @property
+    def label(self):
+        return f"{self.method.upper()} {self.name}" + (f" {self.variant}" if self.variant else "")
+
+
+class Rows:
+    """The rows the calls point at: the oldest of each kind, so reruns pick the same ones."""
+
+    def __init__(self):
+        def oldest(queryset):
+            return queryset.order_by("created_at", "id").first()
+
+        self.client = oldest(Client.objects.all())
+        self.sale = oldest(Sales.objects.all())
+        self.owing_sale = oldest(Sales.objects.filter(balance_due__gt=0))
+        self.pending_exam = oldest(Examination.objects.filter(state="Pending"))
+        self.booked_exam = oldest(Examination.objects.filter(booked_for_sales=True))
+        self.branch = Branch.objects.order_by("id").first()
+        self.staff = get_user_model().objects.filter(is_superuser=False).order_by("email").first()
+        missing = [name for name, row in vars(self).items() if row is None]
+        if missing:
+            raise LookupError(f"No {', '.join(missing)} to benchmark with; seed data first (manage.py seed_data).")
+
+
+def url_names():
+    """Every named URL in URL_MODULES, as reverse() takes it."""
+    names = []
+    for module, namespace in URL_MODULES.items():
+        for pattern in import_module(module).urlpatterns:
+            if isinstance(pattern, URLPattern) and pattern.name:
+                names.append(f"{namespace}:{pattern.name}" if namespace else pattern.name)
+    return names
+
+
+def calls(rows):
+    """
+    What the harness requests: every endpoint's methods, with valid bodies
+    for writes. Listings are read a page at a time, as the frontend does.
+    """
+    today = localdate()
+    sale_body = {
+        "examination": str(rows.booked_exam.id), "frame_brand": "Ray-Ban", "frame_model": "RB5154",
+        "frame_color": "Black", "frame_price": "8000.00", "lens_brand": "Zeiss", "lens_type": "Progressive",
+        "lens_material": "Polycarbonate", "lens_coating": "Anti-glare", "lens_price": "6000.00",
+        "advance_paid": "5000.00", "advance_payment_method": "Cash", "booked_by": "Benchmark",
+        "served_by": "Benchmark",
+    }
+    client_body = {
+        "first_name": "Bench", "last_name": "Mark", "dob": "1990-01-01", "phone_number": "+254799999999",
+        "email": "bench@example.com", "location": "Nairobi", "branch": rows.branch.name, "gender": "F",
+        "registered_by": "Benchmark",
+    }
+    return [
+        # clients
+        Call("get", "clients:branch-list"),
+        Call("post", "clients:register_client", data=client_body),
+        Call("get", "clients:client-info", [rows.client.id]),
+        Call("post", "clients:register_examination", [rows.pending_exam.id],
+             data={"right_sph": "-1.25", "left_sph": "-1.00", "right_axis": 90, "left_axis": 90}),
+        Call("get", "clients:all_examinations", params={"page_size": 50}),
+        Call("get", "clients:all_examinations", params={"page_size": 500, "fields": "id,client_name,state,created_at"},
+             variant="page_size=500 fields"),
+        Call("get", "clients:client_examinations", [rows.client.id]),
+        Call("post", "clients:book_existing_client", [rows.client.id]),
+        Call("post", "clients:bulk_book_examinations", data={"client_ids": [str(rows.client.id)]}),
+        Call("get", "clients:pending_examinations", params={"page_size": 50}),
+        Call("get", "clients:all-sales", params={"page_size": 50}),
+        Call("get", "clients:all-sales", params={"page_size": 500, "format": "compact"}, variant="page_size=500 compact"),
+        Call("post", "clients:create-sales", data=sale_body),
+        Call("get", "clients:get-sales", [rows.sale.id]),
+        Call("put", "clients:get-sales", [rows.sale.id], data={"frame_quantity": 2}),
+        Call("get", "clients:update-client-sale-balance", [rows.owing_sale.id]),
+        Call("post", "clients:update-client-sale-balance", [rows.owing_sale.id],
+             data={"amount": "1.00", "method": "Cash"}),
+        Call("get", "clients:search-client-balance", params={"q": rows.client.last_name}),
+        Call("get", "clients:search-client", params={"q": rows.client.last_name}),
+        Call("post", "clients:import-clients", data={"file": IMPORT_CSV}, format="multipart"),
+        Call("get", "clients:export", ["clients"], params={"type": "ndjson"}, variant="clients"),
+        Call("get", "clients:export", ["examinations"], variant="examinations"),
+        Call("get", "clients:export", ["sales"], variant="sales"),
+        Call("get", "clients:generate-receipt", [rows.sale.id]),
+        Call("get", "clients:generate-receipt", [rows.sale.id], params={"type": "html"}, variant="html"),
+        Call("get", "clients:receipt-batch", params={"from": today - timedelta(days=1), "to": today, "type": "html"}),
+        Call("get", "clients:get-booked-client-for-sales", params={"page_size": 50}),
+        Call("get", "clients:search_client", params={"q": rows.client.first_name, "limit": 20}),
+        # administration
+        Call("get", "system-info"),
+        Call("get", "admin-dashboard-summary"),
+        Call("get", "staff-admin-list", params={"page_size": 50}),
+        Call("post", "staff-admin-list", data={
+            "email": "bench.staff@example.com", "first_name": "Bench", "last_name": "Staff",
+            "role": "receptionist",
+        }),
+        Call("get", "staff-admin-detail", [rows.staff.id]),
+        Call("put", "staff-admin-detail", [rows.staff.id], data={"role": "optometrist"}),
+        Call("delete", "staff-admin-detail", [rows.staff.id]),
+        Call("get", "branch-list"),
+        Call("post", "branch-list", data={"name": "Benchmark", "code": "BCH"}),
+        Call("get", "branch-detail", [rows.branch.id]),
+        Call("put", "branch-detail", [rows.branch.id], data={"name": rows.branch.name}),
+        Call("delete", "branch-detail", [rows.branch.id]),
+        Call("get", "client-list", params={"page_size": 50}),
+        Call("get", "client-list", params={"query": rows.client.last_name, "page_size": 50}, variant="query"),
+        Call("get", "client-detail", [rows.client.id]),
+        Call("patch", "client-detail", [rows.client.id], data={"location": rows.client.location}),
+        Call("delete", "client-detail", [rows.client.id]),
+        # analytics
+        Call("get", "analytics"),
+        Call("get", "api-request-logs"),
+        Call("get", "endpoint-metrics"),
+    ]
+
+
+def uncovered(call_list):
+    covered = {call.name for call in call_list}
+    return [name for name in url_names() if name not in covered]
+
+
+def superuser_token(email=None):
+    users = get_user_model().objects.filter(is_active=True)
+    user = users.filter(email=email).first() if email else users.filter(is_superuser=True).order_by("email").first()
+    if user is None:
+        raise LookupError("No user to authenticate as; seed staff (manage.py seed_data) or pass an email.")
+    return str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+
+
+def request(http, call):
+    """Makes the call; returns (status, response bytes). Writes are rolled back."""
+    path = reverse(call.name, args=call.args)
+    with transaction.atomic():
+        if call.method == "get":
+            response = http.get(path, call.params, HTTP_ACCEPT="application/json")
+        else:
+            if call.params:
+                path += "?" + urlencode(call.params)
+            if call.format == "multipart":
+                files = {key: SimpleUploadedFile("benchmark.csv", value.encode()) for key, value in call.data.items()}
+                response = http.post(path, files)
+            else:
+                response = getattr(http, call.method)(
+                    path, json.dumps(call.data), content_type="application/json", HTTP_ACCEPT="application/json"
+                )
+        size = sum(len(chunk) for chunk in response.streaming_content) if response.streaming else len(response.content)
+        transaction.set_rollback(True)
+    return response.status_code, size
+
+
+def measure(http, call, runs):
+    request(http, call)  # warm up caches
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        request(http, call)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    # Counted and traced in a separate run; tracing slows the request down
+    counter = QueryCounter()
+    tracemalloc.start()
+    try:
+        with ExitStack() as stack:
+            count_queries(stack, counter)
+            status, size = request(http, call)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "route": "/" + resolve(reverse(call.name, args=call.args)).route,
+        "status": status,
+        "median_ms": round(statistics.median(timings), 2),
+        "max_ms": round(max(timings), 2),
+        "queries": counter.count,
+        "peak_kb": round(peak / 1024, 1),
+        "bytes": size,
+    }
+
+
+def run(runs=5, email=None, only=None, stdout=None):
+    """Benchmarks every call (those whose label contains `only`, if given); returns the report."""
+    call_list = calls(Rows())
+    token = superuser_token(email)
+    # The test client's default host, and no request-log flushes inside the measurements
+    with override_settings(
+        ALLOWED_HOSTS=["testserver"], API_REQUEST_LOG_FLUSH_SIZE=10**9, API_REQUEST_LOG_FLUSH_INTERVAL=10**9
+    ):
+        http = TestClient(raise_request_exception=False, HTTP_AUTHORIZATION=f"Bearer {token}")
+        endpoints = {}
+        try:
+            for call in call_list:
+                if only and only not in call.label:
+                    continue
+                endpoints[call.label] = measure(http, call, runs)
+                if stdout:
+                    stdout.write(format_line(call.label, endpoints[call.label]))
+        finally:
+            # The benchmark's own hits would otherwise land in the analytics tables
+            request_log_buffer.drain()
+            request_metrics_buffer.drain()
+    return {
+        "vendor": connection.vendor,
+        "runs": runs,
+        "rows": {model.__name__: model.objects.count() for model in COUNTED_MODELS},
+        "endpoints": endpoints,
+        "uncovered": uncovered(call_list),
+    }
+
+
+def format_line(label, measured):
+    return (
+        f"{label:<52} {measured['status']:>3} {measured['median_ms']:>9.2f} ms "
+        f"{measured['queries']:>4} q {measured['peak_kb']:>9.1f} KiB {measured['bytes']:>10} B"
+    )
+
+
+def compare(baseline, current, tolerance=0.25, min_ms=2.0):
+    """
+    Regressions from `baseline` to `current`, as (label, message): a changed
+    status, more queries, or latency or peak memory up by more than
+    `tolerance` (latency also by more than `min_ms`, below which it's noise).
+    """
+    regressions = []
+    for label, after in sorted(current["endpoints"].items()):
+        before = baseline.get("endpoints", {}).get(label)
+        if before is None:
+            continue
+        if after["status"] != before["status"]:
+            regressions.append((label, f"status {before['status']} -> {after['status']}"))
+        if after["queries"] > before["queries"]:
+            regressions.append((label, f"queries {before['queries']} -> {after['queries']}"))
+        slower = after["median_ms"] - before["median_ms"]
+        if slower > min_ms and after["median_ms"] > before["median_ms"] * (1 + tolerance):
+            regressions.append((label, f"median {before['median_ms']} ms -> {after['median_ms']} ms"))
+        if after["peak_kb"] > before["peak_kb"] * (1 + tolerance):
+            regressions.append((label, f"peak memory {before['peak_kb']} KiB -> {after['peak_kb']} KiB"))
+    return regressions
@@ -0,0 +1,52 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from analytics.benchmark import compare, run
+
+
+class Command(BaseCommand):
+    help = (
+        "Calls every clients, administration and analytics endpoint in-process against the "
+        "current database and reports latency, query count and peak memory per endpoint. "
+        "With --compare, fails on regressions against an earlier report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Timed runs per endpoint (median is reported).")
+        parser.add_argument("--email", help="User to call the endpoints as. Defaults to the first superuser.")
+        parser.add_argument("--only", help="Only endpoints whose label contains this, e.g. clients:all-sales.")
+        parser.add_argument("--json", dest="json_path", help="Write the report to this file.")
+        parser.add_argument("--compare", dest="baseline", help="An earlier report to check for regressions.")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.25,
+            help="Allowed relative growth in latency and peak memory before --compare fails.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = run(options["runs"], options["email"], options["only"], stdout=self.stdout)
+        except LookupError as error:
+            raise CommandError(str(error))
+        if report["uncovered"]:
+            self.stdout.write(self.style.WARNING(f"Not benchmarked: {', '.join(report['uncovered'])}"))
+        failed = [label for label, measured in report["endpoints"].items() if measured["status"] >= 400]
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Error responses: {', '.join(failed)}"))
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+                handle.write("\n")
+
+        if options["baseline"]:
+            with open(options["baseline"]) as handle:
+                baseline = json.load(handle)
+            if baseline.get("rows") != report["rows"]:
+                self.stdout.write(self.style.WARNING(
+                    f"The baseline ran on different data ({baseline.get('rows')}); timings may not compare."
+                ))
+            regressions = compare(baseline, report, options["tolerance"])
+            for label, message in regressions:
+                self.stdout.write(f"{label}: {message}")
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
@@ -0,0 +1,120 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+from clients.models import Client, Sales
+
+API_PREFIX = "/api/v001/clients"
+
+
+def default_paths():
+    """The async read endpoints, pointed at rows that exist in this database."""
+    client = Client.objects.order_by("created_at").first()
+    sale = Sales.objects.order_by("created_at").first()
+    if client is None or sale is None:
+        raise CommandError("Seed some data first, e.g. `manage.py seed_data --clients 10000`.")
+    return [
+        f"{API_PREFIX}/search-client/?q={client.last_name}&limit=20",
+        f"{API_PREFIX}/examinations/pending/?page_size=50",
+        f"{API_PREFIX}/search-booked-for-sales/?page_size=50",
+        f"{API_PREFIX}/sales/generate-receipt/{sale.id}/",
+        f"{API_PREFIX}/client-info/{client.id}/",
+    ]
+
+
+def exact_percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, round(pct / 100 * (len(sorted_samples) - 1)))
+    return sorted_samples[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests running servers (e.g. gunicorn sync workers vs uvicorn workers on the "
+        "same machine) and reports requests/sec and latency percentiles per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target", action="append", required=True,
+            help="NAME=BASE_URL, e.g. wsgi=http://127.0.0.1:8000. Repeat to compare servers.",
+        )
+        parser.add_argument("--path", action="append", help="Path to request (repeatable). Defaults to the async read endpoints.")
+        parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once.")
+        parser.add_argument("--duration", type=float, default=15, help="Seconds to run per target and path.")
+        parser.add_argument("--token", help="JWT access token. Minted for --email (or the first superuser) by default.")
+        parser.add_argument("--email", help="User to mint the access token for.")
+        parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options["target"]:
+            name, sep, base_url = target.partition("=")
+            if not sep:
+                raise CommandError(f"--target must be NAME=BASE_URL, got {target!r}")
+            targets.append((name, base_url.rstrip("/")))
+        paths = options["path"] or default_paths()
+        headers = {"Authorization": f"Bearer {options['token'] or self.mint_token(options['email'])}"}
+
+        results = {}
+        for name, base_url in targets:
+            results[name] = {}
+            for path in paths:
+                measured = self.run(base_url + path, headers, options["concurrency"], options["duration"])
+                results[name][path] = measured
+                self.stdout.write(
+                    f"{name:<8} {measured['rps']:>8.1f} req/s  p50 {measured['p50_ms']:>7.1f} ms  "
+                    f"p99 {measured['p99_ms']:>7.1f} ms  errors {measured['errors']:>4}  {path}"
+                )
+
+        if options["json_path"]:
+            with open(options["json_path"], "w") as handle:
+                json.dump(results, handle, indent=2)
+
+    def mint_token(self, email):
+        users = get_user_model().objects.filter(is_active=True)
+        user = users.filter(email=email).first() if email else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("No user to authenticate as; pass --token or --email.")
+        return str(AccessToken.for_user(user))
+
+    def run(self, url, headers, concurrency, duration):
+        deadline = time.perf_counter() + duration
+        lock = threading.Lock()
+        latencies, errors = [], [0]
+
+        def worker():
+            session = requests.Session()
+            samples, failed = [], 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = session.get(url, headers=headers, timeout=30)
+                    ok = response.status_code < 400
+                except requests.RequestException:
+                    ok = False
+                samples.append((time.perf_counter() - started) * 1000)
+                failed += not ok
+            with lock:
+                latencies.extend(samples)
+                errors[0] += failed
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(worker)
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            "requests": len(latencies),
+            "errors": errors[0],
+            "rps": len(latencies) / elapsed if elapsed else 0,
+            "p50_ms": exact_percentile(latencies, 50) or 0,
+            "p99_ms": exact_percentile(latencies, 99) or 0,
+        }
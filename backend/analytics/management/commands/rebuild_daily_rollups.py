@@ -0,0 +1,21 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from analytics.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Backfills or rebuilds the analytics daily rollup table from clients, examinations and sales."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", help="First day to rebuild (YYYY-MM-DD). Defaults to the beginning.")
+        parser.add_argument("--to", dest="end", help="Last day to rebuild (YYYY-MM-DD). Defaults to today.")
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options["start"]) if options["start"] else None
+            end = date.fromisoformat(options["end"]) if options["end"] else None
+        except ValueError as error:
+            raise CommandError(f"Invalid date: {error}")
+
+        written = rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} daily rollup rows."))
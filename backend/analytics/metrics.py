@@ -0,0 +1,135 @@
+from bisect import bisect_left
+
+# Upper bounds of the fixed histogram buckets; every histogram carries one
+# extra overflow bucket for samples above the last bound.
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 500)
+SIZE_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+PERCENTILES = (50, 95, 99)
+
+
+def empty_histogram(bounds):
+    return [0] * (len(bounds) + 1)
+
+
+def bucket_index(bounds, value):
+    return bisect_left(bounds, value)
+
+
+def merge_histograms(left, right):
+    if not left:
+        return list(right)
+    if not right:
+        return list(left)
+    return [a + b for a, b in zip(left, right)]
+
+
+def percentile(bounds, histogram, pct, maximum=None):
+    """
+    Estimates a percentile from bucket counts by interpolating linearly
+    inside the bucket that holds the requested rank. Samples in the overflow
+    bucket are assumed to lie between the last bound and `maximum`.
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = total * pct / 100
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower = bounds[index - 1] if index else 0
+            upper = bounds[index] if index < len(bounds) else max(maximum or lower, lower)
+            if maximum is not None:
+                upper = min(upper, maximum)
+            estimate = lower + (upper - lower) * (rank - seen) / count
+            return round(max(estimate, 0), 2)
+        seen += count
+    return maximum
+
+
+class RouteStats:
+    """Running totals and histograms for one (route, status class, window)."""
+
+    __slots__ = (
+        "count", "total_duration_ms", "max_duration_ms", "total_queries", "max_queries",
+        "total_response_bytes", "duration_histogram", "query_histogram", "size_histogram",
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.total_duration_ms = 0.0
+        self.max_duration_ms = 0.0
+        self.total_queries = 0
+        self.max_queries = 0
+        self.total_response_bytes = 0
+        self.duration_histogram = empty_histogram(DURATION_BUCKETS_MS)
+        self.query_histogram = empty_histogram(QUERY_BUCKETS)
+        self.size_histogram = empty_histogram(SIZE_BUCKETS_BYTES)
+
+    def observe(self, duration_ms, queries, response_bytes):
+        self.count += 1
+        self.total_duration_ms += duration_ms
+        self.max_duration_ms = max(self.max_duration_ms, duration_ms)
+        self.total_queries += queries
+        self.max_queries = max(self.max_queries, queries)
+        self.duration_histogram[bucket_index(DURATION_BUCKETS_MS, duration_ms)] += 1
+        self.query_histogram[bucket_index(QUERY_BUCKETS, queries)] += 1
+        if response_bytes is not None:
+            self.total_response_bytes += response_bytes
+            self.size_histogram[bucket_index(SIZE_BUCKETS_BYTES, response_bytes)] += 1
+
+    def combine(self, other):
+        self.count += other.count
+        self.total_duration_ms += other.total_duration_ms
+        self.max_duration_ms = max(self.max_duration_ms, other.max_duration_ms)
+        self.total_queries += other.total_queries
+        self.max_queries = max(self.max_queries, other.max_queries)
+        self.total_response_bytes += other.total_response_bytes
+        self.duration_histogram = merge_histograms(self.duration_histogram, other.duration_histogram)
+        self.query_histogram = merge_histograms(self.query_histogram, other.query_histogram)
+        self.size_histogram = merge_histograms(self.size_histogram, other.size_histogram)
+        return self
+
+    @classmethod
+    def from_metric(cls, metric):
+        stats = cls()
+        for field in cls.__slots__:
+            setattr(stats, field, getattr(metric, field) or getattr(stats, field))
+        return stats
+
+    def apply_to(self, metric):
+        for field in self.__slots__:
+            setattr(metric, field, getattr(self, field))
+
+    def summary(self):
+        duration = {
+            f"p{pct}": percentile(DURATION_BUCKETS_MS, self.duration_histogram, pct, self.max_duration_ms)
+            for pct in PERCENTILES
+        }
+        queries = {
+            f"p{pct}": percentile(QUERY_BUCKETS, self.query_histogram, pct, self.max_queries)
+            for pct in PERCENTILES
+        }
+        sized = sum(self.size_histogram)
+        size = {
+            f"p{pct}": percentile(SIZE_BUCKETS_BYTES, self.size_histogram, pct)
+            for pct in PERCENTILES
+        }
+        return {
+            "count": self.count,
+            "duration_ms": {
+                "avg": round(self.total_duration_ms / self.count, 2) if self.count else None,
+                "max": round(self.max_duration_ms, 2),
+                **duration,
+            },
+            "queries": {
+                "avg": round(self.total_queries / self.count, 2) if self.count else None,
+                "max": self.max_queries,
+                **queries,
+            },
+            "response_bytes": {
+                "avg": round(self.total_response_bytes / sized) if sized else None,
+                **size,
+            },
+        }
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_apirequestlog_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='APIRequestMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10)),
+                ('endpoint', models.CharField(max_length=255)),
+                ('status_class', models.CharField(max_length=3)),
+                ('window_start', models.DateTimeField(db_index=True)),
+                ('count', models.IntegerField(default=0)),
+                ('total_duration_ms', models.FloatField(default=0)),
+                ('max_duration_ms', models.FloatField(default=0)),
+                ('total_queries', models.IntegerField(default=0)),
+                ('max_queries', models.IntegerField(default=0)),
+                ('total_response_bytes', models.BigIntegerField(default=0)),
+                ('duration_histogram', models.JSONField(default=list)),
+                ('query_histogram', models.JSONField(default=list)),
+                ('size_histogram', models.JSONField(default=list)),
+            ],
+            options={
+                'unique_together': {('method', 'endpoint', 'status_class', 'window_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_apirequestmetric'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('branch', models.CharField(max_length=100)),
+                ('payment_method', models.CharField(blank=True, default='', max_length=10)),
+                ('sale_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('new_clients', models.IntegerField(default=0)),
+                ('examinations', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('day', 'branch', 'payment_method')},
+            },
+        ),
+    ]
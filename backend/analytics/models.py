@@ -12,3 +12,48 @@ class APIRequestLog(models.Model):
 
     def __str__(self):
         return f"{self.method} {self.endpoint} ({self.count})"
+
+
+class APIRequestMetric(models.Model):
+    """Latency, query count and response size for one route, status class and time window."""
+    method = models.CharField(max_length=10)
+    endpoint = models.CharField(max_length=255)  # Resolved route template
+    status_class = models.CharField(max_length=3)  # 2xx, 3xx, 4xx, 5xx
+    window_start = models.DateTimeField(db_index=True)
+    count = models.IntegerField(default=0)
+    total_duration_ms = models.FloatField(default=0)
+    max_duration_ms = models.FloatField(default=0)
+    total_queries = models.IntegerField(default=0)
+    max_queries = models.IntegerField(default=0)
+    total_response_bytes = models.BigIntegerField(default=0)
+    # Bucket counts, see analytics.metrics for the bucket bounds
+    duration_histogram = models.JSONField(default=list)
+    query_histogram = models.JSONField(default=list)
+    size_histogram = models.JSONField(default=list)
+
+    class Meta:
+        unique_together = ("method", "endpoint", "status_class", "window_start")
+
+    def __str__(self):
+        return f"{self.method} {self.endpoint} {self.status_class} @ {self.window_start:%Y-%m-%d %H:%M} ({self.count})"
+
+
+class DailyRollup(models.Model):
+    """
+    Per day, branch and payment method totals that AnalyticsView reads
+    instead of scanning the clients tables. Client and examination counts
+    live on the rows with an empty payment_method.
+    """
+    day = models.DateField()
+    branch = models.CharField(max_length=100)
+    payment_method = models.CharField(max_length=10, blank=True, default="")
+    sale_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    new_clients = models.IntegerField(default=0)
+    examinations = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("day", "branch", "payment_method")
+
+    def __str__(self):
+        return f"{self.day} {self.branch} {self.payment_method or '-'}"
@@ -0,0 +1,218 @@
+import abc
+import atexit
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DateTimeField, F, IntegerField, Q, Value, When
+from django.utils.timezone import now
+from .metrics import RouteStats
+from .models import APIRequestLog, APIRequestMetric
+
+logger = logging.getLogger(__name__)
+
+UUID_SEGMENT = re.compile(r"/[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}(?=/|$)")
+
+
+def normalize_endpoint(request):
+    """
+    Returns the route template for the request, e.g.
+    /api/v001/clients/client-info/<uuid:client_id>/, so that one row is kept
+    per endpoint instead of one per client id.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is not None and match.route:
+        return f"/{match.route}"
+    return UUID_SEGMENT.sub("/<uuid>", request.path)
+
+
+class BatchedBuffer(abc.ABC):
+    """
+    In-process aggregation buffer for per-request analytics.
+
+    Samples are merged per key and written out in one transaction when the
+    buffer grows past API_REQUEST_LOG_FLUSH_SIZE samples, when
+    API_REQUEST_LOG_FLUSH_INTERVAL seconds have passed since the last flush,
+    and when the worker exits. Subclasses define how entries merge and how
+    they are written.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.pending_hits = 0
+        self.last_flush = time.monotonic()
+
+    @property
+    def flush_size(self):
+        return getattr(settings, "API_REQUEST_LOG_FLUSH_SIZE", 500)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, "API_REQUEST_LOG_FLUSH_INTERVAL", 30)
+
+    @abc.abstractmethod
+    def new_entry(self):
+        """An empty entry for a key seen for the first time."""
+
+    @abc.abstractmethod
+    def combine(self, entry, other):
+        """Returns `entry` merged with `other`, when a failed write is put back."""
+
+    @abc.abstractmethod
+    def write(self, pending):
+        """Writes the flushed {key: entry} mapping to the database."""
+
+    def push(self, key, update, autoflush=True):
+        """
+        Applies `update` to the entry for `key` and flushes when due. Callers
+        that can't touch the database here (async code) pass autoflush=False
+        and call flush() themselves when this returns True.
+        """
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry is None:
+                entry = self.pending[key] = self.new_entry()
+            update(entry)
+            self.pending_hits += 1
+            due = (
+                self.pending_hits >= self.flush_size
+                or time.monotonic() - self.last_flush >= self.flush_interval
+            )
+        if due and autoflush:
+            self.flush()
+        return due
+
+    def drain(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.pending_hits = 0
+            self.last_flush = time.monotonic()
+        return pending
+
+    def flush(self):
+        pending = self.drain()
+        if not pending:
+            return
+        try:
+            self.write(pending)
+        except Exception:
+            logger.exception("Failed to flush %s, keeping entries for the next flush", type(self).__name__)
+            self.restore(pending)
+
+    def restore(self, pending):
+        with self.lock:
+            for key, entry in pending.items():
+                current = self.pending.get(key)
+                self.pending[key] = entry if current is None else self.combine(current, entry)
+                self.pending_hits += 1
+
+
+class RequestCount:
+    __slots__ = ("count", "last_requested")
+
+    def __init__(self):
+        self.count = 0
+        self.last_requested = None
+
+
+class RequestLogBuffer(BatchedBuffer):
+    """Hit counter per (method, endpoint), written to APIRequestLog."""
+
+    def new_entry(self):
+        return RequestCount()
+
+    def combine(self, entry, other):
+        entry.count += other.count
+        entry.last_requested = max(entry.last_requested, other.last_requested)
+        return entry
+
+    def add(self, method, endpoint, autoflush=True):
+        timestamp = now()
+
+        def update(entry):
+            entry.count += 1
+            entry.last_requested = timestamp
+
+        return self.push((method, endpoint), update, autoflush)
+
+    def write(self, pending):
+        """
+        Upserts every buffered counter in two statements: an INSERT that
+        ignores rows which already exist, then a single UPDATE adding each
+        buffered count with F('count') + n so concurrent workers never
+        overwrite each other's increments.
+        """
+        match_rows = Q()
+        increments = []
+        timestamps = []
+        for (method, endpoint), entry in pending.items():
+            match_rows |= Q(method=method, endpoint=endpoint)
+            increments.append(When(method=method, endpoint=endpoint, then=Value(entry.count)))
+            timestamps.append(When(method=method, endpoint=endpoint, then=Value(entry.last_requested)))
+
+        with transaction.atomic():
+            APIRequestLog.objects.bulk_create(
+                [APIRequestLog(method=method, endpoint=endpoint) for method, endpoint in pending],
+                ignore_conflicts=True,
+            )
+            APIRequestLog.objects.filter(match_rows).update(
+                count=F("count") + Case(*increments, default=Value(0), output_field=IntegerField()),
+                last_requested=Case(*timestamps, default=F("last_requested"), output_field=DateTimeField()),
+            )
+
+
+def window_start(timestamp, window_seconds):
+    epoch = int(timestamp.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % window_seconds, tz=timezone.utc)
+
+
+class RequestMetricsBuffer(BatchedBuffer):
+    """Latency, query count and size histograms per route, status class and window."""
+
+    @property
+    def window_seconds(self):
+        return getattr(settings, "API_METRICS_WINDOW_SECONDS", 3600)
+
+    def new_entry(self):
+        return RouteStats()
+
+    def combine(self, entry, other):
+        return entry.combine(other)
+
+    def add(self, method, endpoint, status_code, duration_ms, queries, response_bytes, autoflush=True):
+        key = (method, endpoint, f"{status_code // 100}xx", window_start(now(), self.window_seconds))
+        return self.push(key, lambda entry: entry.observe(duration_ms, queries, response_bytes), autoflush)
+
+    def write(self, pending):
+        """
+        Merges buffered histograms into their rows. Histograms can't be
+        added with F() expressions, so the rows are locked with
+        select_for_update for the read-merge-write.
+        """
+        match_rows = Q()
+        for method, endpoint, status_class, window in pending:
+            match_rows |= Q(method=method, endpoint=endpoint, status_class=status_class, window_start=window)
+
+        with transaction.atomic():
+            APIRequestMetric.objects.bulk_create(
+                [
+                    APIRequestMetric(method=method, endpoint=endpoint, status_class=status_class, window_start=window)
+                    for method, endpoint, status_class, window in pending
+                ],
+                ignore_conflicts=True,
+            )
+            metrics = list(APIRequestMetric.objects.select_for_update().filter(match_rows))
+            for metric in metrics:
+                key = (metric.method, metric.endpoint, metric.status_class, metric.window_start)
+                RouteStats.from_metric(metric).combine(pending[key]).apply_to(metric)
+            APIRequestMetric.objects.bulk_update(metrics, RouteStats.__slots__)
+
+
+request_log_buffer = RequestLogBuffer()
+request_metrics_buffer = RequestMetricsBuffer()
+atexit.register(request_log_buffer.flush)
+atexit.register(request_metrics_buffer.flush)
@@ -0,0 +1,97 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils.timezone import localtime
+from clients.models import Client, Examination, Sales
+from .models import DailyRollup
+
+
+def bump(day, branch, payment_method="", **deltas):
+    """Adds `deltas` to one rollup row, creating it if needed, without a read."""
+    DailyRollup.objects.bulk_create(
+        [DailyRollup(day=day, branch=branch, payment_method=payment_method)],
+        ignore_conflicts=True,
+    )
+    DailyRollup.objects.filter(day=day, branch=branch, payment_method=payment_method).update(
+        **{field: F(field) + value for field, value in deltas.items()}
+    )
+
+
+def record_client(client, sign=1):
+    bump(localtime(client.created_at).date(), client.branch, new_clients=sign)
+
+
+def record_examination(examination, sign=1):
+    bump(localtime(examination.created_at).date(), examination.client.branch, examinations=sign)
+
+
+def record_sale(sale, sign=1):
+    bump(
+        localtime(sale.created_at).date(),
+        sale.examination.client.branch,
+        sale.payment_method,
+        sale_count=sign,
+        revenue=sale.total_price * sign,
+    )
+
+
+def record_bulk(clients, examinations):
+    """One bump per (day, branch) for bulk-created rows instead of one per row."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for client in clients:
+        deltas[(localtime(client.created_at).date(), client.branch)]["new_clients"] += 1
+    for examination in examinations:
+        deltas[(localtime(examination.created_at).date(), examination.client.branch)]["examinations"] += 1
+    for (day, branch), counts in deltas.items():
+        bump(day, branch, **counts)
+
+
+def rebuild(start=None, end=None):
+    """
+    Recomputes the rollup rows for days in [start, end] (inclusive, both
+    optional) from the source tables. Returns the number of rows written.
+    """
+    def by_day(queryset):
+        queryset = queryset.annotate(day=TruncDate("created_at"))
+        if start:
+            queryset = queryset.filter(day__gte=start)
+        if end:
+            queryset = queryset.filter(day__lte=end)
+        return queryset.order_by()
+
+    rows = defaultdict(lambda: {"sale_count": 0, "revenue": Decimal("0"), "new_clients": 0, "examinations": 0})
+
+    sales = (
+        by_day(Sales.objects)
+        .values("day", "examination__client__branch", "payment_method")
+        .annotate(sale_count=Count("id"), revenue=Sum("total_price"))
+    )
+    for row in sales:
+        key = (row["day"], row["examination__client__branch"], row["payment_method"])
+        rows[key]["sale_count"] = row["sale_count"]
+        rows[key]["revenue"] = row["revenue"] or Decimal("0")
+
+    for row in by_day(Client.objects).values("day", "branch").annotate(total=Count("id")):
+        rows[(row["day"], row["branch"], "")]["new_clients"] = row["total"]
+
+    for row in by_day(Examination.objects).values("day", "client__branch").annotate(total=Count("id")):
+        rows[(row["day"], row["client__branch"], "")]["examinations"] = row["total"]
+
+    stale = DailyRollup.objects.all()
+    if start:
+        stale = stale.filter(day__gte=start)
+    if end:
+        stale = stale.filter(day__lte=end)
+
+    with transaction.atomic():
+        stale.delete()
+        DailyRollup.objects.bulk_create(
+            [
+                DailyRollup(day=day, branch=branch, payment_method=payment_method, **totals)
+                for (day, branch, payment_method), totals in rows.items()
+            ],
+            batch_size=1000,
+        )
+    return len(rows)
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from clients.models import Client, Examination, Sales
+from clients.signals import bulk_created
+from . import rollups
+
+
+# Rollups only follow creations and deletions; edits that move a row to
+# another day, branch or price are picked up by `rebuild_daily_rollups`.
+@receiver(post_save, sender=Client)
+def rollup_client(sender, instance, created, **kwargs):
+    if created:
+        rollups.record_client(instance)
+
+
+@receiver(post_save, sender=Examination)
+def rollup_examination(sender, instance, created, **kwargs):
+    if created:
+        rollups.record_examination(instance)
+
+
+@receiver(post_save, sender=Sales)
+def rollup_sale(sender, instance, created, **kwargs):
+    if created:
+        rollups.record_sale(instance)
+
+
+@receiver(bulk_created)
+def rollup_bulk_created(sender, clients, examinations, **kwargs):
+    rollups.record_bulk(clients, examinations)
+
+
+@receiver(post_delete, sender=Client)
+def unroll_client(sender, instance, **kwargs):
+    rollups.record_client(instance, sign=-1)
+
+
+@receiver(post_delete, sender=Examination)
+def unroll_examination(sender, instance, **kwargs):
+    rollups.record_examination(instance, sign=-1)
+
+
+@receiver(post_delete, sender=Sales)
+def unroll_sale(sender, instance, **kwargs):
+    rollups.record_sale(instance, sign=-1)
@@ -1,3 +1,170 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import resolve, reverse
+from decimal import Decimal
+from rest_framework.test import APITestCase
+from clients.models import Client, Examination, Payment, Sales
+from clients.seeding import seed, seed_staff
+from clients.tests import make_client, make_sale
+from . import benchmark
+from .metrics import DURATION_BUCKETS_MS, RouteStats, empty_histogram, percentile
+from .models import APIRequestLog, APIRequestMetric, DailyRollup
+from .rollups import rebuild
+from .request_buffer import RequestLogBuffer, RequestMetricsBuffer, normalize_endpoint
 
-# Create your tests here.
+
+class RequestLogBufferTests(TestCase):
+    def test_flush_adds_to_existing_counts(self):
+        APIRequestLog.objects.create(method="GET", endpoint="/api/a/", count=3)
+        buffer = RequestLogBuffer()
+        for _ in range(4):
+            buffer.add("GET", "/api/a/")
+        buffer.add("POST", "/api/b/")
+
+        with self.assertNumQueries(4):  # savepoint, insert, update, release
+            buffer.flush()
+
+        counts = dict(APIRequestLog.objects.values_list("endpoint", "count"))
+        self.assertEqual(counts, {"/api/a/": 7, "/api/b/": 1})
+        self.assertEqual(buffer.pending, {})
+
+    @override_settings(API_REQUEST_LOG_FLUSH_SIZE=3)
+    def test_flushes_on_size_threshold(self):
+        buffer = RequestLogBuffer()
+        buffer.add("GET", "/api/a/")
+        buffer.add("GET", "/api/a/")
+        self.assertFalse(APIRequestLog.objects.exists())
+        buffer.add("GET", "/api/a/")
+        self.assertEqual(APIRequestLog.objects.get().count, 3)
+
+
+class NormalizeEndpointTests(TestCase):
+    def test_uses_route_template(self):
+        path = "/api/v001/clients/client-info/3f2b8c1e-1d2a-4b5c-9e8f-0a1b2c3d4e5f/"
+        request = RequestFactory().get(path)
+        request.resolver_match = resolve(path)
+        self.assertEqual(normalize_endpoint(request), "/api/v001/clients/client-info/<uuid:client_id>/")
+
+    def test_collapses_uuids_on_unresolved_paths(self):
+        request = RequestFactory().get("/api/v001/unknown/3f2b8c1e-1d2a-4b5c-9e8f-0a1b2c3d4e5f/")
+        self.assertEqual(normalize_endpoint(request), "/api/v001/unknown/<uuid>/")
+
+
+class PercentileTests(TestCase):
+    def test_interpolates_inside_bucket(self):
+        histogram = empty_histogram(DURATION_BUCKETS_MS)
+        histogram[DURATION_BUCKETS_MS.index(100)] = 10  # ten samples in (50, 100]
+        self.assertEqual(percentile(DURATION_BUCKETS_MS, histogram, 50), 75)
+        self.assertEqual(percentile(DURATION_BUCKETS_MS, histogram, 99, maximum=90), 89.6)
+
+    def test_overflow_bucket_is_capped_by_maximum(self):
+        stats = RouteStats()
+        for duration in (1, 2, 3, 20000):
+            stats.observe(duration, queries=1, response_bytes=10)
+        summary = stats.summary()
+        self.assertEqual(summary["duration_ms"]["max"], 20000)
+        self.assertLessEqual(summary["duration_ms"]["p99"], 20000)
+        self.assertEqual(summary["duration_ms"]["p50"], 3.33)  # three samples spread over (0, 5]
+
+
+class RequestMetricsBufferTests(TestCase):
+    def test_flush_merges_into_existing_window(self):
+        buffer = RequestMetricsBuffer()
+        buffer.add("GET", "/api/a/", 200, 12.0, 3, 500)
+        buffer.flush()
+        buffer.add("GET", "/api/a/", 201, 40.0, 5, 1500)
+        buffer.add("GET", "/api/a/", 404, 2.0, 1, 50)
+        buffer.flush()
+
+        success = APIRequestMetric.objects.get(status_class="2xx")
+        self.assertEqual(success.count, 2)
+        self.assertEqual(success.total_queries, 8)
+        self.assertEqual(success.max_duration_ms, 40.0)
+        self.assertEqual(sum(success.duration_histogram), 2)
+        self.assertEqual(APIRequestMetric.objects.get(status_class="4xx").count, 1)
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class EndpointMetricsViewTests(APITestCase):
+    def test_reports_percentiles_per_route(self):
+        user = get_user_model().objects.create_user(
+            email="admin@example.com", password="secret", first_name="Admin", last_name="User"
+        )
+        self.client.force_authenticate(user)
+        self.client.get(reverse("api-request-logs"))
+
+        response = self.client.get(reverse("endpoint-metrics"))
+        routes = {row["endpoint"]: row for row in response.data["endpoints"]}
+        logged = routes["/api/v001/analytics/request-logs/"]
+        self.assertEqual(logged["count"], 1)
+        self.assertIn("p95", logged["duration_ms"])
+        self.assertEqual(list(logged["status_classes"]), ["2xx"])
+
+
+class DailyRollupTests(TestCase):
+    def populate(self):
+        for index, (branch, method) in enumerate([("Nairobi", "Cash"), ("Nairobi", "Mpesa"), ("Nakuru", "Cash")]):
+            client = make_client(index, branch=branch)
+            examination = Examination.objects.create(client=client)
+            make_sale(examination, payment_method=method, mpesa_transaction_code="ABC123", advance_paid=Decimal("0.00"))
+
+    def snapshot(self):
+        return sorted(DailyRollup.objects.values_list(
+            "day", "branch", "payment_method", "sale_count", "revenue", "new_clients", "examinations"
+        ))
+
+    def test_signals_match_rebuild(self):
+        self.populate()
+        incremental = self.snapshot()
+        rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_deletes_are_rolled_back(self):
+        self.populate()
+        Examination.objects.filter(client__branch="Nakuru").delete()
+        totals = DailyRollup.objects.filter(branch="Nakuru")
+        self.assertEqual(sum(totals.values_list("sale_count", flat=True)), 0)
+        self.assertEqual(sum(totals.values_list("examinations", flat=True)), 0)
+        self.assertEqual(sum(totals.values_list("new_clients", flat=True)), 1)
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class AnalyticsViewTests(APITestCase):
+    def test_reads_from_rollup(self):
+        DailyRollupTests.populate(self)
+        user = get_user_model().objects.create_user(
+            email="admin@example.com", password="secret", first_name="Admin", last_name="User"
+        )
+        self.client.force_authenticate(user)
+
+        data = self.client.get(reverse("analytics")).data
+        self.assertEqual(data["clients_per_branch"][0], {"branch": "Nairobi", "total": 2})
+        self.assertEqual(data["sales_per_branch"][0]["examination__client__branch"], "Nairobi")
+        self.assertEqual(data["sales_per_branch"][0]["revenue"], Decimal("3000.00"))
+        self.assertEqual(
+            {row["payment_method"]: row["count"] for row in data["sales_by_payment_method"]},
+            {"Cash": 2, "Mpesa": 1},
+        )
+        self.assertEqual(data["monthly_sales"][0]["total_sales"], 3)
+
+
+class EndpointBenchmarkTests(TestCase):
+    def test_every_endpoint_runs_and_writes_roll_back(self):
+        seed_staff(3)
+        seed(clients=40, random_seed=1)
+        counts = [model.objects.count() for model in (Client, Examination, Sales, Payment)]
+
+        report = benchmark.run(runs=1)
+        self.assertEqual(report["uncovered"], [])
+        for label, measured in report["endpoints"].items():
+            self.assertLess(measured["status"], 400, label)
+            self.assertGreater(measured["queries"], 0, label)
+        self.assertEqual([model.objects.count() for model in (Client, Examination, Sales, Payment)], counts)
+
+        slower = {"endpoints": {label: dict(measured) for label, measured in report["endpoints"].items()}}
+        slower["endpoints"]["GET clients:all-sales"]["queries"] += 1
+        self.assertEqual(
+            benchmark.compare(report, slower),
+            [("GET clients:all-sales", f"queries {report['endpoints']['GET clients:all-sales']['queries']} -> "
+                                       f"{slower['endpoints']['GET clients:all-sales']['queries']}")],
+        )
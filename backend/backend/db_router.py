@@ -0,0 +1,64 @@
+"""
+Read-replica routing.
+
+Reads go to the "replica" database only inside `read_from_replica()`,
+which `ReplicaReadMixin` enters for GET/HEAD requests on the heavy report
+and listing views. Everything else, and every write, uses "default", so
+a request never reads its own writes from a lagging replica.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.http import HttpResponseBase
+
+REPLICA = "replica"
+
+_use_replica = ContextVar("use_replica", default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def read_from_replica():
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_configured():
+            return REPLICA
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+
+class ReplicaReadMixin:
+    """Serves the view's GET/HEAD requests from the replica when one is configured."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        if getattr(self, "view_is_async", False):
+            return self.replica_dispatch(request, *args, **kwargs)
+        with read_from_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+    async def replica_dispatch(self, request, *args, **kwargs):
+        # sync_to_async copies the context, so ORM calls made on the
+        # executor thread still see the flag
+        with read_from_replica():
+            response = super().dispatch(request, *args, **kwargs)
+            if not isinstance(response, HttpResponseBase):
+                response = await response
+            return response
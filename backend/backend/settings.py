@@ -84,13 +84,57 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite unless DB_ENGINE=postgres. Postgres connections persist for
+# DB_CONN_MAX_AGE seconds with health checks, or come from psycopg's pool
+# when DB_POOL=True (the two are exclusive).
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
+
+def database_settings(prefix):
+    """DATABASES entry from <prefix>_* env vars; a replica's unset values fall back to DB_*."""
+    def setting(name, default='', cast=str):
+        return config(f'{prefix}_{name}', default=config(f'DB_{name}', default=default, cast=cast), cast=cast)
+
+    if DB_ENGINE != 'postgres':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': setting('NAME', default=str(BASE_DIR / 'db.sqlite3')),
+        }
+    options = {}
+    if DB_POOL:
+        options['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': setting('NAME', default='iris'),
+        'USER': setting('USER'),
+        'PASSWORD': setting('PASSWORD'),
+        'HOST': setting('HOST', default='localhost'),
+        'PORT': setting('PORT', default='5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': options,
     }
+
+
+DATABASES = {
+    'default': database_settings('DB'),
 }
 
+# Optional read replica (DB_REPLICA_HOST for Postgres, DB_REPLICA_NAME for a
+# local SQLite copy). Views using backend.db_router.ReplicaReadMixin read
+# from it on GET; everything else, and all writes, use the primary.
+if config('DB_REPLICA_HOST', default='') or config('DB_REPLICA_NAME', default=''):
+    DATABASES['replica'] = {
+        **database_settings('DB_REPLICA'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['backend.db_router.ReadReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -154,7 +198,9 @@ CORS_ALLOW_HEADERS = [
     "content-type",
     "authorization",
     "x-csrftoken",
+    "idempotency-key",
 ]
+CORS_EXPOSE_HEADERS = ["idempotent-replayed"]
 
 CORS_ALLOW_METHODS = (
     "DELETE",
@@ -185,6 +231,28 @@ SIMPLE_JWT = {
     "TOKEN_OBTAIN_SERIALIZER": "users.serializers.CustomTokenObtainPairSerializer",
 }
 
+# Seconds an authenticated request's UserAccount stays cached per token
+# (0 disables). Saving or deleting the user invalidates it.
+JWT_USER_CACHE_SECONDS = 60
+
+# Per-process memory cache unless REDIS_URL points at a Redis shared by all
+# workers, which also makes user invalidation reach every worker at once
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Trust the name/role claims in access tokens (StatelessJWTAuthentication)
+# instead of loading the user. Needs the shared cache: a deactivated or
+# deleted user is only refused on workers that see the change mark.
+JWT_STATELESS_CLAIMS = config('JWT_STATELESS_CLAIMS', default=bool(REDIS_URL), cast=bool)
+# Seconds a token's claims are trusted after they were read (capped at ACCESS_TOKEN_LIFETIME)
+JWT_CLAIMS_MAX_AGE_SECONDS = 300
+
 
 # RESTFRAMEWORK settings
 REST_FRAMEWORK = {
@@ -194,8 +262,54 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated", 
     ],
+    # ?format=compact sends list rows as arrays under one column header
+    "DEFAULT_RENDERER_CLASSES": [
+        "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        "clients.api.renderers.CompactJSONRenderer",
+    ],
 }
 
+# Opt-in keyset pagination (?page_size=<n> / ?cursor=<token>) on list endpoints
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+# Default number of ranked matches returned by client search (?limit=<n> overrides)
+CLIENT_SEARCH_LIMIT = 50
+
+# Registration numbers each worker reserves per counter update, and how long it caches branch codes
+REG_NO_BLOCK_SIZE = 20
+BRANCH_CODE_CACHE_SECONDS = 300
+
+# SMS notifications are queued in clients.OutboxMessage and sent by `manage.py process_sms_outbox --loop`
+SMS_GATEWAY = config('SMS_GATEWAY', default='clients.sms.ConsoleGateway')  # clients.sms.AfricasTalkingGateway in production
+SMS_BATCH_SIZE = 100  # recipients per gateway call
+SMS_RATE_LIMIT_PER_SECOND = 5  # gateway calls per second
+SMS_MAX_ATTEMPTS = 5
+SMS_RETRY_BASE_SECONDS = 30  # doubled after every failed attempt
+SMS_LEASE_SECONDS = 300  # a claimed message is sent again if its worker hasn't recorded it by then
+
+# API request log buffering: flush after this many hits or seconds, whichever comes first
+API_REQUEST_LOG_FLUSH_SIZE = 500
+API_REQUEST_LOG_FLUSH_INTERVAL = 30
+# Width of the time windows that endpoint latency histograms are bucketed into
+API_METRICS_WINDOW_SECONDS = 3600
+
+# SystemInfo reads samples taken by a background thread every SYSTEM_SAMPLE_INTERVAL seconds
+SYSTEM_SAMPLE_INTERVAL = 5
+SYSTEM_SAMPLE_HISTORY_MINUTES = 60
+
+# Seconds the admin dashboard counts stay cached; writes to counted models clear them
+DASHBOARD_SUMMARY_CACHE_TTL = 60
+
+# Seconds a rendered receipt stays cached (edits render a new copy anyway),
+# and the widest date range one receipt ZIP may cover
+RECEIPT_CACHE_SECONDS = 60 * 60 * 24
+RECEIPT_BATCH_MAX_DAYS = 31
+
+# Seconds a response to a request sent with an Idempotency-Key header is
+# replayed to retries; `manage.py purge_idempotency_keys` deletes older ones
+IDEMPOTENCY_KEY_TTL_SECONDS = 60 * 60 * 24
+
 #  Cookies configs
 AUTH_COOKIE = 'access'
 AUTH_COOKIE_ACCESS_MAX_AGE = 60 * 60 * 1
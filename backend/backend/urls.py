@@ -4,6 +4,7 @@ from django.shortcuts import redirect
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
+from administration.views import liveness
 
 
 # Configs for API Documentation
@@ -26,6 +27,9 @@ urlpatterns = [
     # API Documentation Endpoints
     path('dev-doc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     
+    # Liveness probe, kept outside /api/ so the request logger skips it too
+    path('healthz/', liveness, name='liveness'),
+
     # API Endpoints
     path('admin/', admin.site.urls),
     path('api/v001/admin-f/', include('administration.api.urls')), # Administration app routes
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Client, Examination,Sales, Branch
+from .models import Client, Examination,Sales, Branch, OutboxMessage, RegistrationCounter
 
 
 @admin.register(Branch)
@@ -35,3 +35,18 @@ class SalesAdmin(admin.ModelAdmin):
         return f"{obj.examination.client.first_name} {obj.examination.client.last_name}"
 
     get_client_name.short_description = "Client Name"
+
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('phone_number', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    search_fields = ('phone_number', 'message')
+    list_filter = ('status',)
+    ordering = ('-created_at',)
+
+
+@admin.register(RegistrationCounter)
+class RegistrationCounterAdmin(admin.ModelAdmin):
+    list_display = ('branch_code', 'year', 'month', 'last_value')
+    list_filter = ('branch_code', 'year')
@@ -0,0 +1,159 @@
+"""
+Read-only fast path for the hot list endpoints.
+
+`PlainSerializer` compiles a ModelSerializer (after ?fields= pruning) into
+a list of (name, value paths, transform) once per request. Rows are then
+read with `.values()` and turned into dicts by those transforms. No model
+instances are built and no DRF field machinery runs per row. Each
+transform reproduces the DRF field's `to_representation`, so the rendered
+JSON is byte-for-byte what the ModelSerializer gives (clients.tests
+checks this). SerializerMethodFields name their equivalent in the
+serializer's `plain_fields`. Nested lists (ClientSerializer.examinations)
+are read with one more `.values()` query per page.
+
+`PlainList` picks this path when the serializer supports it. It falls
+back to the ModelSerializer otherwise, for example for ?expand=.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+
+
+def uuid_string(value):
+    return str(value)
+
+
+def iso_date(value):
+    return value.isoformat()
+
+
+def field_transform(field):
+    """A one-argument stand-in for `field.to_representation`, for non-None values."""
+    if isinstance(field, (serializers.UUIDField, PrimaryKeyRelatedField)):
+        return uuid_string
+    if (
+        isinstance(field, serializers.DecimalField)
+        and getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+        and not field.localize and not getattr(field, "normalize_output", False)
+    ):
+        exponent = Decimal(1).scaleb(-field.decimal_places)
+
+        def decimal_string(value):
+            if isinstance(value, Decimal) and value.as_tuple().exponent == exponent.as_tuple().exponent:
+                return f"{value:f}"
+            return field.to_representation(value)
+        return decimal_string
+    if isinstance(field, serializers.DateTimeField):
+        return field.to_representation
+    if (
+        isinstance(field, serializers.DateField)
+        and getattr(field, "format", api_settings.DATE_FORMAT) == ISO_8601
+    ):
+        return iso_date
+    if isinstance(field, serializers.ChoiceField):
+        lookup = field.choice_strings_to_values
+        return lambda value: lookup.get(str(value), value) if value != "" else value
+    if isinstance(field, serializers.CharField):
+        return str
+    if isinstance(field, serializers.BooleanField):
+        return bool
+    if isinstance(field, serializers.IntegerField):
+        return int
+    if isinstance(field, serializers.FloatField):
+        return float
+    return field.to_representation
+
+
+class PlainSerializer:
+    def __init__(self, serializer):
+        self.serializer = serializer
+        self.model = serializer.Meta.model
+        self.columns = []   # (name, paths, transform, combine)
+        self.nested = []    # (name, PlainSerializer, reverse accessor's FK name)
+        plain_fields = getattr(serializer, "plain_fields", {})
+        for name, field in serializer.fields.items():
+            if name in plain_fields:
+                paths, combine = plain_fields[name]
+                self.columns.append((name, paths, None, combine))
+            elif isinstance(field, serializers.ListSerializer):
+                relation = self.model._meta.get_field(field.source.split(".")[0])
+                self.nested.append((name, PlainSerializer(field.child), relation.field.name))
+            elif isinstance(field, serializers.BaseSerializer) or field.source == "*":
+                raise ImproperlyConfigured(f"{type(serializer).__name__}.{name} has no plain equivalent.")
+            else:
+                path = field.source.replace(".", "__")
+                self.columns.append((name, (path,), field_transform(field), None))
+        self.paths = ["pk", *(path for _, paths, _, _ in self.columns for path in paths)]
+        # Nested lists are filled in last; this keeps them at their place in the field order
+        self.template = dict.fromkeys(serializer.fields) if self.nested else {}
+
+    @classmethod
+    def supports(cls, serializer):
+        plain_fields = getattr(serializer, "plain_fields", {})
+        for name, field in serializer.fields.items():
+            if name in plain_fields:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                if not cls.supports(field.child):
+                    return False
+            elif isinstance(field, serializers.BaseSerializer) or field.source == "*":
+                return False
+        return True
+
+    def values(self, queryset, *extra):
+        # Prefetches don't apply to values(); nested lists are read by serialize()
+        return queryset.prefetch_related(None).values(*dict.fromkeys([*self.paths, *extra]))
+
+    def serialize(self, rows):
+        rows = list(rows)
+        data = []
+        for row in rows:
+            item = self.template.copy()
+            for name, paths, transform, combine in self.columns:
+                if combine is not None:
+                    item[name] = combine(*(row[path] for path in paths))
+                else:
+                    value = row[paths[0]]
+                    item[name] = None if value is None else transform(value)
+            data.append(item)
+        for name, child, parent_field in self.nested:
+            children = defaultdict(list)
+            queryset = child.model._default_manager.filter(**{f"{parent_field}__in": [row["pk"] for row in rows]})
+            child_rows = list(child.values(queryset, parent_field))
+            for child_row, child_item in zip(child_rows, child.serialize(child_rows)):
+                children[child_row[parent_field]].append(child_item)
+            for row, item in zip(rows, data):
+                item[name] = children.get(row["pk"], [])
+        return data
+
+
+class PlainList:
+    """
+    Serializes a list endpoint's rows with PlainSerializer when
+    `serializer_class` (with the request's ?fields=/?expand=) allows it, or
+    with the ModelSerializer otherwise. Pass the queryset through
+    `queryset()` before paginating and the rows through `data()`.
+    """
+
+    def __init__(self, serializer_class, request):
+        self.serializer_class = serializer_class
+        self.context = {"request": request}
+        serializer = serializer_class(context=self.context)
+        self.plain = PlainSerializer(serializer) if PlainSerializer.supports(serializer) else None
+
+    def queryset(self, queryset):
+        if not self.plain:
+            return queryset
+        # Keyset pagination reads the ordering columns off each row
+        return self.plain.values(queryset, *getattr(self.serializer_class, "always_load", ()))
+
+    def data(self, rows):
+        if self.plain:
+            return self.plain.serialize(rows)
+        return self.serializer_class(rows, many=True, context=self.context).data
+
+    def pk(self, row):
+        return row["pk"] if self.plain else row.pk
@@ -0,0 +1,59 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+# Where list endpoints put their rows: a bare list, or one of these keys
+ROW_KEYS = ("results", "d", "data")
+
+
+def columnar(rows):
+    """[{"a": 1, "b": 2}, ...] -> {"columns": ["a", "b"], "rows": [[1, 2], ...]}"""
+    columns = list(rows[0]) if rows else []
+    return {"columns": columns, "rows": [[row.get(column) for column in columns] for row in rows]}
+
+
+def is_rows(value):
+    return isinstance(value, list) and all(isinstance(row, dict) for row in value)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer's output, written by orjson. Dates, times and anything
+    else orjson doesn't handle the way DRF does go through DRF's encoder,
+    so the bytes match. Indented output (the browsable API) uses
+    JSONRenderer itself.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}) or not api_settings.UNICODE_JSON:
+            return super().render(data, accepted_media_type, renderer_context)
+        encoder = JSONEncoder()
+        ret = orjson.dumps(data, default=encoder.default, option=ORJSON_OPTIONS)
+        # JSONRenderer escapes these two so the output is also valid JavaScript
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+        return ret
+
+
+class CompactJSONRenderer(ORJSONRenderer):
+    """
+    `?format=compact`: list responses send each row as an array under one
+    shared "columns" header instead of repeating every key per row. Nested
+    values and non-list responses are rendered as plain JSON.
+    """
+    format = "compact"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if is_rows(data):
+            data = columnar(data)
+        elif isinstance(data, dict):
+            data = {
+                key: columnar(value) if key in ROW_KEYS and is_rows(value) else value
+                for key, value in data.items()
+            }
+        return super().render(data, accepted_media_type, renderer_context)
@@ -1,16 +1,29 @@
 # api/serializers.py
+from decimal import Decimal
 from rest_framework import serializers
-from ..models import Client, Examination, Sales, Branch
+from django.db import transaction
+from ..models import Client, Examination, Payment, Sales, Branch
+from ..services import PaymentRejected, create_sale, record_payment, update_sale
+from .sparse import SparseFieldsMixin
 
 class BranchSerializer(serializers.ModelSerializer):
     class Meta:
         model = Branch
         fields = ['id', 'name', 'code']
 
-class ExaminationSerializer(serializers.ModelSerializer):
+class ExaminationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     client_name = serializers.SerializerMethodField()
     client_reg_no = serializers.CharField(source='client.reg_no', read_only=True)
     registered_by = serializers.CharField(source='client.registered_by', read_only=True)
+
+    field_sources = {"client_name": ("client__first_name", "client__last_name")}
+    # clients.api.plain equivalents of the method fields: (value paths, combine)
+    plain_fields = {
+        "client_name": (("client__first_name", "client__last_name"), lambda first, last: f"{first} {last}"),
+    }
+    expandable_fields = {
+        "client": (lambda: ClientSerializer(fields=CLIENT_SUMMARY_FIELDS, read_only=True), "client"),
+    }
     
     class Meta:
         model = Examination
@@ -46,11 +59,15 @@ class ClientRegistrationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 # api/serializers.py (partial)
-class SalesSerializer(serializers.ModelSerializer):
+class SalesSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     examination = serializers.PrimaryKeyRelatedField(
-        queryset=Examination.objects.all(),
+        queryset=Examination.objects.select_related("client"),
     )
 
+    expandable_fields = {
+        "examination": (lambda: ExaminationSerializer(read_only=True), "examination__client"),
+    }
+
     class Meta:
         model = Sales
         fields = '__all__'
@@ -70,46 +87,92 @@ class SalesSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """Override create to handle payment logic."""
-        instance = Sales.objects.create(**validated_data)
-        instance.save()
-        return instance
+        try:
+            return create_sale(validated_data)
+        except PaymentRejected as error:
+            raise serializers.ValidationError({"mpesa_transaction_code": str(error)})
 
     def update(self, instance, validated_data):
-        """Override update for balance payment logic."""
-        if instance.balance_due == 0:
-            raise serializers.ValidationError({"error": "Sale is already fully paid. No further payments allowed."})
-
-        amount_paid = validated_data.get("advance_paid", 0)
-        if amount_paid > instance.balance_due:
-            raise serializers.ValidationError({
-                "error": f"Payment exceeds the remaining balance due. Please pay the exact balance amount {instance.balance_due} or less."
-            })
-
-        if amount_paid > 0:
-            instance.advance_paid += amount_paid
-            instance.balance_due -= amount_paid
-            if instance.balance_due <= 0:
-                instance.balance_due = 0
-                instance.balance_payment_status = "Paid"
-                instance.order_paid = "Paid"
-            else:
-                instance.balance_payment_status = "Partially Paid"
-                instance.order_paid = "Partially Paid"
-
-        for attr, value in validated_data.items():
-            if attr != "advance_paid":
-                setattr(instance, attr, value)
-
-        instance.save()
+        """
+        A non-zero advance_paid is posted to the payment ledger, with the
+        method and M-Pesa code sent alongside it; the other fields are
+        applied to the locked row by clients.services.update_sale.
+        """
+        received_by = validated_data.pop("received_by", instance.served_by)
+        amount_paid = validated_data.pop("advance_paid", None)
+        with transaction.atomic():
+            if amount_paid:
+                # These describe the payment; the sale keeps its advance's
+                method = validated_data.pop("advance_payment_method", None)
+                mpesa_transaction_code = validated_data.pop("mpesa_transaction_code", None)
+                try:
+                    _, instance = record_payment(
+                        instance.pk, amount_paid,
+                        method=method or instance.payment_method,
+                        received_by=received_by,
+                        mpesa_transaction_code=mpesa_transaction_code,
+                    )
+                except PaymentRejected as error:
+                    raise serializers.ValidationError({"error": str(error)})
+            if validated_data:
+                instance = update_sale(instance, validated_data)
         return instance
 
-class ClientSerializer(serializers.ModelSerializer):
+
+class PaymentSerializer(serializers.ModelSerializer):
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0.01"))
+
+    class Meta:
+        model = Payment
+        fields = ["id", "sale", "amount", "method", "mpesa_transaction_code", "received_by", "created_at"]
+        read_only_fields = ["id", "sale", "received_by", "created_at"]
+
+    def validate(self, data):
+        if data.get("method") == "Mpesa" and not data.get("mpesa_transaction_code"):
+            raise serializers.ValidationError({"mpesa_transaction_code": "M-Pesa transaction code is required for M-Pesa payments."})
+        return data
+
+    def create(self, validated_data):
+        """Posts the payment through the ledger; pass sale_id and received_by to save()."""
+        try:
+            payment, _ = record_payment(
+                validated_data["sale_id"], validated_data["amount"],
+                method=validated_data.get("method", "Cash"),
+                received_by=validated_data["received_by"],
+                mpesa_transaction_code=validated_data.get("mpesa_transaction_code"),
+            )
+        except PaymentRejected as error:
+            raise serializers.ValidationError({"error": str(error)})
+        return payment
+
+# What ?expand=client nests in an examination
+CLIENT_SUMMARY_FIELDS = ["id", "reg_no", "first_name", "last_name", "phone_number", "balance", "latest_sales_id"]
+
+
+class ClientSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     examinations = ExaminationSerializer(many=True, read_only=True, source="examinations.all")
     latest_examination_id = serializers.SerializerMethodField()
     balance = serializers.SerializerMethodField()
     payment_status = serializers.SerializerMethodField()
     latest_sales_id = serializers.SerializerMethodField()
 
+    # examinations and latest_examination_id come from prepare()'s prefetch and annotation
+    field_sources = {
+        "examinations": (),
+        "latest_examination_id": (),
+        "balance": ("outstanding_balance",),
+        "payment_status": ("outstanding_balance",),
+        "latest_sales_id": ("latest_sale",),
+    }
+    plain_fields = {
+        "latest_examination_id": (("latest_exam_pk",), lambda pk: str(pk) if pk else None),
+        "balance": (("outstanding_balance",), float),
+        "payment_status": (
+            ("outstanding_balance",), lambda balance: "fully_paid" if balance == 0 else "pending_balance"
+        ),
+        "latest_sales_id": (("latest_sale",), lambda pk: str(pk) if pk else None),
+    }
+
     class Meta:
         model = Client
         fields = [
@@ -118,18 +181,45 @@ class ClientSerializer(serializers.ModelSerializer):
             "balance", "payment_status", "latest_sales_id"  # Added latest_sales_id here
         ]
 
+    # The getter prefers the annotation added by Client.objects.for_listing()
+    # and only falls back to a query for un-annotated instances.
     def get_latest_examination_id(self, obj):
-        latest_exam = obj.examinations.order_by("-examination_date").first()
+        if hasattr(obj, "latest_exam_pk"):
+            return str(obj.latest_exam_pk) if obj.latest_exam_pk else None
+        latest_exam = obj.examinations.order_by("-examination_date", "-created_at").first()
         return str(latest_exam.id) if latest_exam else None
 
+    # Balance and latest sale are columns maintained by clients.balances
     def get_balance(self, obj):
-        sales = Sales.objects.filter(examination__client=obj, balance_due__gt=0)
-        return float(sum(sale.balance_due for sale in sales)) if sales.exists() else 0.0
+        return float(obj.outstanding_balance)
 
     def get_payment_status(self, obj):
-        balance = self.get_balance(obj)
-        return "fully_paid" if balance == 0 else "pending_balance"
+        return "fully_paid" if obj.outstanding_balance == 0 else "pending_balance"
 
     def get_latest_sales_id(self, obj):
-        latest_sale = Sales.objects.filter(examination__client=obj).order_by("-created_at").first()
-        return str(latest_sale.id) if latest_sale else None
\ No newline at end of file
+        return str(obj.latest_sale_id) if obj.latest_sale_id else None
+
+    @classmethod
+    def prepare(cls, queryset, request):
+        """Client.objects.for_listing(), minus what the requested fields don't show."""
+        fields, _ = cls.requested_fields(request)
+        queryset = super().prepare(queryset, request)
+        if fields is None or "latest_examination_id" in fields:
+            queryset = queryset.with_latest_exam()
+        if fields is None or "examinations" in fields:
+            queryset = queryset.with_examinations()
+        return queryset
+
+
+class BulkBookingSerializer(serializers.Serializer):
+    client_ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=500)
+
+    def validate(self, data):
+        """Loads every client in one query; validated_data["clients"] keeps the request order."""
+        client_ids = list(dict.fromkeys(data["client_ids"]))  # drop repeats
+        clients = Client.objects.only("id", "first_name", "phone_number", "branch").in_bulk(client_ids)
+        missing = [str(client_id) for client_id in client_ids if client_id not in clients]
+        if missing:
+            raise serializers.ValidationError({"client_ids": [f"Unknown clients: {', '.join(missing)}"]})
+        data["clients"] = [clients[client_id] for client_id in client_ids]
+        return data
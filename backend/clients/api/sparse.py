@@ -0,0 +1,98 @@
+"""
+Sparse fieldsets for the clients API serializers.
+
+`?fields=id,first_name,balance` limits a response to the named fields and
+`?expand=examination` swaps a related id for the nested object, where the
+serializer offers that. Fields that are left out are dropped from the
+serializer before anything is rendered, so their getters never run. The
+view's queryset goes through `prepare()`, which loads only the columns
+(`only()`) and relations (`select_related`) the remaining fields read.
+Without either parameter, responses are unchanged.
+"""
+from functools import cache
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+
+def requested(request, param):
+    value = request.query_params.get(param) if request is not None else None
+    if not value:
+        return None
+    return list(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+
+
+@cache
+def declared_fields(serializer_class):
+    return {name: field.source for name, field in serializer_class().fields.items()}
+
+
+class SparseFieldsMixin:
+    """
+    For ModelSerializers. Pass `context={"request": request}` (or `fields=`
+    and `expand=` directly) and build the queryset with `prepare()`.
+    """
+    # Model paths a field reads, for fields whose `source` doesn't say so
+    # (method fields, nested lists); () for fields that read no column
+    field_sources = {}
+    # name -> (factory returning the nested serializer, relation to select_related)
+    expandable_fields = {}
+    # Columns always loaded: the primary key and the keyset pagination ordering
+    always_load = ("id", "created_at")
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            fields, expand = self.requested_fields(self.context.get("request"))
+        for name in expand or ():
+            self.fields[name] = self.expandable_fields[name][0]()
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - set(expand or ()):
+                self.fields.pop(name)
+
+    @classmethod
+    def requested_fields(cls, request):
+        """The ?fields= (None for all) and ?expand= names, checked against the serializer."""
+        fields, expand = requested(request, FIELDS_PARAM), requested(request, EXPAND_PARAM) or []
+        if fields is None and not expand:
+            return None, []
+        unknown = set(fields or ()) - set(declared_fields(cls))
+        if unknown:
+            raise ValidationError({FIELDS_PARAM: f"Unknown field(s): {', '.join(sorted(unknown))}."})
+        unknown = set(expand) - set(cls.expandable_fields)
+        if unknown:
+            raise ValidationError({EXPAND_PARAM: f"Can't expand: {', '.join(sorted(unknown))}."})
+        return fields, expand
+
+    @classmethod
+    def field_paths(cls, name):
+        if name in cls.field_sources:
+            return cls.field_sources[name]
+        source = declared_fields(cls)[name]
+        return () if source == "*" else (source.replace(".", "__"),)
+
+    @classmethod
+    def prepare(cls, queryset, request):
+        """Narrows `queryset` to what the requested fields read."""
+        fields, expand = cls.requested_fields(request)
+        expanded = [cls.expandable_fields[name][1] for name in expand]
+        if fields is None:
+            return queryset.select_related(*expanded) if expanded else queryset
+
+        whole = {relation.split("__")[0] for relation in expanded}
+        columns, related = set(cls.always_load), set(expanded)
+        for name in [*fields, *expand]:
+            for path in cls.field_paths(name):
+                relation, _, _ = path.rpartition("__")
+                if path.split("__")[0] in whole:
+                    # An expanded relation is loaded whole
+                    path = path.split("__")[0]
+                elif relation:
+                    related.add(relation)
+                columns.add(path)
+        # select_related() without names would follow every relation
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
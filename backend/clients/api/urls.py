@@ -6,14 +6,18 @@ RegisterClientExaminationView,
 RetrievAllExaminations, 
 RetrieveClientExaminations,
 BookExistingCientForExamination, 
-SearchClientView, SalesView, 
+BulkBookExaminationsView,
+SearchClientView, SalesView, PayBalanceView,
 SearchClientBalanceView,
 PendingExaminationsView,
 BranchListAPIView,
 GetBookedClientForSalesAPIView,
 GenerateReceiptView,
+ReceiptBatchView,
 RetrieveClientView,
-SingleClientInfoView
+SingleClientInfoView,
+ClientImportView,
+ExportView
 )
 
 app_name = "clients"
@@ -31,13 +35,14 @@ urlpatterns = [
     path('examinations/', RetrievAllExaminations.as_view(), name="all_examinations"),
     path('examinations/<uuid:id>/', RetrieveClientExaminations.as_view(), name="client_examinations"),
     path('examination/<uuid:id>/book/', BookExistingCientForExamination.as_view(), name="book_existing_client"),
+    path('examinations/book/', BulkBookExaminationsView.as_view(), name="bulk_book_examinations"),
     path('examinations/pending/', PendingExaminationsView.as_view(), name="pending_examinations"),
 
     # Sales & Payment
     path('sales/', SalesView.as_view(), name='all-sales'), 
     path('sales/create/', SalesView.as_view(), name='create-sales'),
     path('sales/<uuid:sales_id>/', SalesView.as_view(), name='get-sales'),
-    path('sales/<uuid:sales_id>/pay-balance/', SalesView.as_view(), name='update-client-sale-balance'),
+    path('sales/<uuid:sales_id>/pay-balance/', PayBalanceView.as_view(), name='update-client-sale-balance'),
     path('sales/search-client-balance/', SearchClientBalanceView.as_view(), name='search-client-balance'),
     
     ## this missing urls tomatch the localhost:3000/clients
@@ -46,8 +51,13 @@ urlpatterns = [
     path('clients/search-client/', views.SearchClientView.as_view(), name='search-client'),
     ## branches view
 
+    # Bulk import / streaming export
+    path('import/', ClientImportView.as_view(), name='import-clients'),
+    path('export/<str:resource>/', ExportView.as_view(), name='export'),
+
     # Generate Receipt
     path("sales/generate-receipt/<uuid:sales_id>/", GenerateReceiptView.as_view(), name="generate-receipt"),
+    path("sales/receipts/", ReceiptBatchView.as_view(), name="receipt-batch"),
 
     # Search Endpoints
     path('search-booked-for-sales/', GetBookedClientForSalesAPIView.as_view(), name='get-booked-client-for-sales'),
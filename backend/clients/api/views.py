@@ -1,20 +1,40 @@
+from datetime import date
+from django.conf import settings
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
-from django.shortcuts import get_object_or_404
-from ..models import Client, Examination, Sales, Branch
-from .serializers import ClientRegistrationSerializer, ExaminationSerializer, SalesSerializer, BranchSerializer
-from datetime import date
-from django.db.models import Q
+from adrf.views import APIView as AsyncAPIView
+from asgiref.sync import sync_to_async
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.renderers import BrowsableAPIRenderer
+from backend.db_router import ReplicaReadMixin
+from users.authentication import StatelessJWTAuthentication
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from ..models import Client, Examination, Payment, Sales, Branch
+from .serializers import ClientRegistrationSerializer, ExaminationSerializer, SalesSerializer, BranchSerializer, BulkBookingSerializer, PaymentSerializer
+from .pagination import KeysetCursorPagination
+from .plain import PlainList
+from .renderers import CompactJSONRenderer, ORJSONRenderer
+from ..search import search_client_ids, search_limit
+from ..bulk import EXPORTS, IMPORT_FORMATS, guess_format, import_clients, export_rows
+from ..receipts import RECEIPT_QUERYSET, RENDERERS, astream_receipts_zip, get_receipt, receipt_data, receipt_filename, stream_receipts_zip
+from ..conditional import branch_list_version, client_version, conditional, examinations_version, receipt_version, sale_version
+from ..idempotency import idempotent
+from ..services import book_examination, book_examinations, complete_examination, register_client
 # added this line for cleint please look in to it 
 from .serializers import ClientSerializer
 
+# The hot list endpoints serialize through clients.api.plain and render with orjson
+LIST_RENDERERS = [ORJSONRenderer, BrowsableAPIRenderer, CompactJSONRenderer]
 
 
 class BranchListAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
     
+    @conditional(branch_list_version)
     def get(self, request, *args, **kwargs):
         branches = Branch.objects.all()
         serializer = BranchSerializer(branches, many=True)
@@ -24,14 +44,14 @@ class BranchListAPIView(APIView):
 
 class RegisterClientView(APIView):
     permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
     
     def post(self, request, *args, **kwargs):
         receptionist_name = f"{request.user.first_name} {request.user.last_name}"
         serializer = ClientRegistrationSerializer(data=request.data)
         
         if serializer.is_valid():
-            serializer.save(registered_by=receptionist_name) 
-            Examination.objects.create(client=serializer.instance)
+            register_client(serializer, receptionist_name)
             return Response(
                 {
                     "message": "client registered",
@@ -46,16 +66,14 @@ class RegisterClientView(APIView):
 
 class RegisterClientExaminationView(APIView):
     permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
     
     def post(self, request, id, *args, **kwargs):
         examination = get_object_or_404(Examination, id=id) 
         examined_by = f"Dr. {request.user.first_name} {request.user.last_name}"
         serializer = ExaminationSerializer(examination, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save(examined_by=examined_by, state="Completed")
-            client = examination.client
-            client.last_examination_date = date.today()
-            client.save()
+            complete_examination(serializer, examined_by)
             return Response(
                 {
                     "message": "Examination added successfully",
@@ -66,33 +84,42 @@ class RegisterClientExaminationView(APIView):
         return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class RetrievAllExaminations(APIView):
+class RetrievAllExaminations(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+    renderer_classes = LIST_RENDERERS
     
     def get(self, request, *args, **kwargs):
-        examinations = Examination.objects.all()
-        serializer = ExaminationSerializer(examinations, many=True)
-        return Response({"d": serializer.data}, status=status.HTTP_200_OK)
+        listing = PlainList(ExaminationSerializer, request)
+        examinations = listing.queryset(
+            ExaminationSerializer.prepare(Examination.objects.select_related("client"), request)
+        )
+        paginator = KeysetCursorPagination()
+        page = paginator.paginate_queryset(examinations, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(listing.data(page))
+        return Response({"d": listing.data(examinations)}, status=status.HTTP_200_OK)
 
 
 class RetrieveClientExaminations(APIView):
     permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
     
+    @conditional(examinations_version)
     def get(self, request, id, *args, **kwargs):
         client = get_object_or_404(Client, id=id)
-        examinations = client.examinations.all()
-        serializer = ExaminationSerializer(examinations, many=True)
+        examinations = ExaminationSerializer.prepare(client.examinations.all(), request)
+        serializer = ExaminationSerializer(examinations, many=True, context={"request": request})
         return Response({"d": serializer.data}, status=status.HTTP_200_OK)
 
 
 class BookExistingCientForExamination(APIView):
     permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
     
     def post(self, request, id, *args, **kwargs):
         client = get_object_or_404(Client, id=id)
-        Examination.objects.create(client=client)
-        client.visit_count += 1
-        client.save()
+        book_examination(client)
         return Response(
             {
                 "message": "Client booked for examination",
@@ -102,64 +129,108 @@ class BookExistingCientForExamination(APIView):
         )
 
 
-class GetBookedClientForSalesAPIView(APIView):
+class BulkBookExaminationsView(APIView):
+    """Books a group of existing clients (`client_ids`) for examinations in one request."""
     permission_classes = [IsAuthenticated]
-    
-    def get(self, request):
-        search_query = request.query_params.get("search", "").strip()
+    authentication_classes = [StatelessJWTAuthentication]
 
-        if search_query:
-            booked_clients = Examination.objects.filter(
-                booked_for_sales=True
-            ).filter(
-                Q(client__first_name__icontains=search_query) |  
-                Q(client__reg_no__icontains=search_query)  
-            )
-        else:
-            booked_clients = Examination.objects.filter(booked_for_sales=True)
+    def post(self, request, *args, **kwargs):
+        serializer = BulkBookingSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({"error": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        examinations = book_examinations(serializer.validated_data["clients"])
+        return Response(
+            {
+                "message": f"{len(examinations)} clients booked for examination",
+                "examinations": [str(examination.id) for examination in examinations],
+            },
+            status=status.HTTP_201_CREATED
+        )
 
-        serializer = ExaminationSerializer(booked_clients, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
 
+class GetBookedClientForSalesAPIView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+    renderer_classes = LIST_RENDERERS
+    
+    async def get(self, request):
+        search_query = request.query_params.get("search", "").strip()
 
-class SearchClientView(APIView):
+        booked_clients = Examination.objects.select_related("client").filter(booked_for_sales=True)
+        if search_query:
+            # Only clients booked for sales compete for the search limit
+            booked = Client.objects.filter(id__in=booked_clients.values("client_id"))
+            client_ids = await sync_to_async(search_client_ids)(search_query, search_limit(request), booked)
+            booked_clients = booked_clients.filter(client__id__in=client_ids)
+        listing = PlainList(ExaminationSerializer, request)
+        booked_clients = listing.queryset(ExaminationSerializer.prepare(booked_clients, request))
+
+        paginator = KeysetCursorPagination()
+        page = await paginator.apaginate_queryset(booked_clients, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(listing.data(page))
+        booked_clients = [examination async for examination in booked_clients]
+        return Response(listing.data(booked_clients), status=status.HTTP_200_OK)
+
+
+class SearchClientView(ReplicaReadMixin, AsyncAPIView):
     permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+    renderer_classes = LIST_RENDERERS
 
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         query = request.query_params.get("q", "").strip()
+        client_ids = None
+        listing = PlainList(ClientSerializer, request)
+        # Client.objects.for_listing(), narrowed to ?fields=
+        clients = listing.queryset(ClientSerializer.prepare(Client.objects.all(), request))
         if query:
-            clients = Client.objects.filter(
-                Q(first_name__icontains=query) | 
-                Q(last_name__icontains=query) | 
-                Q(phone_number__icontains=query) | 
-                Q(email__icontains=query)
-            )
-        else:
-            clients = Client.objects.all()  # added this line for returning all cleitns if search is not supplied with cleitns name
-        if not clients.exists():
+            client_ids = await sync_to_async(search_client_ids)(query, search_limit(request))
+            clients = clients.filter(id__in=client_ids)
+        # Without a search query every client is listed
+        if not await clients.aexists():
             return Response(
                 {"message": "No clients found."}, 
                 status=status.HTTP_404_NOT_FOUND
             )
-        serializer = ClientSerializer(clients, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-
-class SalesView(APIView):
+        paginator = KeysetCursorPagination()
+        page = await paginator.apaginate_queryset(clients, request, view=self)
+        if page is not None:
+            # The examinations are read with the page
+            return paginator.get_paginated_response(await sync_to_async(listing.data)(page))
+        clients = [client async for client in clients]
+        if client_ids is not None:
+            # Search results keep the backend's ranking, best match first
+            rank = {client_id: position for position, client_id in enumerate(client_ids)}
+            clients = sorted(clients, key=lambda client: rank[listing.pk(client)])
+        return Response(await sync_to_async(listing.data)(clients), status=status.HTTP_200_OK)
+
+
+class SalesView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+    renderer_classes = LIST_RENDERERS
     
+    @conditional(sale_version)
     def get(self, request, sales_id=None, *args, **kwargs):
+        sales = SalesSerializer.prepare(Sales.objects.all(), request)
+        context = {"request": request}
         if sales_id:
             try:
-                sale = Sales.objects.get(id=sales_id)
-                serializer = SalesSerializer(sale)
+                sale = sales.get(id=sales_id)
+                serializer = SalesSerializer(sale, context=context)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             except Sales.DoesNotExist:
                 return Response({"error": "Sale not found"}, status=status.HTTP_404_NOT_FOUND)
-        sales = Sales.objects.all()
-        serializer = SalesSerializer(sales, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        listing = PlainList(SalesSerializer, request)
+        sales = listing.queryset(sales)
+        paginator = KeysetCursorPagination()
+        page = paginator.paginate_queryset(sales, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(listing.data(page))
+        return Response(listing.data(sales), status=status.HTTP_200_OK)
     
+    @idempotent
     def post(self, request):
         request_data = request.data.copy()
         request_data['served_by'] = f"Dr. {request.user.first_name} {request.user.last_name}"
@@ -172,6 +243,7 @@ class SalesView(APIView):
                 }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @idempotent
     def put(self, request, sales_id):
         try:
             sales = Sales.objects.get(id=sales_id)
@@ -179,7 +251,7 @@ class SalesView(APIView):
             return Response({"error": "Sale not found"}, status=status.HTTP_404_NOT_FOUND)
         serializer = SalesSerializer(sales, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(received_by=f"{request.user.first_name} {request.user.last_name}")
             return Response(
                 {
                     "message": "Sale updated successfully",
@@ -187,8 +259,48 @@ class SalesView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class PayBalanceView(APIView):
+    """
+    GET lists the sale's payments; POST (or the older PUT with
+    `advance_paid`/`advance_payment_method`) posts one to the ledger.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+
+    def get(self, request, sales_id):
+        payments = Payment.objects.filter(sale_id=sales_id)
+        return Response(PaymentSerializer(payments, many=True).data, status=status.HTTP_200_OK)
+
+    @idempotent
+    def post(self, request, sales_id):
+        data = {
+            "amount": request.data.get("amount", request.data.get("advance_paid")),
+            "method": request.data.get("method") or request.data.get("advance_payment_method") or "Cash",
+            "mpesa_transaction_code": request.data.get("mpesa_transaction_code"),
+        }
+        serializer = PaymentSerializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            payment = serializer.save(
+                sale_id=sales_id, received_by=f"{request.user.first_name} {request.user.last_name}"
+            )
+        except Sales.DoesNotExist:
+            return Response({"error": "Sale not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            {
+                "message": "Payment recorded successfully",
+                "payment": PaymentSerializer(payment).data,
+                "balance_due": payment.sale.balance_due,
+                "order_paid": payment.sale.order_paid,
+            }, status=status.HTTP_201_CREATED)
+
+    put = post
+
+
 class SearchClientBalanceView(APIView):
     permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
 
     def get(self, request):
         query = request.query_params.get("q", "").strip()  
@@ -198,109 +310,116 @@ class SearchClientBalanceView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        sales = Sales.objects.filter(
-            Q(examination__client__first_name__icontains=query) |
-            Q(examination__client__reg_no__icontains=query)
-        )
+        # The maintained summary says who still owes, so only owing clients
+        # compete for the search limit and only their outstanding sales are read
+        owing = search_client_ids(query, search_limit(request), Client.objects.filter(open_orders__gt=0))
 
-        if not sales.exists():
-            return Response(
-                {"message": "Client not found."},
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-        outstanding_sales = sales.filter(balance_due__gt=0)
-
-        if not outstanding_sales.exists():
+        if not owing:
+            if not search_client_ids(query, 1, Client.objects.filter(latest_sale__isnull=False)):
+                return Response(
+                    {"message": "Client not found."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
             return Response(
                 {"message": "Client found, but balance is fully paid."},
                 status=status.HTTP_200_OK
             )
 
-        serializer = SalesSerializer(outstanding_sales, many=True)
+        outstanding_sales = SalesSerializer.prepare(
+            Sales.objects.filter(examination__client__in=owing, balance_due__gt=0), request
+        )
+        serializer = SalesSerializer(outstanding_sales, many=True, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 
-class PendingExaminationsView(APIView):
+class PendingExaminationsView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+    renderer_classes = LIST_RENDERERS
     
-    def get(self, request, *args, **kwargs):
-        examinations = Examination.objects.filter(state="Pending")
-        serializer = ExaminationSerializer(examinations, many=True)
-        return Response({"data": serializer.data}, status=status.HTTP_200_OK)
+    async def get(self, request, *args, **kwargs):
+        listing = PlainList(ExaminationSerializer, request)
+        examinations = listing.queryset(ExaminationSerializer.prepare(
+            Examination.objects.select_related("client").filter(state="Pending"), request
+        ))
+        paginator = KeysetCursorPagination()
+        page = await paginator.apaginate_queryset(examinations, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(listing.data(page))
+        examinations = [examination async for examination in examinations]
+        return Response({"data": listing.data(examinations)}, status=status.HTTP_200_OK)
     
 ## retieve client view
 class RetrieveClientView(APIView):
     def get(self, request, id):
         try:
-            client = Client.objects.get(id=id)
+            client = Client.objects.for_listing().get(id=id)
             serializer = ClientSerializer(client)
             return Response(serializer.data)
         except Client.DoesNotExist:
             return Response({"error": "Client not found"}, status=404)
         
 
-class GenerateReceiptView(APIView):
+class GenerateReceiptView(AsyncAPIView):
+    """The sale's receipt as JSON, or rendered with `?type=pdf|html` (cached until the sale changes)."""
     permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
     
-    def get(self, request, sales_id):
-        sale = get_object_or_404(Sales, id=sales_id)
-        examination = sale.examination
-        client = examination.client
-        
-        receipt = {
-            "client": {
-                "name": f"{client.first_name} {client.last_name}",
-                "registration_number": client.reg_no,
-                "phone_number": client.phone_number,
-                "email": client.email,
-                "visit_count": client.visit_count,
-                "last_examination_date": client.last_examination_date,
-            },
-            "examination": {
-                "date": examination.examination_date,
-                "status": examination.state,
-                "examined_by": examination.examined_by,
-            },
-            "sales": {
-                "payment_method": sale.payment_method,
-                "served_by": sale.served_by,
-                "total_amount": sale.total_price,
-                "amount_paid": sale.advance_paid,
-                "balance_due": sale.balance_due,
-                "advance_payment_status": sale.advance_payment_status,
-                "balance_payment_status": sale.balance_payment_status,
-                "order_status": sale.order_paid,
-                "mpesa_transaction_code": sale.mpesa_transaction_code,
-                "created_at": sale.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                "frame": {
-                    "brand": sale.frame_brand,
-                    "model": sale.frame_model,
-                    "color": sale.frame_color,
-                    "quantity": sale.frame_quantity,
-                    "price": sale.frame_price,
-                },
-                "lens": {
-                    "brand": sale.lens_brand,
-                    "type": sale.lens_type,
-                    "material": sale.lens_material,
-                    "coating": sale.lens_coating,
-                    "quantity": sale.lens_quantity,
-                    "price": sale.lens_price,
-                },
-            }
-        }
-        
-        return Response(receipt, status=status.HTTP_200_OK)
+    @conditional(receipt_version)
+    async def get(self, request, sales_id):
+        sale = await aget_object_or_404(RECEIPT_QUERYSET, id=sales_id)
+        fmt = request.query_params.get("type")
+        if fmt is None:
+            return Response(receipt_data(sale), status=status.HTTP_200_OK)
+        if fmt not in RENDERERS:
+            return Response({"error": f"Unsupported format {fmt!r}."}, status=status.HTTP_400_BAD_REQUEST)
+        document = await sync_to_async(get_receipt)(sale, fmt)
+        response = HttpResponse(document, content_type=RENDERERS[fmt][1])
+        response["Content-Disposition"] = f'inline; filename="{receipt_filename(sale, fmt)}"'
+        return response
+
+
+class ReceiptBatchView(APIView):
+    """
+    Streams a ZIP of the receipts for sales created between ?from= and ?to=
+    (inclusive dates), as `?type=pdf` (default) or html. Under ASGI the ZIP
+    comes from an async iterator, so it is still sent file by file.
+    """
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
+
+    def get(self, request):
+        try:
+            start = date.fromisoformat(request.query_params["from"])
+            end = date.fromisoformat(request.query_params["to"])
+        except (KeyError, ValueError):
+            return Response({"error": "from and to must be YYYY-MM-DD dates."}, status=status.HTTP_400_BAD_REQUEST)
+        max_days = getattr(settings, "RECEIPT_BATCH_MAX_DAYS", 31)
+        if not 0 <= (end - start).days < max_days:
+            return Response(
+                {"error": f"to must be on or after from, at most {max_days} days apart."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        fmt = request.query_params.get("type", "pdf")
+        if fmt not in RENDERERS:
+            return Response({"error": f"Unsupported format {fmt!r}."}, status=status.HTTP_400_BAD_REQUEST)
+        sales = Sales.objects.filter(created_at__date__range=(start, end)).order_by("created_at", "id")
+        stream = astream_receipts_zip if isinstance(request._request, ASGIRequest) else stream_receipts_zip
+        response = StreamingHttpResponse(stream(sales, fmt), content_type="application/zip")
+        response["Content-Disposition"] = f'attachment; filename="receipts-{start}-{end}.zip"'
+        return response
 
 
 # Gets client  based on id the  and client all examinations
-class SingleClientInfoView(APIView):
+class SingleClientInfoView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
+    authentication_classes = [StatelessJWTAuthentication]
     
-    def get(self, request,client_id=None, *args, **kwargs):
-        client = get_object_or_404(Client, id=client_id)
+    @conditional(client_version)
+    async def get(self, request,client_id=None, *args, **kwargs):
+        # The prefetched examinations below are read from the cache, no query
+        client = await aget_object_or_404(Client.objects.for_listing(), id=client_id)
         client_data = ClientSerializer(client).data
         examinations = client.examinations.all()
         examinations_data = ExaminationSerializer(examinations, many=True).data
@@ -309,4 +428,48 @@ class SingleClientInfoView(APIView):
         return Response({
             "client": client_data,
             "examinations" : examinations_data
-        }, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+
+class ClientImportView(APIView):
+    """
+    Bulk-imports clients from an uploaded CSV or NDJSON `file`, read and
+    inserted in chunks. `?book=true` books each client for an examination
+    and `?notify=true` queues their welcome SMS.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "Upload a CSV or NDJSON file as `file`."}, status=status.HTTP_400_BAD_REQUEST)
+        # `format` is taken by DRF's renderer negotiation
+        fmt = request.query_params.get("type") or guess_format(upload.name)
+        if fmt not in IMPORT_FORMATS:
+            return Response({"error": f"Unsupported format {fmt!r}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = import_clients(
+            upload,
+            fmt,
+            registered_by=f"{request.user.first_name} {request.user.last_name}",
+            book_examinations=request.query_params.get("book") == "true",
+            notify=request.query_params.get("notify") == "true",
+        )
+        code = status.HTTP_201_CREATED if result["created"] else status.HTTP_400_BAD_REQUEST
+        return Response(result, status=code)
+
+
+class ExportView(APIView):
+    """Streams all clients, examinations or sales as CSV (default) or `?type=ndjson`."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, resource, *args, **kwargs):
+        if resource not in EXPORTS:
+            raise Http404
+        fmt = request.query_params.get("type", "csv")
+        if fmt not in IMPORT_FORMATS:
+            return Response({"error": f"Unsupported format {fmt!r}."}, status=status.HTTP_400_BAD_REQUEST)
+        content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        response = StreamingHttpResponse(export_rows(resource, fmt), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="{resource}.{fmt}"'
+        return response
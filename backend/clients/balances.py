@@ -0,0 +1,94 @@
+"""
+Client balance summary.
+
+`Client.outstanding_balance`, `open_orders` and `latest_sale` summarise the
+client's sales so listings and balance lookups read columns instead of
+summing Sales rows. clients.services moves them with one UPDATE, in the same
+transaction, whenever a sale is created or its balance changes. Writes that
+bypass the services (admin edits, raw SQL) are caught by `find_drift`, which
+`manage.py reconcile_client_balances` runs.
+"""
+from decimal import Decimal
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.timezone import now
+from .models import Client, Sales
+
+ZERO = Decimal("0.00")
+SUMMARY_FIELDS = ("outstanding_balance", "open_orders", "latest_sale")
+
+
+def outstanding(balance_due):
+    """What a sale adds to its client's balance; overpaid sales count as zero."""
+    return balance_due if balance_due > 0 else ZERO
+
+
+def record_balance_change(examination_id, old_balance_due, new_balance_due, latest_sale=None):
+    """
+    Moves the summary of the client behind `examination_id` by one sale's
+    change in balance_due (pass ZERO as the old balance for a new sale).
+    Call inside the transaction that saves the sale.
+    """
+    old, new = outstanding(old_balance_due), outstanding(new_balance_due)
+    changes = {}
+    if new != old:
+        changes["outstanding_balance"] = F("outstanding_balance") + (new - old)
+    orders = (new > 0) - (old > 0)
+    if orders:
+        changes["open_orders"] = Greatest(F("open_orders") + orders, 0)
+    if latest_sale is not None:
+        changes["latest_sale"] = latest_sale
+    if changes:
+        Client.objects.filter(examinations__pk=examination_id).update(updated_at=now(), **changes)
+
+
+def with_expected_summary(clients):
+    """Annotates `clients` with the summary recomputed from their sales."""
+    sales = Sales.objects.filter(examination__client=OuterRef("pk")).order_by()
+    open_sales = sales.filter(balance_due__gt=0).values("examination__client")
+    return clients.annotate(
+        expected_balance=Coalesce(
+            Subquery(open_sales.annotate(total=Sum("balance_due")).values("total")),
+            Value(ZERO),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        expected_open_orders=Coalesce(Subquery(open_sales.annotate(count=Count("pk")).values("count")), 0),
+        expected_latest_sale_id=Subquery(sales.order_by("-created_at", "-id").values("pk")[:1]),
+    )
+
+
+def find_drift(clients=None, chunk_size=2000):
+    """
+    Yields (client, {field: (stored, expected)}) for every client whose
+    stored summary doesn't match its sales. Amounts are compared in Python
+    at two decimal places, since SQLite sums decimals as floats.
+    """
+    if clients is None:
+        clients = Client.objects.all()
+    clients = with_expected_summary(clients).only("pk", *SUMMARY_FIELDS)
+    for client in clients.order_by("pk").iterator(chunk_size=chunk_size):
+        expected = {
+            "outstanding_balance": Decimal(client.expected_balance).quantize(ZERO),
+            "open_orders": client.expected_open_orders,
+            "latest_sale_id": client.expected_latest_sale_id,
+        }
+        diff = {
+            field: (getattr(client, field), value)
+            for field, value in expected.items()
+            if getattr(client, field) != value
+        }
+        if diff:
+            yield client, diff
+
+
+def repair(drifted, batch_size=500):
+    """Writes the expected values from find_drift() back; returns the number of clients fixed."""
+    clients = []
+    changed_at = now()
+    for client, diff in drifted:
+        for field, (_, expected) in diff.items():
+            setattr(client, field, expected)
+        client.updated_at = changed_at
+        clients.append(client)
+    Client.objects.bulk_update(clients, [*SUMMARY_FIELDS, "updated_at"], batch_size=batch_size)
+    return len(clients)
@@ -0,0 +1,216 @@
+"""
+Bulk client import and streaming export.
+
+Imports validate rows with ClientRegistrationSerializer(many=True) a chunk
+at a time and insert them with bulk_create. Per-row signals don't run, so
+the work they do (reg_no, phone digits, search index, SMS) is done here for
+the whole chunk, and `bulk_created` lets the analytics and dashboard
+receivers catch up.
+"""
+import csv
+import json
+from itertools import islice
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from .api.serializers import ClientRegistrationSerializer
+from .models import Client, Examination, Sales
+from .reg_numbers import new_reg_nos
+from .search import get_search_backend, normalize_phone
+from .signals import bulk_created, examination_booking_message, welcome_message
+from .sms import queue_messages
+
+IMPORT_FORMATS = ("csv", "ndjson")
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORTS = {
+    "clients": (
+        Client.objects.order_by("created_at", "id"),
+        ["id", "reg_no", "first_name", "last_name", "dob", "gender", "phone_number", "email", "location",
+         "branch", "registered_by", "visit_count", "last_examination_date", "previous_prescription",
+         "created_at", "updated_at"],
+    ),
+    "examinations": (
+        Examination.objects.order_by("created_at", "id"),
+        [field.attname for field in Examination._meta.concrete_fields],
+    ),
+    "sales": (
+        Sales.objects.order_by("created_at", "id"),
+        [field.attname for field in Sales._meta.concrete_fields] + ["examination__client_id"],
+    ),
+}
+
+
+def guess_format(name, default="csv"):
+    if name and name.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if name and name.lower().endswith(".csv"):
+        return "csv"
+    return default
+
+
+def read_records(lines, fmt):
+    """
+    Yields one dict per CSV row or NDJSON line from an iterable of text
+    lines, without reading ahead. Empty CSV cells are left out so optional
+    fields fall back to their defaults; NDJSON lines that don't parse yield
+    None and are reported as row errors.
+    """
+    if fmt == "csv":
+        for row in csv.DictReader(lines):
+            yield {key: value for key, value in row.items() if key and value not in ("", None)}
+        return
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield record if isinstance(record, dict) else None
+
+
+def decode_lines(binary_lines, encoding="utf-8-sig"):
+    for line in binary_lines:
+        yield line.decode(encoding) if isinstance(line, bytes) else line
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def validate_chunk(records):
+    """
+    Returns (validated_data, errors) for one chunk, where errors maps each
+    record's position in the chunk to its serializer errors.
+    """
+    parsed = {index: record for index, record in enumerate(records) if record is not None}
+    errors = {index: {"non_field_errors": ["Could not parse this line."]}
+              for index, record in enumerate(records) if record is None}
+
+    serializer = ClientRegistrationSerializer(data=list(parsed.values()), many=True)
+    if serializer.is_valid():
+        return list(zip(parsed, serializer.validated_data)), errors
+
+    valid = []
+    for index, row_errors in zip(parsed, serializer.errors):
+        if row_errors:
+            errors[index] = row_errors
+        else:
+            valid.append((index, serializer.child.run_validation(parsed[index])))
+    return valid, errors
+
+
+class ClientImporter:
+    """
+    Imports client records in chunks of `chunk_size`. `registered_by` fills
+    in rows that don't name a receptionist. With `book_examinations` every
+    imported client gets a pending examination, and with `notify` the
+    welcome (and booking) SMS are queued as for single registrations.
+    """
+
+    def __init__(self, registered_by, chunk_size=500, book_examinations=False, notify=False):
+        self.registered_by = registered_by
+        self.chunk_size = chunk_size
+        self.book_examinations = book_examinations
+        self.notify = notify
+        self.reg_nos = set()
+        self.created = 0
+        self.errors = []
+
+    def build_clients(self, rows, first_row):
+        clients = []
+        for index, data in rows:
+            reg_no = data.get("reg_no")
+            if reg_no and reg_no in self.reg_nos:
+                self.errors.append({"row": first_row + index, "errors": {"reg_no": ["Duplicated in this import."]}})
+                continue
+            if reg_no:
+                self.reg_nos.add(reg_no)
+            client = Client(**data)
+            client.phone_digits = normalize_phone(client.phone_number)
+            clients.append((index, client))
+
+        # One counter update per branch in the chunk
+        unnumbered = [client for _, client in clients if not client.reg_no]
+        for client, reg_no in zip(unnumbered, new_reg_nos([client.branch for client in unnumbered])):
+            client.reg_no = reg_no
+        return clients
+
+    def import_chunk(self, records, first_row):
+        for record in records:
+            if record is not None:
+                record.setdefault("registered_by", self.registered_by)
+        rows, errors = validate_chunk(records)
+        self.errors.extend({"row": first_row + index, "errors": row_errors} for index, row_errors in errors.items())
+        indexed_clients = self.build_clients(rows, first_row)
+        clients = [client for _, client in indexed_clients]
+        if not clients:
+            return
+
+        try:
+            with transaction.atomic():
+                Client.objects.bulk_create(clients)
+                examinations = []
+                if self.book_examinations:
+                    examinations = Examination.objects.bulk_create(
+                        [Examination(client=client) for client in clients]
+                    )
+                get_search_backend().index_clients(clients)
+                if self.notify:
+                    queue_messages(
+                        [(client.phone_number, welcome_message(client)) for client in clients]
+                        + [(exam.client.phone_number, examination_booking_message(exam)) for exam in examinations]
+                    )
+                bulk_created.send(sender=Client, clients=clients, examinations=examinations)
+        except IntegrityError as exc:
+            # A reg_no taken since validation, most likely; the chunk is rolled back
+            self.errors.extend(
+                {"row": first_row + index, "errors": {"non_field_errors": [f"Not imported: {exc}"]}}
+                for index, _ in indexed_clients
+            )
+            return
+        self.created += len(clients)
+
+    def run(self, records):
+        """Imports an iterable of records; returns {"created", "errors"}."""
+        row = 1
+        for chunk in chunks(records, self.chunk_size):
+            self.import_chunk(chunk, row)
+            row += len(chunk)
+        self.errors.sort(key=lambda error: error["row"])
+        return {"created": self.created, "errors": self.errors}
+
+
+def import_clients(lines, fmt="csv", **options):
+    """Imports clients from an iterable of CSV/NDJSON text or byte lines."""
+    return ClientImporter(**options).run(read_records(decode_lines(lines), fmt))
+
+
+class Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(resource, fmt="csv"):
+    """
+    Yields `resource` ("clients", "examinations" or "sales") as CSV or
+    NDJSON lines. Rows come from .values_list().iterator(), so memory stays
+    flat whatever the table size.
+    """
+    queryset, fields = EXPORTS[resource]
+    rows = queryset.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    columns = [field.split("__")[-1] for field in fields]
+
+    if fmt == "csv":
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + "\n"
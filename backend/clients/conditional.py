@@ -0,0 +1,129 @@
+"""
+Conditional GETs for client, examination, sale and branch reads.
+
+A view's `@conditional(version)` computes the resource's version with one
+small query, the `updated_at` of the rows it shows plus a row count for
+collections, before anything is loaded or serialized. That version becomes a
+weak ETag and its newest timestamp the Last-Modified. A request whose
+If-None-Match (or If-Modified-Since) still matches gets 304 with no body.
+Writes bump `updated_at` on the rows they touch (payments and balance
+changes included), so a changed resource gets a new ETag.
+
+Responses carry `Cache-Control: private, no-cache`, so browsers revalidate
+every time instead of guessing a freshness lifetime from Last-Modified.
+"""
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from .models import Branch, Client, Sales
+
+
+def make_etag(*parts):
+    return 'W/"%s"' % hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional(version):
+    """
+    Wraps a GET handler. `version(request, **kwargs)` returns (parts,
+    last_modified), or None when the resource doesn't exist, in which case
+    the handler runs and answers as usual.
+    """
+    def check(request, kwargs):
+        found = version(request, **kwargs)
+        if found is None:
+            return None, None
+        parts, last_modified = found
+        # The same data renders differently as JSON and the browsable API
+        etag = make_etag(request.accepted_renderer.format, request.query_params.urlencode(), *parts)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified and int(last_modified.timestamp())
+        )
+        if not_modified is not None:
+            return set_validators(not_modified, etag, last_modified), None
+        return None, (etag, last_modified)
+
+    def decorator(handler):
+        if iscoroutinefunction(handler):
+            @wraps(handler)
+            async def async_wrapper(view, request, *args, **kwargs):
+                not_modified, validators = await sync_to_async(check)(request, kwargs)
+                if not_modified is not None:
+                    return not_modified
+                response = await handler(view, request, *args, **kwargs)
+                if validators and response.status_code == 200:
+                    set_validators(response, *validators)
+                return response
+            return async_wrapper
+
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            not_modified, validators = check(request, kwargs)
+            if not_modified is not None:
+                return not_modified
+            response = handler(view, request, *args, **kwargs)
+            if validators and response.status_code == 200:
+                set_validators(response, *validators)
+            return response
+        return wrapper
+
+    return decorator
+
+
+def newest(*timestamps):
+    return max((stamp for stamp in timestamps if stamp is not None), default=None)
+
+
+def client_version(request, client_id, **kwargs):
+    """The client's row and its examinations."""
+    row = (
+        Client.objects.filter(pk=client_id)
+        .annotate(exams_updated=Max("examinations__updated_at"), exams=Count("examinations"))
+        .values_list("updated_at", "exams_updated", "exams")
+        .first()
+    )
+    if row is None:
+        return None
+    return row, newest(row[0], row[1])
+
+
+def sale_version(request, sales_id=None, **kwargs):
+    if sales_id is None:
+        return None
+    updated_at = Sales.objects.filter(pk=sales_id).values_list("updated_at", flat=True).first()
+    if updated_at is None:
+        return None
+    return (updated_at,), updated_at
+
+
+def receipt_version(request, sales_id, **kwargs):
+    """The rows a receipt prints: the sale (payments bump it), its examination and client."""
+    row = (
+        Sales.objects.filter(pk=sales_id)
+        .values_list("updated_at", "examination__updated_at", "examination__client__updated_at")
+        .first()
+    )
+    if row is None:
+        return None
+    return row, newest(*row)
+
+
+def branch_list_version(request, **kwargs):
+    row = Branch.objects.aggregate(updated=Max("updated_at"), count=Count("pk"))
+    return (row["updated"], row["count"]), row["updated"]
+
+
+def examinations_version(request, id, **kwargs):
+    # The list repeats the client's name and reg_no on every examination
+    return client_version(request, id)
@@ -0,0 +1,112 @@
+"""
+Idempotency keys for write endpoints.
+
+A client that may retry a write sends an `Idempotency-Key` header. The first
+request with a key runs the view and stores its response in the same
+transaction, keyed by the caller, endpoint and header value. A retry within
+IDEMPOTENCY_KEY_TTL_SECONDS gets the stored response back after one primary
+key lookup instead of running the view again. Reusing a key for a different
+request body is refused. While the first request is still running, a retry
+waits on the key's row lock and then gets the stored response (on SQLite,
+writes are serialized anyway).
+
+Responses of 500 and up are not stored, so the client can retry them.
+Expired keys are deleted by `manage.py purge_idempotency_keys`.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+
+def digest(*parts):
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def request_hash(request):
+    return digest(json.dumps(request.data, sort_keys=True, cls=JSONEncoder))
+
+
+def key_ttl():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL_SECONDS", 60 * 60 * 24))
+
+
+def replay(stored, fingerprint):
+    if stored.request_hash != fingerprint:
+        return Response(
+            {"error": f"{IDEMPOTENCY_HEADER} was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if stored.status_code is None:
+        return Response(
+            {"error": f"A request with this {IDEMPOTENCY_HEADER} is still being processed."},
+            status=status.HTTP_409_CONFLICT,
+        )
+    return Response(stored.response, status=stored.status_code, headers={REPLAYED_HEADER: "true"})
+
+
+def idempotent(handler):
+    """
+    Makes an APIView's post/put handler honour the Idempotency-Key header;
+    requests without one run as before.
+    """
+    @wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        header = request.headers.get(IDEMPOTENCY_HEADER)
+        if not header:
+            return handler(view, request, *args, **kwargs)
+        if len(header) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        key = digest(request.user.pk, request.method, request.path, header)
+        fingerprint = request_hash(request)
+        stored = IdempotencyKey.objects.filter(pk=key, expires_at__gt=now()).first()
+        if stored is not None:
+            return replay(stored, fingerprint)
+
+        with transaction.atomic():
+            IdempotencyKey.objects.filter(pk=key, expires_at__lte=now()).delete()
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        key=key, request_hash=fingerprint, expires_at=now() + key_ttl()
+                    )
+            except IntegrityError:
+                # Another request with the key committed first
+                return replay(IdempotencyKey.objects.get(pk=key), fingerprint)
+
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code >= 500:
+                transaction.set_rollback(True)
+                return response
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=["status_code", "response"])
+        return response
+
+    return wrapper
+
+
+def purge_expired(batch_size=5000):
+    """Deletes expired keys in batches; returns how many were deleted."""
+    deleted = 0
+    expired = IdempotencyKey.objects.filter(expires_at__lte=now())
+    while True:
+        keys = list(expired.values_list("pk", flat=True)[:batch_size])
+        if not keys:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=keys).delete()[0]
@@ -0,0 +1,117 @@
+import json
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils.timezone import localtime
+from clients.models import Client, Examination, Sales
+from clients.seeding import seed
+
+INDEXED_MODELS = (Client, Examination, Sales)
+
+
+def hot_queries():
+    """The query shapes the clients/administration views issue most."""
+    start_of_day = localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    branch = Client.objects.values_list("branch", flat=True).first() or ""
+    return {
+        "pending_examinations_page": Examination.objects.filter(state="Pending").order_by("-created_at", "-id")[:50],
+        "booked_for_sales_page": Examination.objects.filter(booked_for_sales=True).order_by("-created_at", "-id")[:50],
+        "outstanding_sales_page": Sales.objects.filter(balance_due__gt=0).order_by("-created_at", "-id")[:50],
+        "clients_by_branch_page": Client.objects.filter(branch=branch).order_by("-created_at")[:50],
+        "client_listing_page": Client.objects.for_listing()[:50],
+        "sales_page": Sales.objects.order_by("-created_at", "-id")[:50],
+        # Timed as COUNT(*), the shape AdminDashboardSummaryView aggregates
+        "clients_created_this_week": Client.objects.filter(created_at__gte=start_of_day - timedelta(days=7)).order_by(),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the hot filter queries and prints their query plans, optionally "
+        "after seeding synthetic data. With --drop-indexes it also times them "
+        "without the clients indexes, which it drops and recreates: only run "
+        "that against a throwaway copy of the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed-clients", type=int, default=0, help="Bulk-insert this many synthetic clients first.")
+        parser.add_argument("--runs", type=int, default=5, help="Timed runs per query (median is reported).")
+        parser.add_argument(
+            "--drop-indexes", action="store_true",
+            help="Also measure without the clients indexes. Drops them on the configured database while it runs.",
+        )
+        parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+
+    def handle(self, *args, **options):
+        if options["seed_clients"]:
+            self.stdout.write(f"Seeding {options['seed_clients']} clients...")
+            totals = seed(clients=options["seed_clients"], stdout=self.stdout)
+            self.stdout.write(f"Seeded {totals}")
+        self.analyze()
+
+        results = {"vendor": connection.vendor, "rows": self.row_counts()}
+        if options["drop_indexes"]:
+            with self.indexes_dropped():
+                results["without_indexes"] = self.measure(options["runs"])
+        results["with_indexes"] = self.measure(options["runs"])
+
+        self.report(results)
+        if options["json_path"]:
+            with open(options["json_path"], "w") as handle:
+                json.dump(results, handle, indent=2)
+
+    def row_counts(self):
+        return {model.__name__: model.objects.count() for model in INDEXED_MODELS}
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    @contextmanager
+    def indexes_dropped(self):
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+        self.analyze()
+        try:
+            yield
+        finally:
+            with connection.schema_editor() as editor:
+                for model in INDEXED_MODELS:
+                    for index in model._meta.indexes:
+                        editor.add_index(model, index)
+            self.analyze()
+
+    def measure(self, runs):
+        results = {}
+        for name, query in hot_queries().items():
+            if name.startswith("clients_created"):
+                run = query.count
+            else:
+                run = lambda query=query: list(query.all())
+            plan = query.explain()
+            run()  # warm up caches
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                run()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = {"median_ms": round(statistics.median(timings), 3), "plan": plan}
+        return results
+
+    def report(self, results):
+        self.stdout.write(f"\n{results['vendor']} {results['rows']}\n")
+        baseline = results.get("without_indexes", {})
+        for name, measured in results["with_indexes"].items():
+            before = baseline.get(name)
+            line = f"{name:<28} {measured['median_ms']:>10.3f} ms"
+            if before:
+                line = f"{name:<28} {before['median_ms']:>10.3f} ms -> {measured['median_ms']:>10.3f} ms"
+            self.stdout.write(line)
+            for label, result in (("before", before), ("after", measured)):
+                if result and result["plan"]:
+                    self.stdout.write(f"    {label}: " + result["plan"].replace("\n", "\n            "))
@@ -0,0 +1,76 @@
+import json
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from clients.api.plain import PlainList
+from clients.api.renderers import ORJSONRenderer
+from clients.api.serializers import ClientSerializer, ExaminationSerializer, SalesSerializer
+from clients.models import Client, Examination, Sales
+
+
+def hot_lists():
+    """The list pages the PlainList views serve, as (serializer, queryset)."""
+    return {
+        "examinations": (ExaminationSerializer, Examination.objects.select_related("client").order_by("-created_at", "-id")),
+        "sales": (SalesSerializer, Sales.objects.order_by("-created_at", "-id")),
+        "clients": (ClientSerializer, Client.objects.order_by("-created_at", "-id")),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Times serializing and rendering a page of each hot list with the "
+        "ModelSerializers and JSONRenderer, and with the plain fast path and orjson."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500, help="Rows per page.")
+        parser.add_argument("--runs", type=int, default=5, help="Timed runs per path (median is reported).")
+        parser.add_argument("--fields", default="", help="A ?fields= value to apply to every list (names every serializer has, such as id).")
+        parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+
+    def handle(self, *args, **options):
+        params = {"fields": options["fields"]} if options["fields"] else {}
+        request = Request(APIRequestFactory().get("/", params))
+        results = {}
+        for name, (serializer_class, queryset) in hot_lists().items():
+            queryset = serializer_class.prepare(queryset, request)
+            results[name] = {
+                "drf": self.measure(options["runs"], options["rows"], lambda: JSONRenderer().render(
+                    serializer_class(queryset[:options["rows"]], many=True, context={"request": request}).data
+                )),
+                "plain": self.measure(options["runs"], options["rows"], lambda: self.plain(
+                    serializer_class, queryset, request, options["rows"]
+                )),
+            }
+
+        self.report(results)
+        if options["json_path"]:
+            with open(options["json_path"], "w") as handle:
+                json.dump(results, handle, indent=2)
+
+    def plain(self, serializer_class, queryset, request, rows):
+        listing = PlainList(serializer_class, request)
+        return ORJSONRenderer().render(listing.data(listing.queryset(queryset)[:rows]))
+
+    def measure(self, runs, rows, run):
+        size = len(run())  # warm up caches
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        median = statistics.median(timings)
+        return {"median_ms": round(median * 1000, 3), "rows_per_sec": round(rows / median), "bytes": size}
+
+    def report(self, results):
+        for name, measured in results.items():
+            drf, plain = measured["drf"], measured["plain"]
+            self.stdout.write(
+                f"{name:<14} drf {drf['median_ms']:>9.3f} ms {drf['rows_per_sec']:>9} rows/s"
+                f"  plain {plain['median_ms']:>9.3f} ms {plain['rows_per_sec']:>9} rows/s"
+                f"  x{drf['median_ms'] / plain['median_ms']:.1f}"
+            )
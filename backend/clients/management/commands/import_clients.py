@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from clients.bulk import IMPORT_FORMATS, guess_format, import_clients
+
+
+class Command(BaseCommand):
+    help = "Bulk-imports clients from a CSV or NDJSON file, streamed in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--type", choices=IMPORT_FORMATS, help="File format (guessed from the extension by default).")
+        parser.add_argument("--registered-by", default="Import", help="Used for rows without a registered_by value.")
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument("--book", action="store_true", help="Book every imported client for an examination.")
+        parser.add_argument("--notify", action="store_true", help="Queue the welcome SMS for every imported client.")
+
+    def handle(self, *args, **options):
+        try:
+            handle = open(options["path"], "rb")
+        except OSError as exc:
+            raise CommandError(exc)
+        with handle:
+            result = import_clients(
+                handle,
+                options["type"] or guess_format(options["path"]),
+                registered_by=options["registered_by"],
+                chunk_size=options["chunk_size"],
+                book_examinations=options["book"],
+                notify=options["notify"],
+            )
+        for error in result["errors"]:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} clients, {len(result['errors'])} rows rejected."
+        ))
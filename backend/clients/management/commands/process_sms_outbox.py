@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from clients.sms import RateLimiter, get_gateway, process_outbox
+from django.conf import settings
+
+
+class Command(BaseCommand):
+    help = "Sends queued SMS notifications from the outbox. Use --loop to keep draining it as a worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox instead of exiting.")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds to sleep when the outbox is empty.")
+        parser.add_argument("--limit", type=int, default=500, help="Messages claimed per pass.")
+
+    def handle(self, *args, **options):
+        gateway = get_gateway()
+        limiter = RateLimiter(getattr(settings, "SMS_RATE_LIMIT_PER_SECOND", 5))
+        while True:
+            sent = process_outbox(gateway, limit=options["limit"], limiter=limiter)
+            if sent:
+                self.stdout.write(f"Sent {sent} SMS")
+            if not options["loop"]:
+                break
+            if not sent:
+                time.sleep(options["interval"])
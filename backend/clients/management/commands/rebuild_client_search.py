@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from clients.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the client search index (SQLite FTS5 table) from the clients table."
+
+    def handle(self, *args, **options):
+        get_search_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS("Client search index rebuilt."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from clients.balances import find_drift, repair
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares every client's stored balance summary (outstanding_balance, open_orders, "
+        "latest_sale) with their sales and reports drift; --fix writes the recomputed values back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Repair the drifted clients.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Clients read per query.")
+        parser.add_argument("--show", type=int, default=20, help="Drifted clients to list (default 20).")
+
+    def handle(self, *args, **options):
+        drifted = list(find_drift(chunk_size=options["chunk_size"]))
+        for client, diff in drifted[:options["show"]]:
+            changes = ", ".join(f"{field} {stored} -> {expected}" for field, (stored, expected) in diff.items())
+            self.stdout.write(f"{client.pk}: {changes}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("No drift found."))
+        elif options["fix"]:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {repair(drifted)} clients."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} clients drifted; run with --fix to repair them."))
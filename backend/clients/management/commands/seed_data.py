@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from analytics.rollups import rebuild
+from clients.seeding import seed, seed_staff
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-inserts a reproducible synthetic dataset (branches, staff, clients, examinations "
+        "with refraction values, sales in mixed payment states) for load tests and benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=1000, help="Clients to create.")
+        parser.add_argument("--days", type=int, default=365, help="Spread registrations over this many past days.")
+        parser.add_argument("--exams-per-client", type=float, default=1.5, help="Mean examinations per client.")
+        parser.add_argument("--sale-ratio", type=float, default=0.6, help="Share of completed examinations sold.")
+        parser.add_argument("--outstanding-ratio", type=float, default=0.3, help="Share of sales with a balance due.")
+        parser.add_argument("--pending-ratio", type=float, default=0.1, help="Share of examinations still pending.")
+        parser.add_argument("--staff", type=int, default=10, help="Staff accounts to create; the first is a superuser.")
+        parser.add_argument("--random-seed", type=int, default=0, help="Same seed and database, same rows.")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Clients per bulk insert.")
+
+    def handle(self, *args, **options):
+        staff = seed_staff(options["staff"])
+        totals = seed(
+            clients=options["clients"],
+            days=options["days"],
+            exams_per_client=options["exams_per_client"],
+            sale_ratio=options["sale_ratio"],
+            outstanding_ratio=options["outstanding_ratio"],
+            pending_ratio=options["pending_ratio"],
+            batch_size=options["batch_size"],
+            random_seed=options["random_seed"],
+            stdout=self.stdout,
+        )
+        # bulk_create skips the signals that keep the rollups current
+        rollups = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {staff} staff, {totals['clients']} clients, {totals['examinations']} examinations, "
+            f"{totals['sales']} sales and {totals['payments']} payments; rebuilt {rollups} rollup rows."
+        ))
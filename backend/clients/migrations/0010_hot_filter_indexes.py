@@ -0,0 +1,53 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0009_client_branch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['-created_at', '-id'], name='client_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['branch', '-created_at'], name='client_branch_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examination',
+            index=models.Index(fields=['-created_at', '-id'], name='exam_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examination',
+            index=models.Index(fields=['client', '-examination_date', '-created_at'], name='exam_client_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examination',
+            index=models.Index(condition=models.Q(('state', 'Pending')), fields=['-created_at', '-id'], name='exam_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examination',
+            index=models.Index(condition=models.Q(('booked_for_sales', True)), fields=['-created_at', '-id'], name='exam_booked_for_sales_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sales',
+            index=models.Index(fields=['-created_at', '-id'], name='sales_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sales',
+            index=models.Index(fields=['examination', '-created_at'], name='sales_exam_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sales',
+            index=models.Index(condition=models.Q(('balance_due__gt', 0)), fields=['examination'], name='sales_outstanding_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sales',
+            index=models.Index(condition=models.Q(('balance_due__gt', 0)), fields=['-created_at', '-id'], name='sales_outstanding_created_idx'),
+        ),
+    ]
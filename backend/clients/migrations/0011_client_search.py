@@ -0,0 +1,75 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:29
+
+import re
+from django.db import migrations, models
+
+SEARCH_TABLE = "clients_client_search"
+TRIGRAM_COLUMNS = ("first_name", "last_name", "email", "reg_no")
+
+
+def populate_phone_digits(apps, schema_editor):
+    Client = apps.get_model("clients", "Client")
+    clients = list(Client.objects.only("phone_number"))
+    for client in clients:
+        client.phone_digits = re.sub(r"\D", "", client.phone_number or "")
+    Client.objects.bulk_update(clients, ["phone_digits"], batch_size=1000)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in TRIGRAM_COLUMNS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS client_{column}_trgm_idx '
+                f'ON clients_client USING gin (UPPER("{column}") gin_trgm_ops)'
+            )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS client_phone_digits_trgm_idx "
+            "ON clients_client USING gin (phone_digits gin_trgm_ops)"
+        )
+    elif connection.vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "client_id UNINDEXED, first_name, last_name, email, reg_no, phone_digits, "
+            "tokenize='trigram')"
+        )
+        Client = apps.get_model("clients", "Client")
+        rows = [
+            (client.id.int & 0x7FFFFFFFFFFFFFFF, client.id.hex, client.first_name, client.last_name,
+             client.email, client.reg_no, client.phone_digits)
+            for client in Client.objects.iterator()
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} "
+                "(rowid, client_id, first_name, last_name, email, reg_no, phone_digits) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        for column in TRIGRAM_COLUMNS + ("phone_digits",):
+            schema_editor.execute(f"DROP INDEX IF EXISTS client_{column}_trgm_idx")
+    elif connection.vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0010_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='phone_digits',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(populate_phone_digits, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:36
+
+import re
+from django.db import migrations, models
+
+# The random six-character suffixes used before could be all digits, so
+# counters start above any existing numeric suffix for their branch/month.
+REG_NO = re.compile(r"^(\w+)/(\d{4})/(\d{2})/(\d+)$")
+
+
+def seed_counters(apps, schema_editor):
+    Client = apps.get_model("clients", "Client")
+    RegistrationCounter = apps.get_model("clients", "RegistrationCounter")
+    highest = {}
+    for reg_no in Client.objects.values_list("reg_no", flat=True).iterator():
+        match = REG_NO.match(reg_no or "")
+        if match:
+            code, year, month, number = match.groups()
+            key = (code, int(year), int(month))
+            highest[key] = max(highest.get(key, 0), int(number))
+    RegistrationCounter.objects.bulk_create(
+        [
+            RegistrationCounter(branch_code=code, year=year, month=month, last_value=number)
+            for (code, year, month), number in highest.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0012_sms_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch_code', models.CharField(max_length=5)),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('branch_code', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
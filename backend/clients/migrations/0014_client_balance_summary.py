@@ -0,0 +1,50 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:57
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_summary(apps, schema_editor):
+    # One set-based UPDATE; clients.balances maintains the columns from here on
+    Client = apps.get_model("clients", "Client")
+    Sales = apps.get_model("clients", "Sales")
+    sales = Sales.objects.filter(examination__client=OuterRef("pk")).order_by()
+    open_sales = sales.filter(balance_due__gt=0).values("examination__client")
+    Client.objects.update(
+        outstanding_balance=Coalesce(
+            Subquery(open_sales.annotate(total=Sum("balance_due")).values("total")),
+            Value(Decimal("0.00")),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        open_orders=Coalesce(Subquery(open_sales.annotate(count=Count("pk")).values("count")), 0),
+        latest_sale=Subquery(sales.order_by("-created_at", "-id").values("pk")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0013_registration_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='latest_sale',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='clients.sales'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='open_orders',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='outstanding_balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_summary, migrations.RunPython.noop),
+    ]
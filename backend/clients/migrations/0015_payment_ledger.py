@@ -0,0 +1,59 @@
+# Generated by Django 5.1.6 on 2026-10-18 18:01
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def open_ledgers(apps, schema_editor):
+    # Earlier payments only survive as each sale's advance_paid total, so
+    # every paid sale gets one payment for it, dated with the sale
+    Payment = apps.get_model("clients", "Payment")
+    Sales = apps.get_model("clients", "Sales")
+    seen_codes = set()
+    batch = []
+    paid = Sales.objects.filter(advance_paid__gt=0).values_list(
+        "pk", "advance_paid", "advance_payment_method", "payment_method", "mpesa_transaction_code", "served_by"
+    )
+    for pk, amount, advance_method, method, code, served_by in paid.iterator(chunk_size=2000):
+        if code in seen_codes:
+            code = None
+        seen_codes.add(code)
+        batch.append(Payment(
+            sale_id=pk, amount=amount, method=advance_method or method,
+            mpesa_transaction_code=code or None, received_by=served_by,
+        ))
+        if len(batch) >= 2000:
+            Payment.objects.bulk_create(batch)
+            batch = []
+    Payment.objects.bulk_create(batch)
+    Payment.objects.update(created_at=Subquery(Sales.objects.filter(pk=OuterRef("sale_id")).values("created_at")[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0014_client_balance_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('method', models.CharField(choices=[('Cash', 'Cash'), ('Mpesa', 'M-Pesa'), ('Card', 'Credit Card'), ('Bank', 'Bank Transfer'), ('Insurance', 'Insurance')], default='Cash', max_length=10)),
+                ('mpesa_transaction_code', models.CharField(blank=True, max_length=20, null=True)),
+                ('received_by', models.CharField(max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='clients.sales')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['sale', 'created_at'], name='payment_sale_created_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('mpesa_transaction_code__isnull', False)), fields=('mpesa_transaction_code',), name='payment_unique_mpesa_code')],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,44 @@
 from django.db import models
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.utils import timezone
+from decimal import Decimal
 import uuid
+from rest_framework.utils.encoders import JSONEncoder
 
 
 class Branch(models.Model):
     name = models.CharField(max_length=100, unique=True)
     code = models.CharField(max_length=5, unique=True)  
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.code} - {self.name}"
 
+class ClientQuerySet(models.QuerySet):
+    def for_listing(self):
+        """
+        Annotates everything ClientSerializer needs so a listing costs a fixed
+        number of queries: the clients themselves plus one prefetch for their
+        examinations, whatever the number of rows.
+        """
+        # Balance, open orders and latest sale are columns maintained by
+        # clients.balances, so only the latest examination is a subquery
+        return self.with_latest_exam().with_examinations()
+
+    def with_latest_exam(self):
+        latest_exam = (
+            Examination.objects.filter(client=OuterRef("pk"))
+            .order_by("-examination_date", "-created_at")
+            .values("id")[:1]
+        )
+        return self.annotate(latest_exam_pk=Subquery(latest_exam))
+
+    def with_examinations(self):
+        # Reverse FK prefetching caches `examination.client` on every row,
+        # so the nested ExaminationSerializer does no lookups of its own.
+        return self.prefetch_related(Prefetch("examinations", queryset=Examination.objects.all()))
+
+
 class Client(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     
@@ -22,6 +52,7 @@ class Client(models.Model):
     last_name = models.CharField(max_length=100, blank=False)
     dob = models.DateField(blank=False)
     phone_number = models.CharField(max_length=20, blank=False)
+    phone_digits = models.CharField(max_length=20, blank=True, editable=False)  # phone_number, digits only (search)
     email = models.EmailField(blank=False)
     location = models.CharField(max_length=100, blank=False)
     branch =  models.CharField(max_length=100, blank=False )
@@ -33,9 +64,24 @@ class Client(models.Model):
     last_examination_date = models.DateField(blank=True, null=True)
     visit_count = models.PositiveIntegerField(default=1)
     reg_no = models.CharField(max_length=20, unique=True, blank=True)
+
+    # Balance summary over the client's sales, maintained on write by
+    # clients.balances; `manage.py reconcile_client_balances` repairs drift
+    outstanding_balance = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"), editable=False)
+    open_orders = models.PositiveIntegerField(default=0, editable=False)
+    latest_sale = models.ForeignKey(
+        "Sales", on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="+"
+    )
+
+    objects = ClientQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Default ordering and keyset pagination walk (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='client_created_idx'),
+            models.Index(fields=['branch', '-created_at'], name='client_branch_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -79,6 +125,21 @@ class Examination(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='exam_created_idx'),
+            # Latest examination per client (ClientQuerySet.for_listing)
+            models.Index(fields=['client', '-examination_date', '-created_at'], name='exam_client_latest_idx'),
+            # PendingExaminationsView and GetBookedClientForSalesAPIView only ever
+            # read these small slices of the table
+            models.Index(
+                fields=['-created_at', '-id'], name='exam_pending_idx',
+                condition=models.Q(state='Pending'),
+            ),
+            models.Index(
+                fields=['-created_at', '-id'], name='exam_booked_for_sales_idx',
+                condition=models.Q(booked_for_sales=True),
+            ),
+        ]
 
     def __str__(self):
         return f"Examination for {self.client.first_name} {self.client.last_name} - {self.state}"
@@ -146,16 +207,27 @@ class Sales(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='sales_created_idx'),
+            # Latest sale per examination / client
+            models.Index(fields=['examination', '-created_at'], name='sales_exam_created_idx'),
+            # Outstanding balance per client (clients.balances)
+            models.Index(
+                fields=['examination'], name='sales_outstanding_idx',
+                condition=models.Q(balance_due__gt=0),
+            ),
+            # Newest outstanding sales first (SearchClientBalanceView)
+            models.Index(
+                fields=['-created_at', '-id'], name='sales_outstanding_created_idx',
+                condition=models.Q(balance_due__gt=0),
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         """ Auto-calculate total price, balance due, and update payment status before saving. """
         self.total_price = (self.frame_price * self.frame_quantity) + (self.lens_price * self.lens_quantity)
         self.balance_due = self.total_price - self.advance_paid
-        
-        """Once a sale is made, mark the examination as no longer booked for sales"""
-        if self.examination.booked_for_sales:
-            self.examination.booked_for_sales = False
-            self.examination.save()
+        # Unbooking the examination is done by clients.services.create_sale
 
         # Update payment status dynamically
         if self.balance_due > 0 and self.advance_paid > 0:
@@ -176,3 +248,102 @@ class Sales(models.Model):
 
     def __str__(self):
         return f"Sales for {self.examination.client.first_name} {self.examination.client.last_name} - {self.frame_brand} & {self.lens_brand}"
+
+
+
+class Payment(models.Model):
+    """
+    One payment towards a sale. Rows are only ever inserted (see
+    clients.services.record_payment); the sale's advance_paid is their sum.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    sale = models.ForeignKey(Sales, on_delete=models.CASCADE, related_name='payments')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    method = models.CharField(max_length=10, choices=Sales.PAYMENT_METHODS, default='Cash')
+    mpesa_transaction_code = models.CharField(max_length=20, blank=True, null=True)
+    received_by = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['sale', 'created_at'], name='payment_sale_created_idx'),
+        ]
+        constraints = [
+            # An M-Pesa confirmation can only be posted once
+            models.UniqueConstraint(
+                fields=['mpesa_transaction_code'], name='payment_unique_mpesa_code',
+                condition=models.Q(mpesa_transaction_code__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.amount} ({self.method}) towards sale {self.sale_id}"
+
+
+class OutboxMessage(models.Model):
+    """An SMS waiting to be sent by the `process_sms_outbox` worker, one row per recipient."""
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sending', 'Sending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+
+    phone_number = models.CharField(max_length=20)
+    message = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    # While Sending: when the claiming worker's lease runs out
+    locked_until = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'], name='outbox_due_idx',
+                condition=models.Q(status='Pending'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"SMS to {self.phone_number} ({self.status})"
+
+
+class RegistrationCounter(models.Model):
+    """Last reg_no sequence number handed out per branch code and month (see clients.reg_numbers)."""
+    branch_code = models.CharField(max_length=5)
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("branch_code", "year", "month")
+
+    def __str__(self):
+        return f"{self.branch_code}/{self.year}/{self.month:02d}: {self.last_value}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    The stored response to a write sent with an Idempotency-Key header (see
+    clients.idempotency). `key` is a digest of the caller, endpoint and
+    header value; `request_hash` one of the request body.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True, encoder=JSONEncoder)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code})"
@@ -0,0 +1,231 @@
+"""
+Server-rendered sale receipts.
+
+A receipt renders to HTML (for the browser's print dialog) or PDF and is
+cached per sale and format. The cache key carries the sale's,
+examination's and client's `updated_at` (payments bump the sale's), so an
+edit to any of them renders a fresh copy and reprints in between are cache
+hits. Batches for a date range stream as a ZIP, one file per sale. They
+reuse cached copies but don't store new ones, so a month of receipts
+doesn't push everything else out of the cache.
+"""
+import io
+import zipfile
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from reportlab.lib.pagesizes import A5
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+from .models import Sales
+
+RECEIPT_CACHE_KEY = "receipt:{sale_id}:{fmt}:{version}"
+RECEIPT_QUERYSET = Sales.objects.select_related("examination__client").prefetch_related("payments")
+RECEIPT_CHUNK_SIZE = 200
+
+
+def receipt_data(sale):
+    """
+    The receipt as a dict; `sale` should come with examination__client
+    selected and payments prefetched (RECEIPT_QUERYSET).
+    """
+    examination = sale.examination
+    client = examination.client
+    return {
+        "client": {
+            "name": f"{client.first_name} {client.last_name}",
+            "registration_number": client.reg_no,
+            "phone_number": client.phone_number,
+            "email": client.email,
+            "visit_count": client.visit_count,
+            "last_examination_date": client.last_examination_date,
+        },
+        "examination": {
+            "date": examination.examination_date,
+            "status": examination.state,
+            "examined_by": examination.examined_by,
+        },
+        "sales": {
+            "payment_method": sale.payment_method,
+            "served_by": sale.served_by,
+            "total_amount": sale.total_price,
+            "amount_paid": sale.advance_paid,
+            "balance_due": sale.balance_due,
+            "advance_payment_status": sale.advance_payment_status,
+            "balance_payment_status": sale.balance_payment_status,
+            "order_status": sale.order_paid,
+            "mpesa_transaction_code": sale.mpesa_transaction_code,
+            "created_at": sale.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            "frame": {
+                "brand": sale.frame_brand,
+                "model": sale.frame_model,
+                "color": sale.frame_color,
+                "quantity": sale.frame_quantity,
+                "price": sale.frame_price,
+            },
+            "lens": {
+                "brand": sale.lens_brand,
+                "type": sale.lens_type,
+                "material": sale.lens_material,
+                "coating": sale.lens_coating,
+                "quantity": sale.lens_quantity,
+                "price": sale.lens_price,
+            },
+            "payments": [
+                {
+                    "amount": payment.amount,
+                    "method": payment.method,
+                    "mpesa_transaction_code": payment.mpesa_transaction_code,
+                    "received_by": payment.received_by,
+                    "paid_at": payment.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                }
+                for payment in sale.payments.all()
+            ],
+        }
+    }
+
+
+def render_html(sale):
+    return render_to_string("clients/receipt.html", {"receipt": receipt_data(sale), "sale": sale}).encode()
+
+
+def receipt_lines(receipt):
+    """(label, value) rows in print order; a None value starts a section."""
+    client, examination, sales = receipt["client"], receipt["examination"], receipt["sales"]
+    frame, lens = sales["frame"], sales["lens"]
+    return [
+        ("Client", None),
+        ("Name", client["name"]),
+        ("Reg. no", client["registration_number"]),
+        ("Phone", client["phone_number"]),
+        ("Examination", None),
+        ("Date", examination["date"]),
+        ("Examined by", examination["examined_by"]),
+        ("Order", None),
+        ("Frame", f"{frame['brand']} {frame['model']} ({frame['color']}) x{frame['quantity']}"),
+        ("Frame price", frame["price"]),
+        ("Lens", f"{lens['brand']} {lens['type']}, {lens['material']}, {lens['coating']} x{lens['quantity']}"),
+        ("Lens price", lens["price"]),
+        ("Payment", None),
+        ("Method", sales["payment_method"]),
+        ("M-Pesa code", sales["mpesa_transaction_code"] or "-"),
+        ("Total", sales["total_amount"]),
+        ("Paid", sales["amount_paid"]),
+        ("Balance due", sales["balance_due"]),
+        ("Status", sales["order_status"]),
+        ("Served by", sales["served_by"]),
+        ("Payments", None),
+        *(
+            (payment["paid_at"], f"{payment['amount']} {payment['method']} {payment['mpesa_transaction_code'] or ''}".rstrip())
+            for payment in sales["payments"]
+        ),
+    ]
+
+
+def render_pdf(sale):
+    receipt = receipt_data(sale)
+    buffer = io.BytesIO()
+    # invariant=1 leaves out the creation date, so a re-render is byte-identical
+    pdf = canvas.Canvas(buffer, pagesize=A5, invariant=1)
+    pdf.setTitle(f"Receipt {sale.id}")
+    width, height = A5
+    margin = 12 * mm
+    y = height - margin
+
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(margin, y, "Receipt")
+    pdf.setFont("Helvetica", 8)
+    pdf.drawRightString(width - margin, y, receipt["sales"]["created_at"])
+    y -= 8 * mm
+    for label, value in receipt_lines(receipt):
+        if y < margin:
+            pdf.showPage()
+            y = height - margin
+        if value is None:
+            y -= 2 * mm
+            pdf.setFont("Helvetica-Bold", 10)
+            pdf.drawString(margin, y, label)
+        else:
+            pdf.setFont("Helvetica", 9)
+            pdf.drawString(margin, y, label)
+            pdf.drawString(margin + 30 * mm, y, str(value))
+        y -= 5 * mm
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+RENDERERS = {
+    "html": (render_html, "text/html; charset=utf-8"),
+    "pdf": (render_pdf, "application/pdf"),
+}
+
+
+def receipt_version(sale):
+    examination = sale.examination
+    return "-".join(
+        format(obj.updated_at.timestamp(), ".6f") for obj in (sale, examination, examination.client)
+    )
+
+
+def get_receipt(sale, fmt, store=True):
+    """
+    The rendered receipt as bytes, from the cache while nothing on it has
+    changed. A fresh render is only cached when `store` is true.
+    """
+    key = RECEIPT_CACHE_KEY.format(sale_id=sale.id, fmt=fmt, version=receipt_version(sale))
+    document = cache.get(key)
+    if document is None:
+        render, _ = RENDERERS[fmt]
+        document = render(sale)
+        if store:
+            cache.set(key, document, getattr(settings, "RECEIPT_CACHE_SECONDS", 60 * 60 * 24))
+    return document
+
+
+def receipt_filename(sale, fmt):
+    return f"receipt-{sale.created_at:%Y%m%d}-{sale.id}.{fmt}"
+
+
+class ZipSink:
+    """Write-only file for ZipFile; drain() hands back what was written since the last call."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def stream_receipts_zip(sales, fmt="pdf"):
+    """Yields a ZIP of the sales' receipts, one file at a time."""
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        sales = sales.select_related("examination__client").prefetch_related("payments")
+        for sale in sales.iterator(chunk_size=RECEIPT_CHUNK_SIZE):
+            archive.writestr(receipt_filename(sale, fmt), get_receipt(sale, fmt, store=False))
+            yield sink.drain()
+    yield sink.drain()
+
+
+async def astream_receipts_zip(sales, fmt="pdf"):
+    """
+    stream_receipts_zip for ASGI servers, which read a sync iterator whole
+    before sending any of it. Each file is still rendered in a thread.
+    """
+    chunks = stream_receipts_zip(sales, fmt)
+    try:
+        while (chunk := await sync_to_async(next)(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
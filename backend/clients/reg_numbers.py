@@ -0,0 +1,111 @@
+"""
+Sequential registration numbers: {branch code}/{year}/{month}/{sequence}.
+
+Sequences come from RegistrationCounter, one row per branch code and month.
+Each worker reserves REG_NO_BLOCK_SIZE numbers per counter update and hands
+them out from memory, so most registrations need no query at all. Numbers
+are unique across workers; they are only in order within one worker, and
+a block left unused at shutdown leaves a gap.
+"""
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from .models import Branch, RegistrationCounter
+
+UNKNOWN_BRANCH_CODE = "XX"
+
+_lock = threading.RLock()
+_blocks = {}  # (code, year, month) -> (next number, last number) reserved by this process
+_branch_codes = {}
+_branch_codes_loaded_at = None
+
+
+def branch_code(branch_name):
+    """Branch code for a client's `branch` name, from a per-process cache."""
+    global _branch_codes, _branch_codes_loaded_at
+    with _lock:
+        ttl = getattr(settings, "BRANCH_CODE_CACHE_SECONDS", 300)
+        if _branch_codes_loaded_at is None or time.monotonic() - _branch_codes_loaded_at > ttl:
+            _branch_codes = {name.lower(): code for name, code in Branch.objects.values_list("name", "code")}
+            _branch_codes_loaded_at = time.monotonic()
+        return _branch_codes.get((branch_name or "").strip().lower(), UNKNOWN_BRANCH_CODE)
+
+
+def clear_branch_codes():
+    global _branch_codes_loaded_at
+    with _lock:
+        _branch_codes_loaded_at = None
+
+
+def reset():
+    """Forgets the cached branch codes and reserved blocks (used by tests)."""
+    with _lock:
+        _blocks.clear()
+    clear_branch_codes()
+
+
+def reserve(key, count):
+    """Adds `count` to the counter row and returns the last number reserved."""
+    code, year, month = key
+    counter = RegistrationCounter.objects.filter(branch_code=code, year=year, month=month)
+    with transaction.atomic():
+        # Updating first takes the row's write lock before the value is read back
+        if not counter.update(last_value=F("last_value") + count):
+            RegistrationCounter.objects.bulk_create(
+                [RegistrationCounter(branch_code=code, year=year, month=month)], ignore_conflicts=True
+            )
+            counter.update(last_value=F("last_value") + count)
+        return counter.values_list("last_value", flat=True).get()
+
+
+def release(key, block):
+    with _lock:
+        _blocks[key] = block
+
+
+def allocate(key, count=1):
+    """Returns `count` unused sequence numbers for (code, year, month)."""
+    with _lock:
+        next_value, last = _blocks.pop(key, (1, 0))
+        taken = min(count, last - next_value + 1)
+        numbers = list(range(next_value, next_value + taken))
+        if taken < count:
+            missing = count - taken
+            size = max(missing, getattr(settings, "REG_NO_BLOCK_SIZE", 20))
+            last = reserve(key, size)
+            first = last - size + 1
+            numbers.extend(range(first, first + missing))
+            if size > missing:
+                # The spare numbers only exist once the reservation commits; if
+                # the caller's transaction rolls back they are never handed out.
+                transaction.on_commit(lambda: release(key, (first + missing, last)))
+        elif next_value + taken <= last:
+            _blocks[key] = (next_value + taken, last)
+        return numbers
+
+
+def format_reg_no(code, year, month, number):
+    return f"{code}/{year}/{month:02d}/{number:06d}"
+
+
+def next_reg_no(branch_name):
+    return new_reg_nos([branch_name])[0]
+
+
+def new_reg_nos(branch_names):
+    """One new reg_no per branch name, allocating a single range per branch."""
+    today = datetime.now()
+    positions = defaultdict(list)
+    for position, name in enumerate(branch_names):
+        positions[branch_code(name)].append(position)
+
+    reg_nos = [None] * len(branch_names)
+    for code, indexes in positions.items():
+        numbers = allocate((code, today.year, today.month), len(indexes))
+        for position, number in zip(indexes, numbers):
+            reg_nos[position] = format_reg_no(code, today.year, today.month, number)
+    return reg_nos
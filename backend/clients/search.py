@@ -0,0 +1,277 @@
+import re
+import uuid
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = "clients_client_search"
+TEXT_FIELDS = ("first_name", "last_name", "email", "reg_no")
+PHONE_TERM = re.compile(r"^[\d\s()+-]*\d[\d\s()+-]*$")
+MIN_TRIGRAM_LENGTH = 3
+COUNTRY_CODE = "254"
+
+
+def normalize_phone(value):
+    """Digits only, so "+254 712-345" and "0712345" share substrings."""
+    return re.sub(r"\D", "", value or "")
+
+
+def phone_variants(digits):
+    """
+    The digits as typed plus the same number with the other Kenyan prefix,
+    so "254712" also finds numbers saved as "0712..." and the other way
+    round. Both forms are stored, depending on how staff entered them.
+    """
+    variants = [digits]
+    if digits.startswith(COUNTRY_CODE) and len(digits) > len(COUNTRY_CODE) + 2:
+        variants.append("0" + digits[len(COUNTRY_CODE):])
+    elif digits.startswith("0") and len(digits) > 3:
+        variants.append(COUNTRY_CODE + digits[1:])
+    return variants
+
+
+def parse_terms(query):
+    """
+    Splits a query into ("phone", digits) and ("text", word) terms. A query
+    made only of phone characters is one phone term, spaces included. Phone
+    terms match registration numbers too, so "000001" finds XX/2026/10/000001.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    if PHONE_TERM.match(query):
+        return [("phone", normalize_phone(query))]
+    return [
+        ("phone", normalize_phone(word)) if PHONE_TERM.match(word) else ("text", word)
+        for word in query.split()
+    ]
+
+
+def search_limit(request=None):
+    default = getattr(settings, "CLIENT_SEARCH_LIMIT", 50)
+    maximum = getattr(settings, "API_MAX_PAGE_SIZE", 500)
+    try:
+        limit = int(request.query_params.get("limit", default)) if request else default
+    except ValueError:
+        return default
+    return min(max(limit, 1), maximum)
+
+
+class ClientSearchBackend:
+    """
+    Fallback search: case-insensitive substring match, newest first.
+
+    Backends return the ids of matching clients, best match first, so views
+    can narrow any queryset with `client__id__in` and keep their own shape.
+    `within` is a Client queryset the matches must belong to; it is applied
+    before the limit, so the limit counts only clients the view can show.
+    search_filter() is the same match with no limit and no ranking, for
+    views that list every match and paginate it themselves.
+    """
+
+    def index_client(self, client):
+        pass
+
+    def index_clients(self, clients):
+        pass
+
+    def remove_client(self, client):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def condition(self, terms):
+        condition = Q()
+        for kind, value in terms:
+            if kind == "phone":
+                term_condition = Q(reg_no__icontains=value)
+                for digits in phone_variants(value):
+                    term_condition |= Q(phone_digits__contains=digits)
+                condition &= term_condition
+                continue
+            term_condition = Q()
+            for field in TEXT_FIELDS:
+                term_condition |= Q(**{f"{field}__icontains": value})
+            condition &= term_condition
+        return condition
+
+    def matching_ids(self, terms):
+        from .models import Client
+
+        return Client.objects.filter(self.condition(terms)).values("id")
+
+    def search_filter(self, query, field="id"):
+        terms = parse_terms(query)
+        if not terms:
+            return Q()
+        return Q(**{f"{field}__in": self.matching_ids(terms)})
+
+    def search(self, query, limit, within=None):
+        from .models import Client
+
+        terms = parse_terms(query)
+        if not terms:
+            return []
+        clients = Client.objects.all() if within is None else within
+        return list(
+            clients.filter(self.condition(terms))
+            .order_by("-created_at", "-id")
+            .values_list("id", flat=True)[:limit]
+        )
+
+
+class SQLiteFTSSearchBackend(ClientSearchBackend):
+    """
+    SQLite FTS5 virtual table with the trigram tokenizer (migration 0011),
+    kept in sync by the Client signals. Trigram MATCH works on substrings, so
+    partial names, registration numbers and phone digits all use the index,
+    ranked by bm25.
+    """
+
+    def __init__(self):
+        self.available = None
+
+    def is_available(self):
+        if self.available is None:
+            self.available = SEARCH_TABLE in connection.introspection.table_names()
+        return self.available
+
+    @staticmethod
+    def rowid(client_id):
+        # FTS5 needs an integer rowid; 63 bits of the UUID are collision-free in practice
+        return client_id.int & 0x7FFFFFFFFFFFFFFF
+
+    def row(self, client):
+        return [
+            self.rowid(client.id), client.id.hex, client.first_name, client.last_name,
+            client.email, client.reg_no, client.phone_digits,
+        ]
+
+    def write_rows(self, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {SEARCH_TABLE} "
+                "(rowid, client_id, first_name, last_name, email, reg_no, phone_digits) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+
+    def index_client(self, client):
+        self.index_clients([client])
+
+    def index_clients(self, clients):
+        if self.is_available():
+            self.write_rows([self.row(client) for client in clients])
+
+    def remove_client(self, client):
+        if not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [self.rowid(client.id)])
+
+    def rebuild(self):
+        from .models import Client
+
+        if not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        rows = []
+        for client in Client.objects.order_by().only(*TEXT_FIELDS, "phone_digits").iterator(chunk_size=2000):
+            rows.append(self.row(client))
+            if len(rows) == 2000:
+                self.write_rows(rows)
+                rows = []
+        if rows:
+            self.write_rows(rows)
+
+    def phone_expression(self, value):
+        variants = " OR ".join(f'phone_digits : "{digits}"' for digits in phone_variants(value))
+        return f'(reg_no : "{value}" OR {variants})'
+
+    def match_expression(self, terms):
+        return " ".join(
+            self.phone_expression(value) if kind == "phone" else '"{}"'.format(value.replace('"', '""'))
+            for kind, value in terms
+        )
+
+    def uses_index(self, terms):
+        # Trigrams can't match terms shorter than three characters
+        return self.is_available() and all(len(value) >= MIN_TRIGRAM_LENGTH for _, value in terms)
+
+    def matching_ids(self, terms):
+        if not self.uses_index(terms):
+            return super().matching_ids(terms)
+        # client_id holds the hex form SQLite stores UUID primary keys in
+        return RawSQL(
+            f"SELECT client_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [self.match_expression(terms)]
+        )
+
+    def search(self, query, limit, within=None):
+        terms = parse_terms(query)
+        if not self.uses_index(terms):
+            return super().search(query, limit, within)
+        sql = f"SELECT client_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s"
+        params = [self.match_expression(terms)]
+        if within is not None:
+            within_sql, within_params = within.order_by().values("id").query.sql_with_params()
+            sql += f" AND client_id IN ({within_sql})"
+            params += within_params
+        with connection.cursor() as cursor:
+            cursor.execute(f"{sql} ORDER BY rank LIMIT %s", [*params, limit])
+            return [uuid.UUID(row[0]) for row in cursor.fetchall()]
+
+
+class PostgresTrigramSearchBackend(ClientSearchBackend):
+    """
+    pg_trgm GIN indexes (migration 0011) on UPPER(column) serve the
+    ILIKE '%q%' filters and the one on phone_digits serves phone terms;
+    phone terms are also matched against reg_no. Results are ranked by the
+    best trigram similarity across the columns.
+    """
+
+    def search(self, query, limit, within=None):
+        from django.contrib.postgres.search import TrigramSimilarity
+        from django.db.models.functions import Greatest
+        from .models import Client
+
+        terms = parse_terms(query)
+        if not terms:
+            return []
+        text = " ".join(value for kind, value in terms if kind == "text")
+        digits = "".join(value for kind, value in terms if kind == "phone")
+        similarities = [TrigramSimilarity(field, text) for field in TEXT_FIELDS] if text else []
+        if digits:
+            similarities += [TrigramSimilarity("phone_digits", digits), TrigramSimilarity("reg_no", digits)]
+        rank = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        clients = Client.objects.all() if within is None else within
+        return list(
+            clients.filter(self.condition(terms))
+            .annotate(rank=rank)
+            .order_by("-rank", "-created_at")
+            .values_list("id", flat=True)[:limit]
+        )
+
+
+fallback_backend = ClientSearchBackend()
+sqlite_backend = SQLiteFTSSearchBackend()
+postgres_backend = PostgresTrigramSearchBackend()
+
+
+def get_search_backend():
+    if connection.vendor == "postgresql":
+        return postgres_backend
+    if connection.vendor == "sqlite":
+        return sqlite_backend
+    return fallback_backend
+
+
+def search_client_ids(query, limit=None, within=None):
+    return get_search_backend().search(query, limit or search_limit(), within)
+
+
+def search_filter(query, field="id"):
+    """A Q narrowing a queryset to every client matching `query`, via `field`."""
+    return get_search_backend().search_filter(query, field)
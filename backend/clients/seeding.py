@@ -0,0 +1,233 @@
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.timezone import now
+from .balances import ZERO, outstanding
+from .models import Branch, Client, Examination, Payment, Sales
+from .search import get_search_backend
+
+BRANCHES = [
+    ("Nairobi", "NRB"), ("Nakuru", "NKR"), ("Mombasa", "MSA"), ("Kisumu", "KSM"), ("Eldoret", "ELD"),
+]
+FIRST_NAMES = ["Amina", "Brian", "Cynthia", "David", "Esther", "Felix", "Grace", "Hassan", "Irene", "James",
+               "Kevin", "Lucy", "Mercy", "Njeri", "Otieno", "Peter", "Rose", "Samuel", "Wanjiru", "Zawadi"]
+LAST_NAMES = ["Achieng", "Barasa", "Cheruiyot", "Kamau", "Kariuki", "Mutua", "Njoroge", "Odhiambo",
+              "Omondi", "Wafula", "Wambui", "Kiprop", "Mwangi", "Nyambura", "Onyango"]
+FRAMES = [("Ray-Ban", "RB5154"), ("Oakley", "OX8046"), ("Silhouette", "5515"), ("Vogue", "VO5276")]
+LENSES = [("Essilor", "Single Vision"), ("Zeiss", "Progressive"), ("Hoya", "Bifocal")]
+PAYMENT_METHODS = [choice for choice, _ in Sales.PAYMENT_METHODS]
+STAFF_ROLES = ["receptionist", "optometrist", "staff"]
+
+
+@contextmanager
+def preserve_timestamps(*models):
+    """Lets bulk_create keep explicit created_at/updated_at values."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def refraction(rng):
+    return Decimal(rng.randrange(-800, 400, 25)) / 100
+
+
+def seed(clients=1000, days=365, exams_per_client=1.5, sale_ratio=0.6, outstanding_ratio=0.3,
+         pending_ratio=0.1, batch_size=5000, random_seed=0, stdout=None):
+    """
+    Bulk-inserts a reproducible synthetic dataset: clients spread over the
+    last `days` days, roughly `exams_per_client` examinations each, a sale
+    for `sale_ratio` of the completed examinations and an outstanding balance
+    on `outstanding_ratio` of those sales. Sales are unpaid, part-paid or
+    paid, in one payment or a deposit and a later balance payment, with
+    matching Payment rows and client balance summaries.
+
+    Rows go in through bulk_create, so model signals (SMS, rollups,
+    reg_no generation) do not run; the client search index is rebuilt here
+    and analytics rollups must be rebuilt after.
+    The same arguments on the same database give the same rows.
+    Returns the number of clients, examinations, sales and payments created.
+    """
+    first = Client.objects.count()  # keeps reg_no unique across repeated runs
+    rng = random.Random(f"{random_seed}:{first}")
+    branches = [
+        Branch.objects.get_or_create(name=name, defaults={"code": code})[0]
+        for name, code in BRANCHES
+    ]
+    end = now()
+    totals = {"clients": 0, "examinations": 0, "sales": 0, "payments": 0}
+
+    with preserve_timestamps(Client, Examination, Sales, Payment):
+        for offset in range(0, clients, batch_size):
+            client_rows, exam_rows, sale_rows, payment_rows = [], [], [], []
+            for index in range(first + offset, first + min(offset + batch_size, clients)):
+                branch = rng.choice(branches)
+                created = end - timedelta(seconds=rng.randrange(days * 86400))
+                phone = f"2547{rng.randrange(10**8):08d}"
+                client = Client(
+                    id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    dob=(created - timedelta(days=rng.randrange(5 * 365, 80 * 365))).date(),
+                    phone_number=f"+{phone}",
+                    phone_digits=phone,
+                    email=f"client{index}@example.com",
+                    location=branch.name,
+                    branch=branch.name,
+                    registered_by="Seed",
+                    gender=rng.choice("MFO"),
+                    reg_no=f"{branch.code}/{created:%Y/%m}/S{index:06X}",
+                    created_at=created,
+                    updated_at=created,
+                )
+                client_rows.append(client)
+
+                visits = max(1, round(rng.expovariate(1 / exams_per_client)))
+                exam_created = created
+                for visit in range(visits):
+                    if visit:
+                        exam_created += timedelta(days=rng.randrange(30, 180))
+                    if exam_created > end:
+                        break
+                    pending = rng.random() < pending_ratio
+                    examination = Examination(
+                        id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                        client=client,
+                        examination_date=exam_created.date(),
+                        examined_by="" if pending else "Dr. Seed",
+                        right_sph=refraction(rng), right_cyl=refraction(rng), right_axis=rng.randrange(181),
+                        left_sph=refraction(rng), left_cyl=refraction(rng), left_axis=rng.randrange(181),
+                        state="Pending" if pending else "Completed",
+                        created_at=exam_created,
+                        updated_at=exam_created,
+                    )
+                    exam_rows.append(examination)
+                    client.visit_count = visit + 1
+                    client.last_examination_date = exam_created.date()
+
+                    if pending:
+                        continue
+                    if rng.random() >= sale_ratio:
+                        examination.booked_for_sales = True
+                        continue
+                    sale, payments = build_sale(rng, examination, exam_created, end, outstanding_ratio)
+                    sale_rows.append(sale)
+                    payment_rows.extend(payments)
+                    # Visits are in date order, so the last sale is the latest
+                    client.latest_sale = sale
+                    client.outstanding_balance += outstanding(sale.balance_due)
+                    client.open_orders += sale.balance_due > 0
+
+            # latest_sale points forward to the sales; the FK is checked at commit
+            with transaction.atomic():
+                Client.objects.bulk_create(client_rows)
+                Examination.objects.bulk_create(exam_rows)
+                Sales.objects.bulk_create(sale_rows)
+                Payment.objects.bulk_create(payment_rows)
+            totals["clients"] += len(client_rows)
+            totals["examinations"] += len(exam_rows)
+            totals["sales"] += len(sale_rows)
+            totals["payments"] += len(payment_rows)
+            if stdout:
+                stdout.write(f"  seeded {totals['clients']}/{clients} clients")
+    get_search_backend().rebuild()
+    return totals
+
+
+def seed_staff(count=10):
+    """
+    Staff accounts with unusable passwords, the first one a superuser (for
+    the admin endpoints and `manage.py benchmark_endpoints`). Existing
+    accounts are kept. Returns the number created.
+    """
+    users = get_user_model()
+    staff = []
+    for index in range(count):
+        user = users(
+            email=f"staff{index}@seed.example.com",
+            first_name=FIRST_NAMES[index % len(FIRST_NAMES)],
+            last_name="Seed",
+            role=STAFF_ROLES[index % len(STAFF_ROLES)],
+            is_superuser=index == 0,
+        )
+        user.set_unusable_password()
+        staff.append(user)
+    existing = set(users.objects.filter(email__in=[user.email for user in staff]).values_list("email", flat=True))
+    return len(users.objects.bulk_create([user for user in staff if user.email not in existing]))
+
+
+def build_sale(rng, examination, created, end, outstanding_ratio):
+    """
+    A sale and its payments: unpaid, a deposit (maybe followed by part of
+    the balance), or paid in full at once or as deposit and balance.
+    """
+    frame_brand, frame_model = rng.choice(FRAMES)
+    lens_brand, lens_type = rng.choice(LENSES)
+    frame_price = Decimal(rng.randrange(20, 300) * 100)
+    lens_price = Decimal(rng.randrange(10, 200) * 100)
+    total = frame_price + lens_price
+    method = rng.choice(PAYMENT_METHODS)
+    sale = Sales(
+        id=uuid.UUID(int=rng.getrandbits(128), version=4),
+        examination=examination,
+        frame_brand=frame_brand, frame_model=frame_model, frame_color="Black", frame_price=frame_price,
+        lens_brand=lens_brand, lens_type=lens_type, lens_material="Polycarbonate",
+        lens_coating="Anti-glare", lens_price=lens_price,
+        booked_by="Seed", served_by="Dr. Seed",
+        payment_method=method, advance_payment_method=method,
+        total_price=total, advance_paid=ZERO, balance_due=total,
+        advance_payment_status="Pending", balance_payment_status="Pending", order_paid="Pending",
+        created_at=created, updated_at=created,
+    )
+
+    owing = rng.random() < outstanding_ratio
+    if owing and rng.random() < 0.2:
+        return sale, []
+    deposit = (total * Decimal(rng.choice([25, 50, 75])) / 100).quantize(ZERO)
+    if not owing and rng.random() < 0.6:
+        deposit = total
+    payments = [build_payment(rng, sale, deposit, method, created)]
+    sale.mpesa_transaction_code = payments[0].mpesa_transaction_code
+    sale.advance_paid, sale.balance_due = deposit, total - deposit
+    if sale.balance_due <= 0:
+        sale.advance_payment_status = sale.balance_payment_status = sale.order_paid = "Paid"
+        return sale, payments
+    sale.advance_payment_status = sale.order_paid = "Partially Paid"
+    if owing and rng.random() < 0.5:
+        return sale, payments
+
+    # A later balance payment, as clients.services.record_payment posts it
+    paid = sale.balance_due if not owing else (sale.balance_due / 2).quantize(ZERO)
+    paid_at = min(created + timedelta(days=rng.randrange(1, 30)), end)
+    payments.append(build_payment(rng, sale, paid, rng.choice(PAYMENT_METHODS), paid_at))
+    sale.advance_paid += paid
+    sale.balance_due -= paid
+    sale.balance_payment_status = sale.order_paid = "Paid" if sale.balance_due == 0 else "Partially Paid"
+    sale.updated_at = paid_at
+    return sale, payments
+
+
+def build_payment(rng, sale, amount, method, created):
+    payment_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+    return Payment(
+        id=payment_id,
+        sale=sale,
+        amount=amount,
+        method=method,
+        # Codes are unique across the ledger
+        mpesa_transaction_code=f"S{payment_id.hex[:15].upper()}" if method == "Mpesa" else None,
+        received_by="Dr. Seed",
+        created_at=created,
+    )
@@ -0,0 +1,164 @@
+"""
+Client workflow transitions.
+
+An examination moves Pending -> Completed (and booked for sales) -> sold,
+and the sale is then paid off. Each step is one transaction that writes
+the rows it changes once; related counters and flags are updated with
+QuerySet.update so no extra post_save receivers fire.
+"""
+from datetime import date
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.timezone import now
+from .balances import ZERO, record_balance_change
+from .models import Client, Examination, Payment, Sales
+from .signals import bulk_created, examination_booking_message, sales_update_message
+from .sms import queue_message, queue_messages
+
+
+class PaymentRejected(Exception):
+    """The payment doesn't fit the sale's current balance; nothing was written."""
+
+
+def register_client(serializer, registered_by):
+    """Creates the client and books their first examination."""
+    with transaction.atomic():
+        client = serializer.save(registered_by=registered_by)
+        Examination.objects.create(client=client)
+    return client
+
+
+def book_examination(client):
+    """Books a returning client for a new examination."""
+    return book_examinations([client])[0]
+
+
+def book_examinations(clients):
+    """
+    Books each client for a new examination: one insert for the
+    examinations, one visit_count update and one batch of booking SMS.
+    """
+    with transaction.atomic():
+        examinations = Examination.objects.bulk_create([Examination(client=client) for client in clients])
+        Client.objects.filter(pk__in=[client.pk for client in clients]).update(
+            visit_count=F("visit_count") + 1, updated_at=now()
+        )
+        queue_messages(
+            [(examination.client.phone_number, examination_booking_message(examination)) for examination in examinations]
+        )
+        bulk_created.send(sender=Examination, clients=[], examinations=examinations)
+    return examinations
+
+
+def complete_examination(serializer, examined_by):
+    """
+    Pending -> Completed. A completed examination is booked for sales unless
+    it has already been sold.
+    """
+    examination = serializer.instance
+    with transaction.atomic():
+        sold = Sales.objects.filter(examination=examination).exists()
+        examination = serializer.save(examined_by=examined_by, state="Completed", booked_for_sales=not sold)
+        Client.objects.filter(pk=examination.client_id).update(
+            last_examination_date=date.today(), updated_at=now()
+        )
+    return examination
+
+
+def create_sale(validated_data):
+    """
+    Booked for sales -> sold. The sale becomes the client's latest and adds
+    to their balance. Raises PaymentRejected if the advance's M-Pesa code
+    was posted before.
+    """
+    with transaction.atomic():
+        sale = Sales(**validated_data)
+        sale.save()
+        if sale.advance_paid > 0:
+            # The advance opens the sale's payment ledger
+            try:
+                with transaction.atomic():
+                    Payment.objects.create(
+                        sale=sale,
+                        amount=sale.advance_paid,
+                        method=sale.advance_payment_method or sale.payment_method,
+                        mpesa_transaction_code=sale.mpesa_transaction_code or None,
+                        received_by=sale.served_by,
+                    )
+            except IntegrityError:
+                raise PaymentRejected(f"M-Pesa transaction {sale.mpesa_transaction_code} has already been posted.")
+        record_balance_change(sale.examination_id, ZERO, sale.balance_due, latest_sale=sale)
+        Examination.objects.filter(pk=sale.examination_id, booked_for_sales=True).update(
+            booked_for_sales=False, updated_at=now()
+        )
+        sale.examination.booked_for_sales = False
+    return sale
+
+
+def record_payment(sale_id, amount, method, received_by, mpesa_transaction_code=None):
+    """
+    Posts a balance payment: appends it to the ledger and moves the sale's
+    paid/due columns under a row lock, so simultaneous payments queue up
+    instead of overwriting each other. Raises PaymentRejected if the sale
+    is already paid off, the amount exceeds what's due or the M-Pesa code
+    was posted before.
+    """
+    if amount <= 0:
+        raise PaymentRejected("Payment amount must be greater than zero.")
+    with transaction.atomic():
+        sale = (
+            Sales.objects.select_for_update(of=("self",))
+            .select_related("examination__client")
+            .get(pk=sale_id)
+        )
+        if sale.balance_due <= 0:
+            raise PaymentRejected("Sale is already fully paid. No further payments allowed.")
+        if amount > sale.balance_due:
+            raise PaymentRejected(
+                f"Payment exceeds the remaining balance due. Please pay the exact balance amount {sale.balance_due} or less."
+            )
+
+        try:
+            with transaction.atomic():
+                payment = Payment.objects.create(
+                    sale=sale, amount=amount, method=method,
+                    mpesa_transaction_code=mpesa_transaction_code or None, received_by=received_by,
+                )
+        except IntegrityError:
+            raise PaymentRejected(f"M-Pesa transaction {mpesa_transaction_code} has already been posted.")
+        old_balance = sale.balance_due
+        sale.advance_paid += amount
+        sale.balance_due -= amount
+        sale.balance_payment_status = sale.order_paid = "Paid" if sale.balance_due == 0 else "Partially Paid"
+        sale.updated_at = now()
+        # Only the payment columns; the rest of the row isn't rewritten
+        Sales.objects.filter(pk=sale.pk).update(
+            advance_paid=F("advance_paid") + amount,
+            balance_due=F("balance_due") - amount,
+            balance_payment_status=sale.balance_payment_status,
+            order_paid=sale.order_paid,
+            updated_at=sale.updated_at,
+        )
+        record_balance_change(sale.examination_id, old_balance, sale.balance_due)
+        queue_message(sale.examination.client.phone_number, sales_update_message(sale))
+    return payment, sale
+
+
+def update_sale(sale, changes):
+    """
+    Applies non-payment edits (prices, quantities, order details) to a
+    freshly locked copy of the sale, so a payment posted meanwhile isn't
+    overwritten; Sales.save() recomputes the totals.
+    """
+    with transaction.atomic():
+        locked = Sales.objects.select_for_update(of=("self",)).get(pk=sale.pk)
+        old_balance, old_examination_id = locked.balance_due, locked.examination_id
+        for attr, value in changes.items():
+            setattr(locked, attr, value)
+        locked.save()
+        if locked.examination_id == old_examination_id:
+            record_balance_change(locked.examination_id, old_balance, locked.balance_due)
+        else:
+            record_balance_change(old_examination_id, old_balance, ZERO)
+            record_balance_change(locked.examination_id, ZERO, locked.balance_due)
+    return locked
@@ -1,46 +1,44 @@
-from django.db.models.signals import post_save, pre_save
-from django.dispatch import receiver
+from django.db.models.signals import post_save, pre_save, post_delete
+from django.dispatch import Signal, receiver
 from .models import Client, Examination, Sales, Branch
-import africastalking
-from decouple import config
-from datetime import datetime
-import uuid
+from .reg_numbers import clear_branch_codes, next_reg_no
+from .search import get_search_backend, normalize_phone
+from .sms import queue_message
 
 
-africastalking.initialize(
-    username='sandbox',
-    api_key=config('AFRICASTALKING_API_KEY', cast=str)
+# Sent after clients or examinations are created with bulk_create (bulk
+# import, group bookings), which skips the per-row model signals; receivers
+# get the created `clients` and `examinations` lists.
+bulk_created = Signal()
 
-)
-
-sms = africastalking.SMS
 
 def send_message(phone_number, message):
-    try:
-        # response = sms.send(message, [phone_number]) 
-        print(f"SMS sent to {phone_number}: {message}")
-    except Exception as e:
-        print(f"SMS sending failed")
+    # Queued in the outbox and sent by the `process_sms_outbox` worker,
+    # so requests never wait on the SMS provider.
+    queue_message(phone_number, message)
+
+
+def welcome_message(client):
+    return f"Hello {client.first_name}, welcome to Iris! We are glad to have you."
+
+
+def examination_booking_message(examination):
+    return f"Hello {examination.client.first_name}, your examination is booked for {examination.examination_date}."
 
     
 @receiver(post_save, sender=Client)
 def send_welcome_message(sender, instance, created, **kwargs):
     if created:
-        message = f"Hello {instance.first_name}, welcome to Iris! We are glad to have you."
-        send_message(instance.phone_number, message)
+        send_message(instance.phone_number, welcome_message(instance))
         
 
 @receiver(post_save, sender=Examination)
 def send_examination_booking_message(sender, instance, created, **kwargs):
     if created:
-        message = f"Hello {instance.client.first_name}, your examination is booked for {instance.examination_date}."
-        send_message(instance.client.phone_number, message)
-        
-@receiver(post_save, sender=Examination)
-def mark_examination_as_booked_for_sale(sender, instance, **kwargs):
-    if instance.state == "Completed" and not instance.booked_for_sales:
-        instance.booked_for_sales = True
-        instance.save()
+        send_message(instance.client.phone_number, examination_booking_message(instance))
+
+# Pending -> Completed -> booked for sales -> sold transitions live in
+# clients.services, which updates the related rows without re-saving them.
 
         
 @receiver(post_save, sender=Sales)
@@ -50,45 +48,53 @@ def send_sales_confirmation(sender, instance, created, **kwargs):
         send_message(instance.examination.client.phone_number, message)
         
 
-@receiver(post_save, sender=Sales)
-def send_sales_update_notification(sender, instance, **kwargs):
-    client = instance.examination.client
-    phone_number = client.phone_number
-    name = client.first_name
-    status = instance.order_paid 
+def sales_update_message(sale):
+    name = sale.examination.client.first_name
+    status = sale.order_paid 
 
-    message = f"Hello {name}, your order payment status is now: {status}. Balance Due: {instance.balance_due}. "
+    message = f"Hello {name}, your order payment status is now: {status}. Balance Due: {sale.balance_due}. "
     
-    if instance.balance_due == 0:
+    if sale.balance_due == 0:
         message = f"Thank you {name}  for your payment. Your order is now complete." 
-              
+    return message
+
 
-    send_message(phone_number, message)
+@receiver(post_save, sender=Sales)
+def send_sales_update_notification(sender, instance, created, **kwargs):
+    if created:
+        # New orders get the confirmation above
+        return
+    # Payments are posted by clients.services.record_payment, which
+    # queues this message itself
+    send_message(instance.examination.client.phone_number, sales_update_message(instance))
 
 
 @receiver(pre_save, sender=Client)
 def generate_client_reg_no(sender, instance, **kwargs):
     """
-    Generates a unique reg_no in the format:
-    [Branch]/[Year]/[Month]/[First 6 chars of UUID]
-    Example: M/2025/03/A1B2C3
+    Assigns a reg_no in the format [Branch]/[Year]/[Month]/[Sequence],
+    e.g. M/2025/03/000042, from the per-branch monthly counter.
     """
-
     if not instance.reg_no:  # Ensure it's not already assigned
-        # Extract branch name from "City, Area"
-        branch = instance.branch.strip() 
+        instance.reg_no = next_reg_no(instance.branch)
 
-        # Fetch the branch code from the database
-        branch = Branch.objects.filter(name__iexact=branch).first()
-        branch_code = branch.code if branch else "XX"  
-        
-        current_year = datetime.now().year
-        current_month = datetime.now().month
 
-        #  Use the first 6 characters of UUID
-        unique_id = str(uuid.uuid4())[:6].upper()
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def refresh_branch_codes(sender, **kwargs):
+    clear_branch_codes()
+
+
+@receiver(pre_save, sender=Client)
+def normalize_client_phone(sender, instance, **kwargs):
+    instance.phone_digits = normalize_phone(instance.phone_number)
+
+
+@receiver(post_save, sender=Client)
+def index_client_for_search(sender, instance, **kwargs):
+    get_search_backend().index_client(instance)
 
-        # Format the registration number
-        new_reg_no = f"{branch_code}/{current_year}/{current_month:02d}/{unique_id}"
 
-        instance.reg_no = new_reg_no  # Assign the unique reg_no
+@receiver(post_delete, sender=Client)
+def remove_client_from_search(sender, instance, **kwargs):
+    get_search_backend().remove_client(instance)
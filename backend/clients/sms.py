@@ -0,0 +1,188 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+class ConsoleGateway:
+    """Prints messages instead of sending them (the default outside production)."""
+
+    def send(self, message, recipients):
+        for phone_number in recipients:
+            print(f"SMS sent to {phone_number}: {message}")
+        return []
+
+
+class FakeGateway:
+    """Records every send in `FakeGateway.sent`; numbers in `failing` are rejected."""
+    sent = []
+    failing = set()
+
+    def send(self, message, recipients):
+        FakeGateway.sent.append((message, list(recipients)))
+        return [number for number in recipients if number in FakeGateway.failing]
+
+    @classmethod
+    def reset(cls):
+        cls.sent = []
+        cls.failing = set()
+
+
+class AfricasTalkingGateway:
+    def __init__(self):
+        import africastalking
+        from decouple import config
+
+        africastalking.initialize(
+            username=getattr(settings, "AFRICASTALKING_USERNAME", "sandbox"),
+            api_key=config('AFRICASTALKING_API_KEY', cast=str)
+        )
+        self.sms = africastalking.SMS
+
+    def send(self, message, recipients):
+        response = self.sms.send(message, list(recipients))
+        statuses = response.get("SMSMessageData", {}).get("Recipients", [])
+        delivered = {entry.get("number") for entry in statuses if entry.get("status") == "Success"}
+        return [number for number in recipients if number not in delivered]
+
+
+_gateway = None
+
+
+def get_gateway():
+    global _gateway
+    path = getattr(settings, "SMS_GATEWAY", "clients.sms.ConsoleGateway")
+    if _gateway is None or _gateway[0] != path:
+        _gateway = (path, import_string(path)())
+    return _gateway[1]
+
+
+def queue_message(phone_number, message):
+    """Adds an SMS to the outbox; it joins the caller's transaction, if any."""
+    return OutboxMessage.objects.create(phone_number=phone_number, message=message)
+
+
+def queue_messages(messages):
+    """Bulk variant of queue_message for (phone_number, message) pairs."""
+    return OutboxMessage.objects.bulk_create(
+        [OutboxMessage(phone_number=phone_number, message=message) for phone_number, message in messages]
+    )
+
+
+class RateLimiter:
+    """Spaces gateway calls at least 1 / rate seconds apart."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.last_call = 0.0
+
+    def wait(self):
+        delay = self.last_call + self.interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self.last_call = time.monotonic()
+
+
+def backoff(attempts):
+    base = getattr(settings, "SMS_RETRY_BASE_SECONDS", 30)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def lease_seconds():
+    return getattr(settings, "SMS_LEASE_SECONDS", 300)
+
+
+def claim_due(limit):
+    """
+    Marks up to `limit` due messages Sending under a new lease, in one short
+    transaction, and returns them. Messages whose lease ran out (their
+    worker died mid-send) are due again.
+    """
+    timestamp = now()
+    lease = timestamp + timedelta(seconds=lease_seconds())
+    due = (
+        Q(status="Pending", next_attempt_at__lte=timestamp)
+        | Q(status="Sending", locked_until__lte=timestamp)
+    )
+    with transaction.atomic():
+        # Workers running side by side skip each other's claimed rows (Postgres)
+        ids = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(due).order_by("next_attempt_at").values_list("pk", flat=True)[:limit]
+        )
+        OutboxMessage.objects.filter(due, pk__in=ids).update(status="Sending", locked_until=lease)
+    return list(OutboxMessage.objects.filter(pk__in=ids, status="Sending", locked_until=lease)), lease
+
+
+def record_results(rows, lease):
+    """Saves a batch's outcome, skipping rows whose lease was taken over meanwhile."""
+    with transaction.atomic():
+        ours = set(
+            OutboxMessage.objects.select_for_update()
+            .filter(pk__in=[row.pk for row in rows], status="Sending", locked_until=lease)
+            .values_list("pk", flat=True)
+        )
+        OutboxMessage.objects.bulk_update(
+            [row for row in rows if row.pk in ours],
+            ["status", "attempts", "next_attempt_at", "last_error", "sent_at", "locked_until"],
+        )
+    return ours
+
+
+def process_outbox(gateway=None, limit=500, limiter=None):
+    """
+    Sends due outbox messages. Recipients sharing the same text go out in
+    one gateway call (up to SMS_BATCH_SIZE numbers); failures are retried
+    with exponential backoff until SMS_MAX_ATTEMPTS, then marked Failed.
+    Returns the number of messages sent.
+
+    Rows are claimed and each batch's outcome is recorded in short
+    transactions; no transaction is open during gateway calls. A worker
+    that dies between a send and its record leaves the batch Sending, and
+    it is sent again once its SMS_LEASE_SECONDS lease runs out.
+    """
+    gateway = gateway or get_gateway()
+    limiter = limiter or RateLimiter(getattr(settings, "SMS_RATE_LIMIT_PER_SECOND", 5))
+    batch_size = getattr(settings, "SMS_BATCH_SIZE", 100)
+    max_attempts = getattr(settings, "SMS_MAX_ATTEMPTS", 5)
+    sent = 0
+
+    due, lease = claim_due(limit)
+    by_message = defaultdict(list)
+    for outbox_message in due:
+        by_message[outbox_message.message].append(outbox_message)
+
+    for message, rows in by_message.items():
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            limiter.wait()
+            try:
+                failed = set(gateway.send(message, [row.phone_number for row in batch]))
+                error = "Rejected by gateway"
+            except Exception as exc:
+                logger.exception("SMS gateway call failed")
+                failed = {row.phone_number for row in batch}
+                error = str(exc)
+
+            timestamp = now()
+            for row in batch:
+                row.attempts += 1
+                row.locked_until = None
+                if row.phone_number not in failed:
+                    row.status, row.sent_at, row.last_error = "Sent", timestamp, ""
+                elif row.attempts >= max_attempts:
+                    row.status, row.last_error = "Failed", error
+                else:
+                    row.status = "Pending"
+                    row.next_attempt_at, row.last_error = timestamp + backoff(row.attempts), error
+            recorded = record_results(batch, lease)
+            sent += sum(1 for row in batch if row.pk in recorded and row.status == "Sent")
+    return sent
@@ -1,3 +1,1098 @@
-from django.test import TestCase
+import io
+import json
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase, APITransactionTestCase, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+from backend.db_router import ReadReplicaRouter, read_from_replica
+from analytics.models import APIRequestMetric
+from .models import Branch, Client, Examination, IdempotencyKey, Payment, Sales, OutboxMessage, RegistrationCounter
+from .bulk import import_clients
+from . import balances, idempotency, receipts, reg_numbers
+from .seeding import seed
+from .api.views import SearchClientBalanceView
+from .api.plain import PlainList, PlainSerializer
+from .api.renderers import ORJSONRenderer
+from .api.serializers import ClientSerializer, ExaminationSerializer, SalesSerializer
+from .services import PaymentRejected, book_examination, book_examinations, complete_examination, create_sale, record_payment
+from .search import fallback_backend, get_search_backend, search_client_ids, sqlite_backend
+from .sms import FakeGateway, RateLimiter, process_outbox
 
-# Create your tests here.
+
+def make_client(index, **kwargs):
+    data = {
+        "first_name": f"Client{index}",
+        "last_name": "Test",
+        "dob": "1990-01-01",
+        "phone_number": f"+2547000000{index:02d}",
+        "email": f"client{index}@example.com",
+        "location": "Nairobi",
+        "branch": "Nairobi",
+        "registered_by": "Reception",
+        "gender": "F",
+    }
+    data.update(kwargs)
+    return Client.objects.create(**data)
+
+
+def make_sale(examination, **kwargs):
+    data = {
+        "examination": examination,
+        "frame_brand": "Brand",
+        "frame_model": "Model",
+        "frame_color": "Black",
+        "frame_price": Decimal("1000.00"),
+        "lens_brand": "Lens",
+        "lens_type": "Single Vision",
+        "lens_material": "Polycarbonate",
+        "lens_coating": "Anti-glare",
+        "lens_price": Decimal("500.00"),
+        "booked_by": "Reception",
+        "served_by": "Dr. Test",
+    }
+    data.update(kwargs)
+    return create_sale(data)
+
+
+class ClientListingQueryTests(TestCase):
+    def populate(self, count):
+        for index in range(count):
+            client = make_client(index)
+            examination = Examination.objects.create(client=client)
+            Examination.objects.create(client=client)
+            make_sale(examination, advance_paid=Decimal("600.00"))
+
+    def serialize_listing(self):
+        return ClientSerializer(Client.objects.for_listing(), many=True).data
+
+    def test_query_count_is_constant(self):
+        self.populate(2)
+        with self.assertNumQueries(2):
+            self.serialize_listing()
+
+        self.populate(10)
+        with self.assertNumQueries(2):
+            data = self.serialize_listing()
+        self.assertEqual(len(data), 12)
+
+    def test_annotations_match_per_row_lookups(self):
+        self.populate(3)
+        client = Client.objects.first()
+        make_sale(client.examinations.first(), advance_paid=Decimal("1500.00"))
+
+        annotated = ClientSerializer(Client.objects.for_listing().get(pk=client.pk)).data
+        plain = ClientSerializer(Client.objects.get(pk=client.pk)).data
+
+        self.assertEqual(annotated, plain)
+        self.assertEqual(annotated["balance"], 900.0)
+        self.assertEqual(annotated["payment_status"], "pending_balance")
+        self.assertEqual(len(annotated["examinations"]), 2)
+
+    def test_query_benchmark_only_drops_indexes_when_asked(self):
+        self.populate(1)
+        with mock.patch.object(connection, "schema_editor") as schema_editor:
+            call_command("benchmark_queries", "--runs", "1", stdout=io.StringIO())
+            schema_editor.assert_not_called()
+            call_command("benchmark_queries", "--runs", "1", "--drop-indexes", stdout=io.StringIO())
+            self.assertEqual(schema_editor.call_count, 2)  # drop, then recreate
+
+
+class ExaminationWorkflowTests(TestCase):
+    """Pending -> Completed -> booked for sales -> sold, one write per row touched."""
+
+    def setUp(self):
+        self.client_record = make_client(1)
+        self.examination = Examination.objects.create(client=self.client_record)
+
+    def complete(self):
+        examination = Examination.objects.get(pk=self.examination.pk)
+        serializer = ExaminationSerializer(examination, data={"clinical_history": "Mild myopia", "right_sph": "-1.25"}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        # savepoint, sold check, examination update, client update, release
+        with self.assertNumQueries(5):
+            return complete_examination(serializer, "Dr. Test")
+
+    def sell(self):
+        serializer = SalesSerializer(data={
+            "examination": str(self.examination.pk),
+            "frame_brand": "Brand", "frame_model": "Model", "frame_color": "Black", "frame_price": "1000.00",
+            "lens_brand": "Lens", "lens_type": "Single Vision", "lens_material": "Polycarbonate",
+            "lens_coating": "Anti-glare", "lens_price": "500.00", "advance_paid": "600.00",
+            "booked_by": "Reception", "served_by": "Dr. Test",
+        })
+        # examination + client, duplicate check, savepoint, sale insert,
+        # queued SMS, daily rollup (2), opening payment in its own savepoint
+        # (3), client balance summary, unbook examination, release
+        with self.assertNumQueries(13):
+            serializer.is_valid(raise_exception=True)
+            return serializer.save()
+
+    def test_transitions(self):
+        self.complete()
+        self.examination.refresh_from_db()
+        self.client_record.refresh_from_db()
+        self.assertEqual(self.examination.state, "Completed")
+        self.assertEqual(self.examination.clinical_history, "Mild myopia")
+        self.assertEqual(self.examination.right_sph, Decimal("-1.25"))
+        self.assertEqual(self.examination.examined_by, "Dr. Test")
+        self.assertTrue(self.examination.booked_for_sales)
+        self.assertIsNotNone(self.client_record.last_examination_date)
+
+        sale = self.sell()
+        self.examination.refresh_from_db()
+        self.assertFalse(self.examination.booked_for_sales)
+        self.assertEqual(sale.balance_due, Decimal("900.00"))
+        self.assertEqual(OutboxMessage.objects.filter(message__contains="order has been placed").count(), 1)
+        self.assertFalse(OutboxMessage.objects.filter(message__contains="payment status").exists())
+
+    def test_completing_a_sold_examination_keeps_it_unbooked(self):
+        self.complete()
+        self.sell()
+        self.complete()
+        self.examination.refresh_from_db()
+        self.assertFalse(self.examination.booked_for_sales)
+
+    def test_booking_increments_visit_count_in_place(self):
+        # savepoint, examination insert, queued SMS, daily rollup (2), visit count, release
+        with self.assertNumQueries(7):
+            book_examination(self.client_record)
+        self.client_record.refresh_from_db()
+        self.assertEqual(self.client_record.visit_count, 2)
+        self.assertEqual(self.client_record.examinations.count(), 2)
+
+
+# Write request logs straight through so no hits outlive the test database.
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        self.client.force_authenticate(user)
+        for index in range(5):
+            Examination.objects.create(client=make_client(index))
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get(reverse("clients:all_examinations"))
+        self.assertEqual(len(response.data["d"]), 5)
+
+    def test_walks_pages_forward_and_back(self):
+        url = reverse("clients:all_examinations")
+        first = self.client.get(url, {"page_size": 2}).data
+        self.assertIsNone(first["previous"])
+
+        second = self.client.get(first["next"]).data
+        third = self.client.get(second["next"]).data
+        self.assertIsNone(third["next"])
+
+        seen = [row["id"] for page in (first, second, third) for row in page["results"]]
+        expected = [str(pk) for pk in Examination.objects.order_by("-created_at", "-id").values_list("id", flat=True)]
+        self.assertEqual(seen, expected)
+
+        back = self.client.get(third["previous"]).data
+        self.assertEqual(back["results"], second["results"])
+
+    def test_rejects_tampered_cursor(self):
+        response = self.client.get(reverse("clients:all_examinations"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class ClientSearchTests(TestCase):
+    def setUp(self):
+        self.jane = make_client(1, first_name="Jane", last_name="Wanjiru", phone_number="+254 712 345 678")
+        self.john = make_client(2, first_name="John", last_name="Kamau", phone_number="0733-111-222")
+        self.janet = make_client(3, first_name="Janet", last_name="Jane", phone_number="+254799000111")
+
+    def test_uses_fts_index_on_sqlite(self):
+        self.assertTrue(get_search_backend().is_available())
+
+    def test_ranks_partial_name_matches(self):
+        results = search_client_ids("jane")
+        self.assertEqual(set(results), {self.jane.id, self.janet.id})
+        self.assertEqual(results[0], self.janet.id)  # matches two columns
+
+    def test_partial_phone_number_in_any_format(self):
+        self.assertEqual(search_client_ids("712 345"), [self.jane.id])
+        self.assertEqual(search_client_ids("+254-7123"), [self.jane.id])
+        self.assertEqual(search_client_ids("111222"), [self.john.id])
+
+    def test_country_code_and_local_prefix_find_each_other(self):
+        for backend in (sqlite_backend, fallback_backend):
+            self.assertEqual(backend.search("0712 345", 50), [self.jane.id])
+            self.assertEqual(backend.search("+254 733 111", 50), [self.john.id])
+
+    def test_numeric_reg_no_fragment(self):
+        self.john.reg_no = "NB/2026/10/000042"
+        self.john.save()
+        for backend in (sqlite_backend, fallback_backend):
+            self.assertEqual(backend.search("000042", 50), [self.john.id])
+            self.assertEqual(backend.search("2026/10/000042", 50), [self.john.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.john.first_name = "Jonathan"
+        self.john.save()
+        self.assertEqual(search_client_ids("jonathan"), [self.john.id])
+        self.john.delete()
+        self.assertEqual(search_client_ids("jonathan"), [])
+
+    def test_short_terms_fall_back_to_substring_match(self):
+        self.assertEqual(set(search_client_ids("Ja")), {self.jane.id, self.janet.id})
+
+    def test_respects_limit(self):
+        self.assertEqual(len(search_client_ids("254", limit=1)), 1)
+
+    def test_within_and_search_filter(self):
+        for backend in (sqlite_backend, fallback_backend):
+            within = Client.objects.exclude(id=self.janet.id)
+            self.assertEqual(backend.search("jane", 1, within), [self.jane.id])
+            self.assertEqual(backend.search("ja", 50, within), [self.jane.id])
+            matches = Client.objects.filter(backend.search_filter("jane"))
+            self.assertEqual(set(matches), {self.jane, self.janet})
+            self.assertEqual(list(Client.objects.filter(backend.search_filter("0733 111"))), [self.john])
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1, CLIENT_SEARCH_LIMIT=3)
+class SearchWithinListingTests(APITestCase):
+    """Views that narrow the search apply the limit after narrowing it."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        self.client.force_authenticate(user)
+        # Oldest and matching one column, so it ranks last in every backend
+        self.doe = make_client(0, first_name="John", last_name="Doe")
+        for index in range(1, 6):
+            make_client(index, first_name="John", last_name="Johnson", email=f"john{index}@example.com")
+
+    def test_booked_for_sales_search(self):
+        Examination.objects.create(client=self.doe, state="Completed", booked_for_sales=True)
+        url = reverse("clients:get-booked-client-for-sales")
+        for query in ("John", "Doe"):
+            rows = self.client.get(url, {"search": query}).json()
+            self.assertEqual([row["client"] for row in rows], [str(self.doe.id)])
+
+    def test_balance_search(self):
+        url = reverse("clients:search-client-balance")
+        for client in Client.objects.filter(last_name="Johnson"):  # paid up, and ranked first
+            make_sale(Examination.objects.create(client=client), advance_paid=Decimal("1500.00"))
+        self.assertEqual(self.client.get(url, {"q": "John"}).data, {"message": "Client found, but balance is fully paid."})
+
+        sale = make_sale(Examination.objects.create(client=self.doe), advance_paid=Decimal("600.00"))
+        response = self.client.get(url, {"q": "John"})
+        self.assertEqual([row["id"] for row in response.data], [str(sale.id)])
+        self.assertEqual(self.client.get(url, {"q": "Nobody"}).status_code, 404)
+
+
+class TransactionCheckingGateway(FakeGateway):
+    """Records, per send, whether a transaction was open and the rows' status."""
+    calls = []
+
+    def send(self, message, recipients):
+        statuses = list(OutboxMessage.objects.filter(phone_number__in=recipients).values_list("status", flat=True))
+        TransactionCheckingGateway.calls.append((connection.in_atomic_block, statuses))
+        return super().send(message, recipients)
+
+
+@override_settings(SMS_GATEWAY="clients.tests.TransactionCheckingGateway")
+class SMSOutboxTransactionTests(TransactionTestCase):
+    def test_gateway_calls_run_outside_transactions(self):
+        FakeGateway.reset()
+        TransactionCheckingGateway.calls = []
+        OutboxMessage.objects.create(phone_number="+254700000001", message="Hi")
+        self.assertEqual(process_outbox(limiter=RateLimiter(0)), 1)
+        self.assertEqual(TransactionCheckingGateway.calls, [(False, ["Sending"])])
+        self.assertEqual(OutboxMessage.objects.get().status, "Sent")
+
+
+@override_settings(SMS_GATEWAY="clients.sms.FakeGateway", SMS_BATCH_SIZE=2)
+class SMSOutboxTests(TestCase):
+    def setUp(self):
+        FakeGateway.reset()
+        self.limiter = RateLimiter(0)
+
+    def test_signals_queue_instead_of_sending(self):
+        make_client(1)
+        self.assertEqual(FakeGateway.sent, [])
+        self.assertEqual(OutboxMessage.objects.filter(status="Pending").count(), 1)
+
+    def test_batches_recipients_of_the_same_message(self):
+        for number in ("+254700000001", "+254700000002", "+254700000003"):
+            OutboxMessage.objects.create(phone_number=number, message="Clinic closed on Friday")
+        OutboxMessage.objects.create(phone_number="+254700000004", message="Other")
+
+        self.assertEqual(process_outbox(limiter=self.limiter), 4)
+        self.assertEqual(sorted(len(recipients) for _, recipients in FakeGateway.sent), [1, 1, 2])
+        self.assertFalse(OutboxMessage.objects.exclude(status="Sent").exists())
+
+    def test_failed_recipients_are_retried_with_backoff(self):
+        FakeGateway.failing = {"+254700000009"}
+        failing = OutboxMessage.objects.create(phone_number="+254700000009", message="Hi")
+        OutboxMessage.objects.create(phone_number="+254700000008", message="Hi")
+
+        self.assertEqual(process_outbox(limiter=self.limiter), 1)
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ("Pending", 1))
+        self.assertGreater(failing.next_attempt_at, failing.created_at)
+
+        # Not due yet, so nothing is sent again
+        self.assertEqual(process_outbox(limiter=self.limiter), 0)
+        self.assertEqual(len(FakeGateway.sent), 1)
+
+    def test_expired_leases_are_claimed_again(self):
+        stuck = OutboxMessage.objects.create(
+            phone_number="+254700000007", message="Hi", status="Sending",
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+        OutboxMessage.objects.create(
+            phone_number="+254700000006", message="Hi", status="Sending",
+            locked_until=timezone.now() + timedelta(minutes=5),
+        )
+        self.assertEqual(process_outbox(limiter=self.limiter), 1)
+        self.assertEqual(FakeGateway.sent, [("Hi", ["+254700000007"])])
+        stuck.refresh_from_db()
+        self.assertEqual((stuck.status, stuck.locked_until), ("Sent", None))
+
+    @override_settings(SMS_MAX_ATTEMPTS=1)
+    def test_gives_up_after_max_attempts(self):
+        FakeGateway.failing = {"+254700000009"}
+        failing = OutboxMessage.objects.create(phone_number="+254700000009", message="Hi")
+        process_outbox(limiter=self.limiter)
+        failing.refresh_from_db()
+        self.assertEqual(failing.status, "Failed")
+
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class BulkBookingTests(APITestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        self.client.force_authenticate(user)
+        self.clients = [make_client(index) for index in range(5)]
+        OutboxMessage.objects.all().delete()
+
+    def test_query_count_does_not_grow_with_the_group(self):
+        # savepoint, examinations, visit counts, queued SMS, daily rollup (2), release
+        with self.assertNumQueries(7):
+            book_examinations(self.clients)
+        self.assertEqual(Examination.objects.count(), 5)
+        self.assertEqual(OutboxMessage.objects.count(), 5)
+        self.assertEqual(set(Client.objects.values_list("visit_count", flat=True)), {2})
+
+    def test_endpoint_books_each_client_once(self):
+        ids = [str(client.id) for client in self.clients[:3]]
+        response = self.client.post(
+            reverse("clients:bulk_book_examinations"), {"client_ids": ids + ids[:1]}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["examinations"]), 3)
+        self.assertEqual(Client.objects.get(pk=self.clients[0].pk).visit_count, 2)
+
+    def test_unknown_client_books_nobody(self):
+        ids = [str(self.clients[0].id), "00000000-0000-4000-8000-000000000000"]
+        response = self.client.post(reverse("clients:bulk_book_examinations"), {"client_ids": ids}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Examination.objects.exists())
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class AsyncReadViewTests(TestCase):
+    """The async views served through the ASGI handler, as under uvicorn."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+        self.jane = make_client(1, first_name="Jane")
+        self.pending = Examination.objects.create(client=self.jane)
+        booked = Examination.objects.create(client=self.jane, state="Completed", booked_for_sales=True)
+        self.sale = make_sale(booked, advance_paid=Decimal("600.00"))
+
+    async def get(self, name, *args, **params):
+        return await self.async_client.get(reverse(f"clients:{name}", args=args), params, headers=self.headers)
+
+    async def test_read_endpoints(self):
+        response = await self.get("search_client", q="Jane")
+        self.assertEqual([client["id"] for client in response.json()], [str(self.jane.id)])
+
+        response = await self.get("pending_examinations")
+        self.assertEqual([row["id"] for row in response.json()["data"]], [str(self.pending.id)])
+
+        response = await self.get("pending_examinations", page_size=1)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+        response = await self.get("get-booked-client-for-sales", search="Jane")
+        self.assertEqual(response.status_code, 200)
+
+        response = await self.get("generate-receipt", self.sale.id)
+        self.assertEqual(response.json()["sales"]["balance_due"], 900)
+
+        response = await self.get("client-info", self.jane.id)
+        self.assertEqual(len(response.json()["examinations"]), 2)
+
+    async def test_receipt_batch_streams_asynchronously(self):
+        today = date.today().isoformat()
+        response = await self.get("receipt-batch", **{"from": today, "to": today, "type": "html"})
+        self.assertTrue(response.is_async)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join([chunk async for chunk in response.streaming_content])))
+        self.assertEqual(archive.namelist(), [f"receipt-{date.today():%Y%m%d}-{self.sale.id}.html"])
+
+    async def test_missing_rows_and_anonymous_requests(self):
+        response = await self.get("generate-receipt", self.jane.id)
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(reverse("clients:pending_examinations"))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_queries_are_counted_for_async_requests(self):
+        await self.get("pending_examinations")
+        metric = await APIRequestMetric.objects.aget(endpoint__endswith="examinations/pending/")
+        self.assertGreater(metric.total_queries, 0)
+
+IMPORT_CSV = """first_name,last_name,dob,phone_number,email,location,branch,gender
+Amina,Achieng,1990-05-01,+254 700 000 001,amina@example.com,Nakuru,nakuru,F
+Brian,Barasa,not-a-date,+254700000002,brian@example.com,Nakuru,Nakuru,M
+Cynthia,Kamau,1985-02-11,0700000003,cynthia@example.com,Nakuru,Nakuru,F
+"""
+
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        Branch.objects.create(name="Nakuru", code="NKR")
+
+    def test_imports_valid_rows_and_reports_the_rest(self):
+        result = import_clients(IMPORT_CSV.encode().splitlines(keepends=True), "csv",
+                                registered_by="Reception", chunk_size=2)
+        self.assertEqual(result["created"], 2)
+        self.assertEqual([error["row"] for error in result["errors"]], [2])
+        self.assertIn("dob", result["errors"][0]["errors"])
+
+        amina = Client.objects.get(first_name="Amina")
+        self.assertTrue(amina.reg_no.startswith("NKR/"))
+        self.assertEqual(amina.phone_digits, "254700000001")
+        self.assertEqual(amina.registered_by, "Reception")
+        self.assertEqual(search_client_ids("Cynthia"), [Client.objects.get(first_name="Cynthia").id])
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_ndjson_with_examinations_and_notifications(self):
+        lines = [
+            json.dumps({"first_name": "Amina", "last_name": "Achieng", "dob": "1990-05-01",
+                        "phone_number": "+254700000001", "email": "amina@example.com", "location": "Nakuru",
+                        "branch": "Nakuru", "gender": "F", "registered_by": "Legacy"}),
+            "{not json",
+        ]
+        # branch codes, reg_no counter (5 on first use), then one insert per
+        # table, the search index, the outbox and the daily rollup (2)
+        with self.assertNumQueries(15):
+            result = import_clients(lines, "ndjson", registered_by="Reception",
+                                    book_examinations=True, notify=True)
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(result["errors"][0]["row"], 2)
+        client = Client.objects.get()
+        self.assertEqual(client.registered_by, "Legacy")
+        self.assertEqual(client.examinations.count(), 1)
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class BulkEndpointTests(APITestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create_user(
+            email="admin@example.com", password="secret", first_name="Admin", last_name="User", is_staff=True
+        )
+        self.client.force_authenticate(admin)
+
+    def test_upload_then_export(self):
+        upload = SimpleUploadedFile("clients.csv", IMPORT_CSV.encode(), content_type="text/csv")
+        response = self.client.post(reverse("clients:import-clients"), {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 2)
+
+        response = self.client.get(reverse("clients:export", args=["clients"]), {"type": "ndjson"})
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual({row["first_name"] for row in rows}, {"Amina", "Cynthia"})
+
+        response = self.client.get(reverse("clients:export", args=["sales"]))
+        header = b"".join(response.streaming_content).decode().splitlines()[0]
+        self.assertTrue(header.startswith("id,examination_id,"))
+        self.assertTrue(header.endswith(",client_id"))
+
+
+@override_settings(REG_NO_BLOCK_SIZE=5)
+class RegistrationNumberTests(TestCase):
+    def setUp(self):
+        reg_numbers.reset()
+        self.addCleanup(reg_numbers.reset)
+        Branch.objects.create(name="Nakuru", code="NKR")
+
+    def test_numbers_are_sequential_per_branch_and_month(self):
+        today = date.today()
+        with self.captureOnCommitCallbacks(execute=True):
+            first = make_client(1, branch="Nakuru")
+        second = make_client(2, branch=" nakuru ")
+        other = make_client(3, branch="Unknown")
+        self.assertEqual(first.reg_no, f"NKR/{today.year}/{today.month:02d}/000001")
+        self.assertEqual(second.reg_no, f"NKR/{today.year}/{today.month:02d}/000002")
+        self.assertEqual(other.reg_no, f"XX/{today.year}/{today.month:02d}/000001")
+
+    def test_reserved_blocks_are_served_from_memory(self):
+        key = ("NKR", 2026, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(reg_numbers.allocate(key), [1])
+        with self.assertNumQueries(0):
+            self.assertEqual(reg_numbers.allocate(key, 4), [2, 3, 4, 5])
+        self.assertEqual(reg_numbers.allocate(key, 2), [6, 7])
+        self.assertEqual(RegistrationCounter.objects.get(branch_code="NKR").last_value, 10)
+
+    def test_rolled_back_reservations_are_not_reused(self):
+        key = ("NKR", 2026, 1)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                reg_numbers.allocate(key)
+                raise RuntimeError
+        # Neither the counter nor this process kept the rolled back block
+        self.assertEqual(reg_numbers.allocate(key), [1])
+
+
+class ReadReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+        patcher = mock.patch("backend.db_router.replica_configured", return_value=True)
+        self.configured = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_use_the_replica_only_when_asked(self):
+        self.assertEqual(self.router.db_for_read(Client), "default")
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_read(Client), "replica")
+            self.assertEqual(self.router.db_for_write(Client), "default")
+        self.assertEqual(self.router.db_for_read(Client), "default")
+
+    def test_without_a_replica_reads_stay_on_the_primary(self):
+        self.configured.return_value = False
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_read(Client), "default")
+
+
+@skipUnless("replica" in settings.DATABASES, "set DB_REPLICA_NAME (SQLite) or DB_REPLICA_HOST to run")
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class ReadReplicaRoutingTests(APITransactionTestCase):
+    """
+    Runs against a configured replica:
+    `DB_REPLICA_NAME=/tmp/replica.sqlite3 manage.py test clients.tests.ReadReplicaRoutingTests`.
+    The test replica mirrors the test database, so both aliases see the
+    same rows once they're committed. The rest of the suite runs without a
+    replica; TestCase rows stay uncommitted and the mirror can't see them.
+    """
+    databases = "__all__"
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+        self.exam = Examination.objects.create(client=make_client(1), state="Completed", booked_for_sales=True)
+
+    def queries(self, method, name, *args, **kwargs):
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            response = getattr(self.client, method)(reverse(f"clients:{name}", args=args), headers=self.headers, **kwargs)
+        self.assertLess(response.status_code, 400, response.content)
+        return len(primary), len(replica)
+
+    def test_listings_read_from_the_replica(self):
+        for name in ("all_examinations", "all-sales", "search_client"):
+            primary, replica = self.queries("get", name)
+            self.assertGreater(replica, 0, name)
+
+    def test_writes_and_other_views_use_the_primary(self):
+        primary, replica = self.queries("post", "create-sales", data={
+            "examination": self.exam.id, "frame_brand": "Brand", "frame_model": "Model", "frame_color": "Black",
+            "frame_price": "1000.00", "lens_brand": "Lens", "lens_type": "Single Vision",
+            "lens_material": "Polycarbonate", "lens_coating": "Anti-glare", "lens_price": "500.00",
+            "advance_paid": "0.00", "booked_by": "Reception",
+        }, format="json")
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        primary, replica = self.queries("get", "pending_examinations")
+        self.assertEqual(replica, 0)
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class ReceiptTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        jane = make_client(1, first_name="Jane")
+        exam = Examination.objects.create(client=jane, state="Completed")
+        self.sale = make_sale(exam, advance_paid=Decimal("600.00"))
+        make_sale(Examination.objects.create(client=jane, state="Completed"), advance_paid=Decimal("0.00"))
+
+    def fetch(self):
+        return Sales.objects.select_related("examination__client").get(id=self.sale.id)
+
+    def test_rendered_receipts_are_cached_until_the_sale_changes(self):
+        render = mock.Mock(wraps=receipts.render_pdf)
+        with mock.patch.dict(receipts.RENDERERS, pdf=(render, "application/pdf")):
+            document = receipts.get_receipt(self.fetch(), "pdf")
+            self.assertEqual(receipts.get_receipt(self.fetch(), "pdf"), document)
+            self.assertEqual(render.call_count, 1)
+
+            self.sale.served_by = "Dr. Other"
+            self.sale.save()
+            receipts.get_receipt(self.fetch(), "pdf")
+            self.assertEqual(render.call_count, 2)
+        self.assertTrue(document.startswith(b"%PDF"))
+
+    def test_receipt_formats(self):
+        url = reverse("clients:generate-receipt", args=[self.sale.id])
+        self.assertEqual(self.client.get(url).data["sales"]["balance_due"], Decimal("900.00"))
+
+        response = self.client.get(url, {"type": "html"})
+        self.assertEqual(response["Content-Type"], "text/html; charset=utf-8")
+        self.assertIn(b"Jane Test", response.content)
+
+        response = self.client.get(url, {"type": "pdf"})
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(self.client.get(url, {"type": "doc"}).status_code, 400)
+
+    def test_batch_streams_a_zip_of_the_range(self):
+        today = date.today().isoformat()
+        url = reverse("clients:receipt-batch")
+        response = self.client.get(url, {"from": today, "to": today, "type": "html"})
+        self.assertEqual(response["Content-Type"], "application/zip")
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(len(archive.namelist()), 2)
+        self.assertIn(f"receipt-{date.today():%Y%m%d}-{self.sale.id}.html", archive.namelist())
+        key = receipts.RECEIPT_CACHE_KEY.format(sale_id=self.sale.id, fmt="html", version=receipts.receipt_version(self.fetch()))
+        self.assertIsNone(cache.get(key))
+
+        self.assertEqual(self.client.get(url, {"from": today}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"from": "2025-01-01", "to": "2025-06-01"}).status_code, 400)
+
+
+class BalanceSummaryTests(TestCase):
+    def setUp(self):
+        self.client_row = make_client(1)
+        self.first = make_sale(Examination.objects.create(client=self.client_row), advance_paid=Decimal("600.00"))
+        self.second = make_sale(Examination.objects.create(client=self.client_row), advance_paid=Decimal("1000.00"))
+
+    def summary(self):
+        client = Client.objects.get(pk=self.client_row.pk)
+        return client.outstanding_balance, client.open_orders, client.latest_sale_id
+
+    def pay(self, sale, amount):
+        serializer = SalesSerializer(sale, data={"advance_paid": amount}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+    def test_sales_and_payments_move_the_summary(self):
+        self.assertEqual(self.summary(), (Decimal("1400.00"), 2, self.second.id))
+        self.pay(self.first, "400.00")
+        self.assertEqual(self.summary(), (Decimal("1000.00"), 2, self.second.id))
+        self.pay(self.first, "500.00")
+        self.assertEqual(self.summary(), (Decimal("500.00"), 1, self.second.id))
+
+        data = ClientSerializer(Client.objects.get(pk=self.client_row.pk)).data
+        self.assertEqual((data["balance"], data["latest_sales_id"]), (500.0, str(self.second.id)))
+
+    def test_reconcile_reports_and_repairs_drift(self):
+        self.assertEqual(list(balances.find_drift()), [])
+        Client.objects.update(outstanding_balance=Decimal("1.00"), open_orders=0, latest_sale=None)
+
+        out = io.StringIO()
+        call_command("reconcile_client_balances", stdout=out)
+        self.assertIn("1 clients drifted", out.getvalue())
+        self.assertEqual(self.summary(), (Decimal("1.00"), 0, None))
+
+        call_command("reconcile_client_balances", "--fix", stdout=out)
+        self.assertEqual(self.summary(), (Decimal("1400.00"), 2, self.second.id))
+        self.assertEqual(list(balances.find_drift()), [])
+
+    def test_balance_search_reads_only_owing_clients_sales(self):
+        self.pay(self.first, "900.00")
+        request = APIRequestFactory().get("/", {"q": self.client_row.first_name})
+        force_authenticate(request, user=get_user_model()(first_name="Staff"))
+        # search among owing clients, their outstanding sales
+        with self.assertNumQueries(2):
+            rows = SearchClientBalanceView.as_view()(request).data
+        self.assertEqual([row["id"] for row in rows], [str(self.second.id)])
+
+        self.pay(self.second, "500.00")
+        response = SearchClientBalanceView.as_view()(request)
+        self.assertEqual(response.data, {"message": "Client found, but balance is fully paid."})
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class PaymentLedgerTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        self.client_row = make_client(1)
+        self.sale = make_sale(Examination.objects.create(client=self.client_row), advance_paid=Decimal("600.00"))
+        self.url = reverse("clients:update-client-sale-balance", args=[self.sale.id])
+
+    def test_payments_append_to_the_ledger(self):
+        # locked read, payment insert, the sale's payment columns, the client
+        # summary and the SMS, plus two savepoints
+        with self.assertNumQueries(9):
+            record_payment(self.sale.id, Decimal("400.00"), "Mpesa", "Staff User", mpesa_transaction_code="QX1")
+        record_payment(self.sale.id, Decimal("500.00"), "Cash", "Staff User")
+
+        sale = Sales.objects.get(pk=self.sale.pk)
+        self.assertEqual((sale.advance_paid, sale.balance_due, sale.order_paid), (Decimal("1500.00"), 0, "Paid"))
+        self.assertEqual(
+            [payment.amount for payment in sale.payments.all()],
+            [Decimal("600.00"), Decimal("400.00"), Decimal("500.00")],
+        )
+        self.assertEqual(Client.objects.get(pk=self.client_row.pk).open_orders, 0)
+        self.assertEqual(list(balances.find_drift()), [])
+
+    def test_rejected_payments_write_nothing(self):
+        record_payment(self.sale.id, Decimal("100.00"), "Mpesa", "Staff User", mpesa_transaction_code="QX1")
+        for amount, code in ((Decimal("0.00"), None), (Decimal("900.00"), None), (Decimal("50.00"), "QX1")):
+            with self.assertRaises(PaymentRejected):
+                record_payment(self.sale.id, amount, "Mpesa", "Staff User", mpesa_transaction_code=code)
+        sale = Sales.objects.get(pk=self.sale.pk)
+        self.assertEqual((sale.advance_paid, sale.payments.count()), (Decimal("700.00"), 2))
+
+    def test_pay_balance_endpoint(self):
+        response = self.client.post(self.url, {"amount": "300.00", "method": "Cash"}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data["balance_due"], Decimal("600.00"))
+        self.assertEqual(response.data["payment"]["received_by"], "Staff User")
+
+        # The older PUT body still works
+        response = self.client.put(self.url, {"advance_paid": "600.00", "advance_payment_method": "Cash"}, format="json")
+        self.assertEqual((response.status_code, response.data["order_paid"]), (201, "Paid"))
+
+        response = self.client.post(self.url, {"amount": "1.00"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.client.get(self.url).data), 3)
+
+        missing = reverse("clients:update-client-sale-balance", args=["00000000-0000-0000-0000-000000000000"])
+        self.assertEqual(self.client.post(missing, {"amount": "1.00"}, format="json").status_code, 404)
+
+    def post_sale(self, **fields):
+        exam = Examination.objects.create(client=self.client_row, state="Completed", booked_for_sales=True)
+        data = {
+            "examination": str(exam.id), "frame_brand": "Brand", "frame_model": "Model", "frame_color": "Black",
+            "frame_price": "1000.00", "lens_brand": "Lens", "lens_type": "Single Vision",
+            "lens_material": "Polycarbonate", "lens_coating": "Anti-glare", "lens_price": "500.00",
+            "advance_paid": "500.00", "booked_by": "Reception", **fields,
+        }
+        return self.client.post(reverse("clients:create-sales"), data, format="json")
+
+    def test_blank_and_reused_mpesa_codes_on_new_sales(self):
+        for _ in range(2):
+            response = self.post_sale(advance_payment_method="Cash", mpesa_transaction_code="")
+            self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Payment.objects.filter(mpesa_transaction_code__isnull=True).count(), 3)
+
+        self.assertEqual(self.post_sale(advance_payment_method="Mpesa", mpesa_transaction_code="QX9").status_code, 201)
+        response = self.post_sale(advance_payment_method="Mpesa", mpesa_transaction_code="QX9")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("mpesa_transaction_code", response.data)
+        self.assertEqual(Sales.objects.count(), 4)
+
+    def test_sale_put_with_a_payment_keeps_the_advance_details(self):
+        sale = make_sale(
+            Examination.objects.create(client=self.client_row), advance_paid=Decimal("600.00"),
+            advance_payment_method="Mpesa", mpesa_transaction_code="ADV1",
+        )
+        messages = OutboxMessage.objects.count()
+        response = self.client.put(reverse("clients:get-sales", args=[sale.id]), {
+            "advance_paid": "100.00", "advance_payment_method": "Mpesa", "mpesa_transaction_code": "BAL1",
+        }, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+
+        sale.refresh_from_db()
+        self.assertEqual((sale.mpesa_transaction_code, sale.advance_paid), ("ADV1", Decimal("700.00")))
+        self.assertEqual(list(sale.payments.values_list("mpesa_transaction_code", flat=True)), ["ADV1", "BAL1"])
+        self.assertEqual(OutboxMessage.objects.count(), messages + 1)
+
+    def test_receipt_lists_the_payments(self):
+        record_payment(self.sale.id, Decimal("400.00"), "Mpesa", "Staff User", mpesa_transaction_code="QX1")
+        sale = receipts.RECEIPT_QUERYSET.get(pk=self.sale.pk)
+        payments = receipts.receipt_data(sale)["sales"]["payments"]
+        self.assertEqual([(p["amount"], p["mpesa_transaction_code"]) for p in payments], [
+            (Decimal("600.00"), None), (Decimal("400.00"), "QX1"),
+        ])
+        self.assertIn(b"QX1", receipts.render_html(sale))
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class IdempotencyKeyTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        self.client_row = make_client(1)
+        self.sale = make_sale(Examination.objects.create(client=self.client_row), advance_paid=Decimal("600.00"))
+        self.url = reverse("clients:update-client-sale-balance", args=[self.sale.id])
+
+    def pay(self, amount, key="retry-1"):
+        return self.client.post(self.url, {"amount": amount}, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retries_replay_the_first_response(self):
+        first = self.pay("100.00")
+        self.assertEqual(first.status_code, 201)
+        # the key lookup only; no payment is posted again
+        with CaptureQueriesContext(connections["default"]) as queries:
+            retry = self.pay("100.00")
+        self.assertEqual(len([q for q in queries if "clients_payment" in q["sql"]]), 0)
+        self.assertEqual((retry.status_code, retry.json()), (201, first.json()))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(self.sale.payments.count(), 2)
+
+        self.assertEqual(self.pay("100.00", key="retry-2").status_code, 201)
+        self.assertEqual(self.sale.payments.count(), 3)
+
+    def test_reusing_a_key_for_another_request_is_refused(self):
+        self.pay("100.00")
+        self.assertEqual(self.pay("200.00").status_code, 422)
+        self.assertEqual(self.sale.payments.count(), 2)
+
+    def test_expired_keys_run_again_and_are_purged(self):
+        self.pay("100.00")
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        self.assertNotIn("Idempotent-Replayed", self.pay("100.00"))
+        self.assertEqual(self.sale.payments.count(), 3)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        self.assertEqual(idempotency.purge_expired(), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_sale_creation(self):
+        exam = Examination.objects.create(client=self.client_row, state="Completed", booked_for_sales=True)
+        data = {
+            "examination": str(exam.id), "frame_brand": "Brand", "frame_model": "Model", "frame_color": "Black",
+            "frame_price": "1000.00", "lens_brand": "Lens", "lens_type": "Single Vision",
+            "lens_material": "Polycarbonate", "lens_coating": "Anti-glare", "lens_price": "500.00",
+            "advance_paid": "500.00", "booked_by": "Reception",
+        }
+        url = reverse("clients:create-sales")
+        for _ in range(2):
+            response = self.client.post(url, data, format="json", HTTP_IDEMPOTENCY_KEY="sale-1")
+            self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Sales.objects.filter(examination=exam).count(), 1)
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class ConditionalRequestTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        self.client_row = make_client(1)
+        self.exam = Examination.objects.create(client=self.client_row, state="Completed")
+        self.sale = make_sale(self.exam, advance_paid=Decimal("600.00"))
+
+    def revalidate(self, url, **params):
+        first = self.client.get(url, params)
+        self.assertEqual(first.status_code, 200, first.content)
+        self.assertIn("no-cache", first["Cache-Control"])
+        again = self.client.get(url, params, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual((again.status_code, again.content), (304, b""))
+        return first["ETag"]
+
+    def test_client_info_and_examinations(self):
+        for url in (
+            reverse("clients:client-info", args=[self.client_row.id]),
+            reverse("clients:client_examinations", args=[self.client_row.id]),
+        ):
+            etag = self.revalidate(url)
+            Client.objects.filter(pk=self.client_row.pk).update(first_name="Renamed", updated_at=timezone.now())
+            self.assertNotEqual(self.revalidate(url), etag)
+            etag = self.revalidate(url)
+            Examination.objects.create(client=self.client_row)
+            self.assertNotEqual(self.revalidate(url), etag)
+
+        missing = reverse("clients:client-info", args=["00000000-0000-0000-0000-000000000000"])
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    def test_sale_and_receipt_change_with_payments(self):
+        sale_url = reverse("clients:get-sales", args=[self.sale.id])
+        receipt_url = reverse("clients:generate-receipt", args=[self.sale.id])
+        etags = [self.revalidate(sale_url), self.revalidate(receipt_url), self.revalidate(receipt_url, type="html")]
+        self.assertEqual(len(set(etags)), 3)
+
+        record_payment(self.sale.id, Decimal("100.00"), "Cash", "Staff User")
+        for url, etag in zip((sale_url, receipt_url), etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+
+    def test_branch_list_and_if_modified_since(self):
+        Branch.objects.create(name="Nairobi", code="NRB")
+        url = reverse("clients:branch-list")
+        etag = self.revalidate(url)
+        last_modified = self.client.get(url)["Last-Modified"]
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        Branch.objects.create(name="Mombasa", code="MSA")
+        self.assertNotEqual(self.revalidate(url), etag)
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class SparseFieldsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        self.client_row = make_client(1, first_name="Jane")
+        self.exam = Examination.objects.create(client=self.client_row, state="Completed")
+        self.sale = make_sale(self.exam, advance_paid=Decimal("600.00"))
+
+    def get(self, name, **params):
+        with CaptureQueriesContext(connections["default"]) as queries:
+            response = self.client.get(reverse(f"clients:{name}"), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response, [query["sql"] for query in queries if '"clients_' in query["sql"]]
+
+    def test_only_requested_fields_are_sent_and_loaded(self):
+        response, queries = self.get("all-sales", fields="id,balance_due")
+        self.assertEqual(response.json(), [{"id": str(self.sale.id), "balance_due": "900.00"}])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("frame_brand", queries[0])
+        self.assertNotIn("clients_examination", queries[0])
+
+        response, queries = self.get("search-client", fields="id,first_name,balance")
+        self.assertEqual(response.json(), [{"id": str(self.client_row.id), "first_name": "Jane", "balance": 900.0}])
+        # No examinations prefetch or latest examination subquery
+        self.assertFalse([sql for sql in queries if "clients_examination" in sql])
+
+    def test_expand_nests_the_related_object(self):
+        response, queries = self.get("all-sales", fields="id,examination", expand="examination")
+        self.assertEqual(response.json()[0]["examination"]["client_name"], "Jane Test")
+        self.assertEqual(len(queries), 1)
+
+        response, _ = self.get("all_examinations", fields="id", expand="client")
+        self.assertEqual(response.json()["d"][0]["client"]["balance"], 900.0)
+
+    def test_unknown_fields_are_rejected(self):
+        self.assertEqual(self.client.get(reverse("clients:all-sales"), {"fields": "id,nope"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("clients:all-sales"), {"expand": "client"}).status_code, 400)
+
+    def test_compact_format(self):
+        make_sale(Examination.objects.create(client=self.client_row), advance_paid=Decimal("0.00"))
+        response, _ = self.get("all-sales", fields="balance_due,order_paid", format="compact")
+        self.assertEqual(response.json(), {
+            "columns": ["balance_due", "order_paid"],
+            "rows": [["1500.00", "Pending"], ["900.00", "Partially Paid"]],
+        })
+
+        response, _ = self.get("all_examinations", fields="id,state", format="compact", page_size=1)
+        body = response.json()
+        self.assertEqual(body["results"]["columns"], ["id", "state"])
+        self.assertEqual(len(body["results"]["rows"]), 1)
+        self.assertIsNotNone(body["next"])
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class PlainSerializerParityTests(APITestCase):
+    """The plain fast path and orjson must render exactly what the ModelSerializers and JSONRenderer do."""
+
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            email="staff@example.com", password="secret", first_name="Staff", last_name="User"
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        zoe = make_client(1, first_name="Zoë", last_name="Wanjirū")
+        exam = Examination.objects.create(
+            client=zoe, state="Completed", right_sph=Decimal("-1.25"), left_cyl=Decimal("0.50"),
+            clinical_history="Line one\u2028line two \"quoted\" \U0001f453",
+        )
+        make_sale(exam, advance_paid=Decimal("600.00"), advance_payment_method="Mpesa", mpesa_transaction_code="QX1",
+                  delivery_date=date(2026, 1, 31), frame_quantity=2)
+        make_sale(Examination.objects.create(client=zoe), advance_paid=Decimal("1500.00"))
+        Examination.objects.create(client=make_client(2), state="Pending")
+        make_client(3)
+
+    def request(self, **params):
+        return Request(APIRequestFactory().get("/", params))
+
+    def assert_same_bytes(self, serializer_class, queryset, **params):
+        request = self.request(**params)
+        prepared = serializer_class.prepare(queryset, request)
+        expected = JSONRenderer().render(serializer_class(prepared, many=True, context={"request": request}).data)
+        listing = PlainList(serializer_class, request)
+        self.assertIsNotNone(listing.plain)
+        actual = ORJSONRenderer().render(listing.data(listing.queryset(prepared)))
+        self.assertEqual(actual, expected)
+
+    def test_serializers(self):
+        for params in ({}, {"fields": "id,client_name,right_sph,state,created_at"}):
+            self.assert_same_bytes(ExaminationSerializer, Examination.objects.select_related("client"), **params)
+        for params in ({}, {"fields": "id,total_price,delivery_date,mpesa_transaction_code"}):
+            self.assert_same_bytes(SalesSerializer, Sales.objects.all(), **params)
+        for params in ({}, {"fields": "id,first_name,balance,payment_status,latest_sales_id"}):
+            self.assert_same_bytes(ClientSerializer, Client.objects.all(), **params)
+
+    def test_renderer(self):
+        data = {"d": [{"n": 1.5, "when": timezone.now(), "day": date(2026, 1, 2), "amount": Decimal("2.50"), 3: None}]}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_endpoints(self):
+        cases = [
+            ("all_examinations", {}), ("all_examinations", {"page_size": 2}),
+            ("all-sales", {}), ("all-sales", {"fields": "id,balance_due", "page_size": 1}),
+            ("search_client", {}), ("search_client", {"q": "Zoë"}), ("pending_examinations", {}),
+            ("get-booked-client-for-sales", {}),
+        ]
+        for name, params in cases:
+            url = reverse(f"clients:{name}")
+            fast = self.client.get(url, params, HTTP_ACCEPT="application/json")
+            with mock.patch.object(PlainSerializer, "supports", return_value=False):
+                slow = self.client.get(url, params, HTTP_ACCEPT="application/json")
+            self.assertEqual(fast.status_code, 200, (name, fast.content))
+            self.assertEqual(fast.content, slow.content, name)
+
+
+class SeedingTests(TestCase):
+    def test_seeded_data_is_consistent(self):
+        seed(clients=60, random_seed=3)
+        self.assertEqual(Client.objects.count(), 60)
+        self.assertEqual(list(balances.find_drift()), [])
+        paid = {sale.pk: sale.advance_paid for sale in Sales.objects.all()}
+        ledger = dict(Payment.objects.values_list("sale").annotate(total=Sum("amount")).order_by())
+        self.assertEqual({pk: amount for pk, amount in paid.items() if amount}, ledger)
+        self.assertEqual(sum(ledger.values()), sum(paid.values()))
+        self.assertEqual(len(set(Sales.objects.values_list("order_paid", flat=True))), 3)
+
+        # A second run adds new rows instead of colliding with the first
+        seed(clients=60, random_seed=3)
+        self.assertEqual(Client.objects.count(), 120)
+        self.assertEqual(list(balances.find_drift()), [])
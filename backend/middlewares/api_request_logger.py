@@ -1,21 +1,82 @@
-from django.utils.timezone import now
-from analytics.models import APIRequestLog
+import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+from analytics.request_buffer import normalize_endpoint, request_log_buffer, request_metrics_buffer
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def count_queries(stack, counter):
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(counter))
+
 
 class APIRequestLoggerMiddleware:
+    # Runs natively under both WSGI and ASGI so async views don't pay for a
+    # sync middleware's thread switch.
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        response = self.get_response(request)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not request.path.startswith("/api/"):  # Only track API requests
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            count_queries(stack, counter)
+            response = self.get_response(request)
+        self.record(request, response, started, counter)
+        return response
+
+    async def __acall__(self, request):
+        if not request.path.startswith("/api/"):
+            return await self.get_response(request)
+
+        # A request's ORM calls all run on its thread-sensitive executor
+        # thread, so the wrappers go on that thread's connections.
+        counter = QueryCounter()
+        stack = ExitStack()
+        await sync_to_async(count_queries)(stack, counter)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
 
-        if request.path.startswith("/api/"):  # Only track API requests
-            method = request.method
-            endpoint = request.path
+        due = self.record(request, response, started, counter, autoflush=False)
+        if due:
+            await sync_to_async(lambda: [buffer.flush() for buffer in due])()
+        return response
 
-            # Update or create log entry
-            log, created = APIRequestLog.objects.get_or_create(method=method, endpoint=endpoint)
-            log.count += 1
-            log.last_requested = now()
-            log.save()
+    def record(self, request, response, started, counter, autoflush=True):
+        """Buffers the hit and its timings; returns the buffers now due for a flush."""
+        duration_ms = (time.perf_counter() - started) * 1000
 
-        return response 
\ No newline at end of file
+        # Hits and timings are aggregated in memory and written out in batches
+        endpoint = normalize_endpoint(request)
+        response_bytes = None if response.streaming else len(response.content)
+        due = []
+        if request_log_buffer.add(request.method, endpoint, autoflush=autoflush):
+            due.append(request_log_buffer)
+        if request_metrics_buffer.add(
+            request.method, endpoint, response.status_code, duration_ms, counter.count, response_bytes,
+            autoflush=autoflush,
+        ):
+            due.append(request_metrics_buffer)
+        return due
@@ -1,14 +1,26 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.http import JsonResponse
 from rest_framework import status
 
 class Custom404Middleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
         
         
     def __call__(self, request):
-        response = self.get_response(request)
-        
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(await self.get_response(request))
+
+    def process_response(self, response):
         if response.status_code == 404:
             return JsonResponse({
                 'error': 'Not found',
@@ -16,4 +28,4 @@ class Custom404Middleware:
             }, status=status.HTTP_404_NOT_FOUND)
         
         return response
-        
\ No newline at end of file
+        
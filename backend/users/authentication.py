@@ -1,4 +1,44 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+USER_CACHE_KEY = "jwt-user:{user_id}:{jti}"
+USER_CHANGED_KEY = "jwt-user-changed:{user_id}"
+
+# Claims CustomTokenObtainPairSerializer adds so a view that only needs the
+# caller's id, name and role can skip the UserAccount lookup
+USER_CLAIMS = ("first_name", "last_name", "role", "is_staff", "is_superuser", "user_claims_at")
+
+
+def add_user_claims(token, user):
+    for field in USER_CLAIMS[:-1]:
+        token[field] = getattr(user, field)
+    token["user_claims_at"] = time.time()
+    return token
+
+
+def claims_lifetime():
+    # Refresh rotation carries claims into new tokens, so they're trusted
+    # for JWT_CLAIMS_MAX_AGE_SECONDS after they were read, never longer
+    # than one access token lifetime
+    return min(
+        getattr(settings, "JWT_CLAIMS_MAX_AGE_SECONDS", 300),
+        api_settings.ACCESS_TOKEN_LIFETIME.total_seconds(),
+    )
+
+
+def invalidate_user(user_id):
+    """
+    Marks the user's cached copies and token claims stale. Cached entries
+    older than the mark are refetched, and tokens whose claims predate it
+    fall back to the database.
+    """
+    ttl = max(claims_lifetime(), getattr(settings, "JWT_USER_CACHE_SECONDS", 60))
+    cache.set(USER_CHANGED_KEY.format(user_id=user_id), time.time(), ttl)
+
 
 # Gets access token from the cookies if exists
 class CustomJWTAuthentication(JWTAuthentication):
@@ -18,4 +58,50 @@ class CustomJWTAuthentication(JWTAuthentication):
             return self.get_user(validated_token), validated_token
         
         except:
-            return None
\ No newline at end of file
+            return None
+
+     def get_user(self, validated_token):
+        """
+        The token's user, cached per token for JWT_USER_CACHE_SECONDS so the
+        parallel calls behind one page share a single UserAccount query.
+        """
+        ttl = getattr(settings, "JWT_USER_CACHE_SECONDS", 60)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if not ttl or user_id is None:
+            return super().get_user(validated_token)
+
+        key = USER_CACHE_KEY.format(user_id=user_id, jti=validated_token.get(api_settings.JTI_CLAIM))
+        changed_key = USER_CHANGED_KEY.format(user_id=user_id)
+        cached = cache.get_many([key, changed_key])
+        if key in cached:
+            cached_at, user = cached[key]
+            if cached_at > cached.get(changed_key, 0):
+                return user
+
+        user = super().get_user(validated_token)
+        cache.set(key, (time.time(), user), ttl)
+        return user
+
+
+class StatelessJWTAuthentication(CustomJWTAuthentication):
+    """
+    Builds a TokenUser from the token's claims without touching the
+    database, for views that only read the caller's id, name and role.
+    Tokens without the claims, or whose user changed after they were
+    issued, get the cached UserAccount instead.
+
+    Only a shared cache can tell every worker that a user was deactivated
+    or deleted, so without JWT_STATELESS_CLAIMS (on when REDIS_URL is set)
+    this is the cached lookup.
+    """
+
+    def get_user(self, validated_token):
+        if (
+            getattr(settings, "JWT_STATELESS_CLAIMS", False)
+            and all(claim in validated_token for claim in USER_CLAIMS)
+            and time.time() - validated_token["user_claims_at"] < claims_lifetime()
+        ):
+            changed_at = cache.get(USER_CHANGED_KEY.format(user_id=validated_token.get(api_settings.USER_ID_CLAIM)))
+            if changed_at is None or validated_token["user_claims_at"] > changed_at:
+                return TokenUser(validated_token)
+        return super().get_user(validated_token)
@@ -1,12 +1,12 @@
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .authentication import add_user_claims
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
 
-        # Add custom claims
-        token["is_superuser"] = user.is_superuser
-
-        return token
+        # Add custom claims (copied into every access token minted from
+        # this refresh token), read by StatelessJWTAuthentication
+        return add_user_claims(token, user)
 
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import invalidate_user
+from .models import UserAccount
+
+
+@receiver([post_save, post_delete], sender=UserAccount)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
@@ -1,3 +1,123 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import AccessToken
+from .authentication import CustomJWTAuthentication, StatelessJWTAuthentication
+from .serializers import CustomTokenObtainPairSerializer
 
-# Create your tests here.
+
+def make_user(**kwargs):
+    return get_user_model().objects.create_user(
+        email="staff@example.com", password="secret", first_name="Staff", last_name="User", **kwargs
+    )
+
+
+def claims_token(user):
+    return CustomTokenObtainPairSerializer.get_token(user).access_token
+
+
+class CachedUserAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.token = AccessToken.for_user(self.user)
+        self.auth = CustomJWTAuthentication()
+
+    def test_user_is_cached_per_token(self):
+        with self.assertNumQueries(1):
+            self.auth.get_user(self.token)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.auth.get_user(self.token), self.user)
+        # A different token for the same user looks it up once more
+        with self.assertNumQueries(1):
+            self.auth.get_user(AccessToken.for_user(self.user))
+
+    def test_saving_or_deleting_the_user_invalidates_it(self):
+        self.auth.get_user(self.token)
+        self.user.first_name = "Renamed"
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.auth.get_user(self.token).first_name, "Renamed")
+
+        self.user.delete()
+        with self.assertRaises(Exception):
+            self.auth.get_user(self.token)
+
+    @override_settings(JWT_USER_CACHE_SECONDS=0)
+    def test_cache_can_be_disabled(self):
+        self.auth.get_user(self.token)
+        with self.assertNumQueries(1):
+            self.auth.get_user(self.token)
+
+
+@override_settings(JWT_STATELESS_CLAIMS=True)
+class StatelessAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user(role="optometrist")
+        self.auth = StatelessJWTAuthentication()
+
+    def test_user_comes_from_token_claims(self):
+        token = claims_token(self.user)
+        with self.assertNumQueries(0):
+            user = self.auth.get_user(token)
+        self.assertIsInstance(user, TokenUser)
+        self.assertEqual((user.id, user.first_name, user.role), (str(self.user.id), "Staff", "optometrist"))
+
+    def test_tokens_without_claims_or_with_stale_claims_use_the_database(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.auth.get_user(AccessToken.for_user(self.user)), self.user)
+
+        token = claims_token(self.user)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(Exception):
+            self.auth.get_user(token)
+        # Claims read after the change are trusted again
+        self.user.is_active = True
+        self.user.save()
+        self.assertIsInstance(self.auth.get_user(claims_token(self.user)), TokenUser)
+
+    @override_settings(JWT_CLAIMS_MAX_AGE_SECONDS=60)
+    def test_old_claims_use_the_database(self):
+        token = claims_token(self.user)
+        token["user_claims_at"] -= 61
+        with self.assertNumQueries(1):
+            self.assertEqual(self.auth.get_user(token), self.user)
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class DeletedUserTests(APITestCase):
+    def test_deleted_user_is_refused_by_workers_that_missed_the_change(self):
+        cache.clear()
+        user = make_user()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {claims_token(user)}")
+        self.assertEqual(self.client.get(reverse("clients:branch-list")).status_code, 200)
+
+        user.delete()
+        # Another worker's memory cache never saw the change mark
+        cache.clear()
+        for name in ("clients:branch-list", "clients:all-sales"):
+            self.assertEqual(self.client.get(reverse(name)).status_code, 401, name)
+
+
+@override_settings(API_REQUEST_LOG_FLUSH_SIZE=1)
+class StaffEditInvalidationTests(APITestCase):
+    def test_admin_edit_invalidates_the_cached_user(self):
+        cache.clear()
+        staff = make_user()
+        admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="secret", first_name="Admin", last_name="User"
+        )
+        staff_token = AccessToken.for_user(staff)
+        self.assertEqual(CustomJWTAuthentication().get_user(staff_token).role, "staff")
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(admin)}")
+        response = self.client.put(
+            reverse("staff-admin-detail", args=[staff.id]), {"role": "receptionist"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(CustomJWTAuthentication().get_user(staff_token).role, "receptionist")